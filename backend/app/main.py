@@ -1,9 +1,66 @@
-from fastapi import FastAPI
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import llm_router
 from app.routers.api_test_router import router as api_test_router
+from app.routers.spec_router import router as spec_router
+from app.routers.suite_router import router as suite_router
+from app.routers.metrics_router import router as metrics_router
+from app.services.llm_service import close_async_client
+from app.services.validator_engine import shutdown_validation_pool
+from app.services.sandbox_runner import shutdown_sandbox_pool
+from app.services.metrics import http_errors_total, http_request_seconds, http_requests_total
+from app.services.warmup import warmup
+from app.services.bulk_jobs import get_bulk_queue
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Каждый воркер прогревается до первого запроса
+    await warmup()
+    # Воркеры очереди bulk-задач; незавершённые задачи продолжаются с места остановки
+    await get_bulk_queue().start()
+    yield
+    await get_bulk_queue().stop()
+    # Закрываем общий пул соединений к модели и пулы валидации и песочницы
+    await close_async_client()
+    shutdown_validation_pool()
+    shutdown_sandbox_pool()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def route_label(request: Request) -> str:
+    # Шаблон пути, а не сам путь — чтобы id в URL не плодили метки
+    route = request.scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    """
+    Помечает каждый запрос X-Request-ID и пишет время и код ответа по ручке.
+    """
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        http_errors_total.inc(request.method, route_label(request))
+        http_requests_total.inc(request.method, route_label(request), "500")
+        raise
 
-app = FastAPI()
+    route = route_label(request)
+    http_request_seconds.observe(time.perf_counter() - started, request.method, route)
+    http_requests_total.inc(request.method, route, str(response.status_code))
+    if response.status_code >= 500:
+        http_errors_total.inc(request.method, route)
+    response.headers["X-Request-ID"] = request_id
+    return response
 
 
 app.add_middleware(
@@ -16,3 +73,6 @@ app.add_middleware(
 
 app.include_router(llm_router.router)
 app.include_router(api_test_router)
+app.include_router(spec_router)
+app.include_router(suite_router)
+app.include_router(metrics_router)
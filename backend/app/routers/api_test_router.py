@@ -1,9 +1,17 @@
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import Field
 
-from app.services.openapi_parser import OpenAPIParser
+from app.routers.spec_router import SpecSource, parser_for_request
 from app.services.llm_payload_builder import build_llm_payload
-from app.services.api_test_generator import generate_api_test
+from app.services.api_test_generator import generate_api_test, stream_api_test
+from app.services.api_test_skeleton import build_skeleton
+from app.services.sse import stream_generation
+from app.services.llm_scheduler import LLMOverloadedError
+from app.services.repair import generate_with_repair
+from app.services.sandbox_runner import verify_api_test
 from app.services.api_manual_test_generator import generate_api_manual_test
 from app.services.test_validators import (
     validate_pytest_api,
@@ -12,24 +20,64 @@ from app.services.test_validators import (
 router = APIRouter()
 
 
-class ApiTestRequest(BaseModel):
-    openapi: str
+class ApiTestRequest(SpecSource):
     endpoint_path: str
     method: str = "GET"
+    use_cache: bool = True
+    compact: bool = Field(False, description="Сжатый payload: без описаний и примеров, минифицированный JSON")
+    token_budget: Optional[int] = Field(None, ge=100, description="Бюджет токенов на payload (включает compact)")
+    repair: bool = Field(False, description="Исправлять код по ошибкам валидатора (до REPAIR_MAX_ATTEMPTS вызовов)")
+    verify: bool = Field(False, description="Запустить тест в песочнице против mock-сервера по спеке")
+    skeleton: bool = Field(False, description="Типовые тесты и хелперы строить локально, у модели просить только сценарии")
 
 
 @router.post("/llm/generate-api-test")
 async def generate_api_test_handler(req: ApiTestRequest):
     try:
-        parser = OpenAPIParser.load_from_string(req.openapi)
-
-        endpoints = parser.parse_endpoints()
-        ep = next(
-            (e for e in endpoints
-             if e.path == req.endpoint_path
-             and e.method == req.method.upper()),
-            None
+        parser = parser_for_request(req)
+        ep = parser.find_endpoint(req.endpoint_path, req.method)
+
+        if not ep:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Эндпоинт {req.method} {req.endpoint_path} не найден."
+            )
+
+        payload = build_llm_payload(
+            parser, ep, compact=req.compact, token_budget=req.token_budget
         )
+        if req.repair:
+            result = await generate_with_repair(
+                lambda: generate_api_test(payload, use_cache=req.use_cache, skeleton=req.skeleton),
+                validate_pytest_api,
+            )
+        else:
+            code = await generate_api_test(payload, use_cache=req.use_cache, skeleton=req.skeleton)
+            result = {"code": code, "validation": validate_pytest_api(code)}
+
+        result["payload_stats"] = payload.get("compaction")
+        if req.verify:
+            result["execution"] = await verify_api_test(parser, result["code"])
+        return result
+
+    except HTTPException:
+        raise
+    except LLMOverloadedError as e:
+        raise HTTPException(status_code=503, detail=f"Модель перегружена, повторите позже: {e}")
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка генерации теста: {str(e)}"
+        )
+
+@router.post("/llm/api-test-skeleton")
+async def api_test_skeleton_handler(req: ApiTestRequest):
+    """
+    Каркас API-теста без вызова модели: хелперы и типовые негативные тесты.
+    """
+    try:
+        parser = parser_for_request(req)
+        ep = parser.find_endpoint(req.endpoint_path, req.method)
 
         if not ep:
             raise HTTPException(
@@ -37,29 +85,57 @@ async def generate_api_test_handler(req: ApiTestRequest):
                 detail=f"Эндпоинт {req.method} {req.endpoint_path} не найден."
             )
 
-        payload = build_llm_payload(parser, ep)
-        code = generate_api_test(payload)
-        validation = validate_pytest_api(code)
-        return {"code": code, "validation": validation}
+        skeleton = build_skeleton(build_llm_payload(parser, ep))
+        result = {"code": skeleton.code, "tests": skeleton.tests, "validation": validate_pytest_api(skeleton.code)}
+        if req.verify:
+            result["execution"] = await verify_api_test(parser, skeleton.code)
+        return result
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка построения каркаса теста: {str(e)}"
+        )
+
+@router.post("/llm/generate-api-test/stream")
+async def stream_api_test_handler(req: ApiTestRequest):
+    """
+    Потоковая генерация API-теста: SSE-события token, в конце result с валидацией.
+    """
+    try:
+        parser = parser_for_request(req)
+        ep = parser.find_endpoint(req.endpoint_path, req.method)
+
+        if not ep:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Эндпоинт {req.method} {req.endpoint_path} не найден."
+            )
+
+        payload = build_llm_payload(
+            parser, ep, compact=req.compact, token_budget=req.token_budget
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Ошибка генерации теста: {str(e)}"
         )
 
+    chunks, finalize = stream_api_test(payload, use_cache=req.use_cache, skeleton=req.skeleton)
+    return StreamingResponse(
+        stream_generation(chunks, validate_pytest_api, finalize),
+        media_type="text/event-stream",
+    )
+
 @router.post("/llm/generate-api-manual-test")
 async def generate_api_manual_test_handler(req: ApiTestRequest):
     try:
-        parser = OpenAPIParser.load_from_string(req.openapi)
-        endpoints = parser.parse_endpoints()
-
-        ep = next(
-            (e for e in endpoints
-             if e.path == req.endpoint_path
-             and e.method == req.method.upper()),
-            None
-        )
+        parser = parser_for_request(req)
+        ep = parser.find_endpoint(req.endpoint_path, req.method)
 
         if not ep:
             raise HTTPException(
@@ -67,12 +143,25 @@ async def generate_api_manual_test_handler(req: ApiTestRequest):
                 detail=f"Эндпоинт {req.method} {req.endpoint_path} не найден."
             )
 
-        payload = build_llm_payload(parser, ep, mode="manual")
+        payload = build_llm_payload(
+            parser, ep, mode="manual", compact=req.compact, token_budget=req.token_budget
+        )
+
+        if req.repair:
+            result = await generate_with_repair(
+                lambda: generate_api_manual_test(payload, use_cache=req.use_cache),
+                validate_manual_test,
+            )
+            return {**result, "payload_stats": payload.get("compaction")}
 
-        code = generate_api_manual_test(payload)
+        code = await generate_api_manual_test(payload, use_cache=req.use_cache)
         validation = validate_manual_test(code)
-        return {"code": code, "validation": validation}
+        return {"code": code, "validation": validation, "payload_stats": payload.get("compaction")}
 
+    except HTTPException:
+        raise
+    except LLMOverloadedError as e:
+        raise HTTPException(status_code=503, detail=f"Модель перегружена, повторите позже: {e}")
     except Exception as e:
         raise HTTPException(
             status_code=500,
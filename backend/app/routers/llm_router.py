@@ -1,11 +1,38 @@
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-from app.services.llm_service import generate_allure_manual_testcase
-from app.services.ui_e2e_test_generator import generate_ui_e2e_test
+from app.services.llm_service import (
+    generate_allure_manual_testcase,
+    generate_allure_manual_candidates,
+    inflight_stats,
+    stream_allure_manual_testcase,
+)
+from app.services.ui_e2e_test_generator import generate_ui_e2e_test, stream_ui_e2e_test
+from app.services.sse import stream_generation
+from app.routers.spec_router import SpecSource, parser_for_request
+from app.services.llm_payload_builder import build_llm_payload
+from app.services.api_test_generator import generate_api_test, generate_api_test_candidates
+from app.services.bulk_runner import (
+    deduplicate_results,
+    run_bulk,
+    run_candidates,
+    run_until_distinct,
+    top_results,
+    validate_results,
+)
+from app.services.bulk_jobs import get_bulk_queue
+from app.services.llm_cache import response_cache
+from app.services.prompt_templates import prompt_registry
+from app.services.llm_scheduler import LLMOverloadedError
+from app.services.llm_service import get_scheduler
+from app.services.repair import generate_with_repair, repair_stats
 from app.services.test_validators import (
     validate_manual_test,
     validate_e2e_test,
+    validate_pytest_api,
 )
 router = APIRouter()
 
@@ -17,9 +44,13 @@ class ManualTestRequest(BaseModel):
         min_length=1,
         max_length=20000,
     )
+    use_cache: bool = Field(True, description="False — не брать ответ из кэша, всегда вызывать модель")
+    repair: bool = Field(False, description="Исправлять код по ошибкам валидатора (до REPAIR_MAX_ATTEMPTS вызовов)")
 
 class UiE2ERequest(BaseModel):
     requirements: str
+    use_cache: bool = True
+    repair: bool = False
 
 
 @router.post("/llm/manual-test")
@@ -28,80 +59,251 @@ async def generate_manual_test(request: ManualTestRequest):
     Новая ручка — генерация manual-теста в формате Allure TestOps as Code.
     """
     try:
-        code = generate_allure_manual_testcase(request.requirements)
+        if request.repair:
+            return await generate_with_repair(
+                lambda: generate_allure_manual_testcase(request.requirements, use_cache=request.use_cache),
+                validate_manual_test,
+            )
+        code = await generate_allure_manual_testcase(request.requirements, use_cache=request.use_cache)
         validation = validate_manual_test(code)
         return {"code": code, "validation": validation}
+    except LLMOverloadedError as e:
+        raise HTTPException(status_code=503, detail=f"Модель перегружена, повторите позже: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка модели: {str(e)}")
 
 @router.post("/llm/generate-ui-e2e-test")
 async def generate_ui_e2e_test_handler(req: UiE2ERequest):
     try:
-        code = generate_ui_e2e_test(req.requirements)
+        if req.repair:
+            return await generate_with_repair(
+                lambda: generate_ui_e2e_test(req.requirements, use_cache=req.use_cache),
+                validate_e2e_test,
+            )
+        code = await generate_ui_e2e_test(req.requirements, use_cache=req.use_cache)
         validation = validate_e2e_test(code)
         return {"code": code, "validation": validation}
+    except LLMOverloadedError as e:
+        raise HTTPException(status_code=503, detail=f"Модель перегружена, повторите позже: {e}")
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Ошибка генерации e2e теста: {str(e)}"
         )
+@router.post("/llm/manual-test/stream")
+async def stream_manual_test(request: ManualTestRequest):
+    """
+    Потоковая генерация manual-теста: SSE-события token, в конце result с валидацией.
+    """
+    chunks = stream_allure_manual_testcase(request.requirements, use_cache=request.use_cache)
+    return StreamingResponse(
+        stream_generation(chunks, validate_manual_test),
+        media_type="text/event-stream",
+    )
+
+@router.post("/llm/generate-ui-e2e-test/stream")
+async def stream_ui_e2e_test_handler(req: UiE2ERequest):
+    chunks = stream_ui_e2e_test(req.requirements, use_cache=req.use_cache)
+    return StreamingResponse(
+        stream_generation(chunks, validate_e2e_test),
+        media_type="text/event-stream",
+    )
+
+@router.get("/llm/cache/stats")
+async def llm_cache_stats():
+    """
+    Счётчики кэша ответов модели (hits / misses / hit_rate) и число
+    запросов, присоединившихся к уже идущему такому же вызову (coalesced).
+    """
+    return {**response_cache.stats(), **inflight_stats()}
+
+@router.get("/llm/scheduler/stats")
+async def llm_scheduler_stats():
+    """
+    Вызовы модели, повторы, ответы 429, время ожидания лимитов и очереди по полосам.
+    """
+    return get_scheduler().stats()
+
+@router.get("/llm/prompts")
+async def llm_prompts():
+    """
+    Зарегистрированные шаблоны промптов: версии, активная версия, хэш системного префикса.
+    """
+    return prompt_registry.list()
+
+@router.get("/llm/repair/stats")
+async def llm_repair_stats():
+    """
+    Сколько вызовов модели ушло на результат в режиме repair.
+    """
+    return repair_stats.snapshot()
+
 # Новые модели запросов для массовой генерации
 class BulkManualTestRequest(BaseModel):
     requirements: str
     count: int = Field(15, ge=1, le=50, description="Количество тестов для генерации")
+    max_concurrency: Optional[int] = Field(
+        None, ge=1, le=50,
+        description="Максимум одновременных вызовов модели (по умолчанию BULK_MAX_CONCURRENCY)",
+    )
+    repair: bool = Field(False, description="Исправлять код по ошибкам валидатора (до REPAIR_MAX_ATTEMPTS вызовов)")
+    top_k: Optional[int] = Field(
+        None, ge=1, le=50,
+        description="Сгенерировать count кандидатов и вернуть k лучших по валидатору",
+    )
+    background: bool = Field(False, description="Поставить в очередь и сразу вернуть job_id")
+    dedup: bool = Field(False, description="Убрать почти одинаковые тесты и вернуть кластеры")
+    distinct: Optional[int] = Field(
+        None, ge=1, le=50,
+        description="Генерировать, пока не наберётся столько непохожих тестов (вместо count)",
+    )
 
-class BulkApiTestRequest(BaseModel):
-    openapi: str
+class BulkApiTestRequest(SpecSource):
     endpoint_path: str
     method: str = "GET"
     count: int = Field(15, ge=1, le=50, description="Количество тестов для генерации")
+    max_concurrency: Optional[int] = Field(
+        None, ge=1, le=50,
+        description="Максимум одновременных вызовов модели (по умолчанию BULK_MAX_CONCURRENCY)",
+    )
+    repair: bool = Field(False, description="Исправлять код по ошибкам валидатора (до REPAIR_MAX_ATTEMPTS вызовов)")
+    top_k: Optional[int] = Field(
+        None, ge=1, le=50,
+        description="Сгенерировать count кандидатов и вернуть k лучших по валидатору",
+    )
+    compact: bool = Field(False, description="Сжатый payload: без описаний и примеров, минифицированный JSON")
+    token_budget: Optional[int] = Field(None, ge=100, description="Бюджет токенов на payload (включает compact)")
+    skeleton: bool = Field(False, description="Типовые тесты и хелперы строить локально, у модели просить только сценарии")
+    background: bool = Field(False, description="Поставить в очередь и сразу вернуть job_id")
+    dedup: bool = Field(False, description="Убрать почти одинаковые тесты и вернуть кластеры")
+    distinct: Optional[int] = Field(
+        None, ge=1, le=50,
+        description="Генерировать, пока не наберётся столько непохожих тестов (вместо count)",
+    )
+
+def check_bulk_options(request) -> None:
+    if request.top_k and request.repair:
+        raise HTTPException(status_code=400, detail="top_k и repair нельзя использовать вместе")
+    if request.top_k and request.background:
+        raise HTTPException(status_code=400, detail="top_k и background нельзя использовать вместе")
+    if request.background and (request.dedup or request.distinct):
+        raise HTTPException(status_code=400, detail="dedup и distinct недоступны в режиме background")
+    if request.distinct and request.top_k:
+        raise HTTPException(status_code=400, detail="distinct и top_k нельзя использовать вместе")
+
+def bulk_response(results: list, request, **extra) -> dict:
+    """
+    Ответ bulk-ручки: с dedup — без почти одинаковых тестов и с их кластерами,
+    с top_k — только k лучших.
+    """
+    response = {"generated_tests": len(results), **extra}
+    if request.dedup:
+        results, clusters = deduplicate_results(results)
+        response.update(distinct_tests=len(results), clusters=clusters)
+    if request.top_k:
+        results = top_results(results, request.top_k)
+    return {**response, "results": results}
 
 @router.post("/llm/bulk-manual-tests")
 async def generate_bulk_manual_tests(request: BulkManualTestRequest):
     """
-    Генерирует N ручных тестов для калькулятора (циклический вызов).
+    Генерирует N ручных тестов для калькулятора (параллельно, с ограничением).
     """
-    results = []
-    for i in range(request.count):
-        try:
-            code = generate_allure_manual_testcase(request.requirements)
-            validation = validate_manual_test(code)
-            results.append({"test_number": i+1, "code": code, "validation": validation})
-        except Exception as e:
-            results.append({"test_number": i+1, "error": str(e)})
-    return {"generated_tests": len(results), "results": results}
+    check_bulk_options(request)
+    if request.background:
+        return get_bulk_queue().submit(
+            "manual", {"requirements": request.requirements, "repair": request.repair}, request.count
+        )
+    if request.top_k:
+        results = await run_candidates(
+            request.count,
+            lambda n: generate_allure_manual_candidates(request.requirements, n),
+            request.max_concurrency,
+        )
+        await validate_results(results, validate_manual_test)
+        return bulk_response(results, request)
+
+    # Кэш не используем: в bulk-режиме нужны разные варианты тестов
+    async def generate_one(test_number: int) -> dict:
+        if request.repair:
+            return await generate_with_repair(
+                lambda: generate_allure_manual_testcase(request.requirements, use_cache=False),
+                validate_manual_test,
+            )
+        code = await generate_allure_manual_testcase(request.requirements, use_cache=False)
+        return {"code": code}
+
+    if request.distinct:
+        return await run_until_distinct(
+            request.distinct, generate_one, validate_manual_test, request.max_concurrency
+        )
+
+    results = await run_bulk(request.count, generate_one, request.max_concurrency)
+    await validate_results(results, validate_manual_test)
+    return bulk_response(results, request)
 
 @router.post("/llm/bulk-api-tests")
 async def generate_bulk_api_tests(request: BulkApiTestRequest):
     """
     Генерирует N API-тестов для указанного эндпоинта.
     """
-    from backend.app.services.openapi_parser import OpenAPIParser
-    from backend.app.services.llm_payload_builder import build_llm_payload
-    from backend.app.services.api_test_generator import generate_api_test
-    from backend.app.services.test_validators import validate_pytest_api
-
-    results = []
     try:
-        parser = OpenAPIParser.load_from_string(request.openapi)
-        endpoints = parser.parse_endpoints()
-        ep = next(
-            (e for e in endpoints
-             if e.path == request.endpoint_path
-             and e.method == request.method.upper()),
-            None
-        )
+        check_bulk_options(request)
+        parser = parser_for_request(request)
+        ep = parser.find_endpoint(request.endpoint_path, request.method)
         if not ep:
             raise HTTPException(status_code=404, detail="Эндпоинт не найден")
 
-        payload = build_llm_payload(parser, ep)
-        for i in range(request.count):
-            try:
-                code = generate_api_test(payload)
-                validation = validate_pytest_api(code)
-                results.append({"test_number": i+1, "code": code, "validation": validation})
-            except Exception as e:
-                results.append({"test_number": i+1, "error": str(e)})
-        return {"generated_tests": len(results), "results": results}
+        payload = build_llm_payload(
+            parser, ep, compact=request.compact, token_budget=request.token_budget
+        )
+
+        if request.background:
+            # В задаче храним готовый payload: после перезапуска спеки в памяти уже может не быть
+            return get_bulk_queue().submit(
+                "api", {"payload": payload, "repair": request.repair, "skeleton": request.skeleton}, request.count
+            )
+
+        if request.top_k:
+            results = await run_candidates(
+                request.count,
+                lambda n: generate_api_test_candidates(payload, n, skeleton=request.skeleton),
+                request.max_concurrency,
+            )
+            await validate_results(results, validate_pytest_api)
+            return bulk_response(results, request, payload_stats=payload.get("compaction"))
+
+        async def generate_one(test_number: int) -> dict:
+            if request.repair:
+                return await generate_with_repair(
+                    lambda: generate_api_test(payload, use_cache=False, skeleton=request.skeleton),
+                    validate_pytest_api,
+                )
+            code = await generate_api_test(payload, use_cache=False, skeleton=request.skeleton)
+            return {"code": code}
+
+        if request.distinct:
+            return {
+                **await run_until_distinct(
+                    request.distinct, generate_one, validate_pytest_api, request.max_concurrency
+                ),
+                "payload_stats": payload.get("compaction"),
+            }
+
+        results = await run_bulk(request.count, generate_one, request.max_concurrency)
+        await validate_results(results, validate_pytest_api)
+        return bulk_response(results, request, payload_stats=payload.get("compaction"))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
+
+@router.get("/llm/bulk-jobs/{job_id}")
+async def get_bulk_job(job_id: str):
+    """
+    Прогресс bulk-задачи (background) и уже готовые тесты.
+    """
+    job = get_bulk_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Задача {job_id} не найдена.")
+    return job
@@ -0,0 +1,39 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.llm_cache import response_cache
+from app.services.llm_service import get_scheduler, inflight_stats
+from app.services.metrics import registry
+
+router = APIRouter()
+
+
+def _llm_cache_values():
+    stats = response_cache.stats()
+    return {
+        ("hits",): stats["hits"],
+        ("misses",): stats["misses"],
+        ("hit_rate",): stats["hit_rate"],
+        ("coalesced",): inflight_stats()["coalesced"],
+    }
+
+
+def _scheduler_values():
+    stats = get_scheduler().stats()
+    values = {(f"waiting_{lane}",): count for lane, count in stats["waiting"].items()}
+    values[("active",)] = stats["active"]
+    values[("retries",)] = stats["retries"]
+    values[("rate_limited",)] = stats["rate_limited"]
+    return values
+
+
+registry.gauge("testgen_llm_cache", "Кэш ответов модели: попадания, промахи, hit rate", _llm_cache_values, ("value",))
+registry.gauge("testgen_llm_scheduler", "Планировщик вызовов модели: очереди и повторы", _scheduler_values, ("value",))
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Метрики в формате Prometheus.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,101 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field, model_validator
+
+from app.services.openapi_parser import OpenAPIParser
+from app.services.spec_store import (
+    SpecNotFoundError,
+    SpecTooLargeError,
+    resolve_parser,
+    spec_store,
+)
+
+router = APIRouter()
+
+
+class SpecUploadRequest(BaseModel):
+    openapi: str = Field(..., min_length=1, description="Текст OpenAPI-спеки (JSON или YAML)")
+
+
+class SpecSource(BaseModel):
+    """
+    Источник спеки для запросов генерации: либо сам текст, либо spec_id
+    ранее загруженной через POST /specs спеки.
+    """
+    openapi: Optional[str] = None
+    spec_id: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if not self.openapi and not self.spec_id:
+            raise ValueError("Нужно передать openapi или spec_id")
+        return self
+
+
+def parser_for_request(req: SpecSource) -> OpenAPIParser:
+    try:
+        return resolve_parser(req.openapi, req.spec_id)
+    except SpecNotFoundError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Спека {req.spec_id} не найдена. Загрузите её заново через POST /specs."
+        )
+
+
+class SpecDiffRequest(BaseModel):
+    old: SpecSource
+    new: SpecSource
+
+
+@router.post("/specs/diff")
+async def diff_specs(req: SpecDiffRequest):
+    """
+    Сравнивает две версии спеки по отпечаткам эндпоинтов: что добавлено,
+    удалено, изменилось. Перегенерировать нужно только added и changed.
+    """
+    try:
+        diff = parser_for_request(req.new).diff(parser_for_request(req.old))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Не удалось сравнить спеки: {str(e)}")
+    return {**diff, "counts": {kind: len(keys) for kind, keys in diff.items()}}
+
+
+@router.post("/specs")
+async def upload_spec(req: SpecUploadRequest):
+    """
+    Загружает и парсит спеку один раз, возвращает spec_id для ручек генерации.
+    """
+    try:
+        stored = spec_store.add(req.openapi)
+    except SpecTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Не удалось разобрать спеку: {str(e)}")
+    return stored.info()
+
+
+@router.get("/specs/{spec_id}")
+async def get_spec(spec_id: str):
+    try:
+        stored = spec_store.get(spec_id)
+    except SpecNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Спека {spec_id} не найдена.")
+    return {
+        **stored.info(),
+        "endpoints_list": [
+            {"method": ep.method, "path": ep.path, "summary": ep.summary}
+            for ep in stored.parser.iter_endpoints()
+        ],
+    }
+
+
+@router.delete("/specs/{spec_id}")
+async def delete_spec(spec_id: str):
+    try:
+        spec_store.remove(spec_id)
+    except SpecNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Спека {spec_id} не найдена.")
+    return {"deleted": spec_id}
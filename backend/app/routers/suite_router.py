@@ -0,0 +1,96 @@
+from typing import Literal, Optional, Union
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from pydantic import Field
+
+from app.routers.spec_router import SpecSource, parser_for_request
+from app.services.sse import format_sse
+from app.services.suite_jobs import SuiteJob, StoredSuiteJob, suite_jobs
+
+router = APIRouter()
+
+
+class SuiteJobRequest(SpecSource):
+    mode: Literal["auto", "manual"] = "auto"
+    max_concurrency: Optional[int] = Field(
+        None, ge=1, le=50,
+        description="Максимум одновременно генерируемых эндпоинтов (по умолчанию BULK_MAX_CONCURRENCY)",
+    )
+    compact: bool = False
+    token_budget: Optional[int] = Field(None, ge=100, description="Бюджет токенов на payload одного эндпоинта")
+    incremental: bool = Field(
+        False, description="Переиспользовать тесты эндпоинтов, не изменившихся с прошлой генерации",
+    )
+    skeleton: bool = Field(
+        False, description="Типовые API-тесты строить локально, у модели просить только сценарии (mode=auto)",
+    )
+
+
+def get_job_or_404(job_id: str) -> Union[SuiteJob, StoredSuiteJob]:
+    job = suite_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Задача {job_id} не найдена.")
+    return job
+
+
+@router.post("/llm/suite-jobs")
+async def create_suite_job(req: SuiteJobRequest):
+    """
+    Запускает генерацию тестов по всем эндпоинтам спеки в фоне.
+    Прогресс — GET /llm/suite-jobs/{job_id} или SSE .../events, результат — .../archive.
+    """
+    try:
+        parser = parser_for_request(req)
+        job = SuiteJob(
+            parser,
+            mode=req.mode,
+            max_concurrency=req.max_concurrency,
+            compact=req.compact,
+            token_budget=req.token_budget,
+            incremental=req.incremental,
+            skeleton=req.skeleton,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Не удалось разобрать спеку: {str(e)}")
+
+    suite_jobs.submit(job)
+    return job.progress()
+
+
+@router.get("/llm/suite-jobs/{job_id}")
+async def get_suite_job(job_id: str):
+    return get_job_or_404(job_id).summary()
+
+
+@router.get("/llm/suite-jobs/{job_id}/events")
+async def stream_suite_job(job_id: str):
+    """
+    SSE-поток прогресса: событие progress на каждое изменение, в конце — done.
+    """
+    job = get_job_or_404(job_id)
+
+    async def events():
+        version = -1
+        while True:
+            version = await job.wait_for_change(version, timeout=15)
+            if job.finished:
+                yield format_sse("done", job.summary())
+                return
+            yield format_sse("progress", job.progress())
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@router.get("/llm/suite-jobs/{job_id}/archive")
+async def download_suite_archive(job_id: str):
+    job = get_job_or_404(job_id)
+    if not job.finished:
+        raise HTTPException(status_code=409, detail="Задача ещё выполняется.")
+    return Response(
+        content=job.archive(),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="tests_{job.id}.zip"'},
+    )
@@ -1,23 +1,20 @@
-import json
 from typing import Dict, Any
 
-from app.services.llm_service import call_llm
+from app.services.payload_compactor import serialize_payload
+from app.services.llm_service import call_llm_async
+from app.services.metrics import timed
+from app.services.prompt_templates import PromptTemplate, RenderedPrompt, prompt_registry
 
 
-def prepare_manual_prompt(payload: Dict[str, Any]) -> str:
-    pretty_json = json.dumps(payload, indent=2, ensure_ascii=False)
-
-    return f"""
+API_MANUAL_TEST_TEMPLATE = prompt_registry.register(PromptTemplate(
+    name="api_manual_test",
+    version="2",
+    system="""
 Ты — Senior QA Engineer, который пишет manual-тесты в формате
 Allure TestOps as Code (Python).
 
-Ниже — структурированная информация об API-эндпоинте:
-
---- BEGIN ENDPOINT JSON ---
-{pretty_json}
---- END ENDPOINT JSON ---
-
-Твоя задача — сгенерировать ручной тест-кейс (manual test)
+В сообщении пользователя — структурированная информация об API-эндпоинте (JSON).
+Твоя задача — сгенерировать по ней ручной тест-кейс (manual test)
 в формате Python, совместимый с Allure TestOps.
 
 ‼ ТРЕБОВАНИЯ:
@@ -50,14 +47,25 @@ class Test<Имя>Manual:
 6. Ориентируйся на fields/request/response из payload.
 7. Если в path есть UUID-параметры — упомяни это в Arrange.
 8. Название теста должно отражать operation_id или summary.
+""",
+    user="""
+Сгенерируй корректный manual-тест для этого API-эндпоинта:
 
-Сгенерируй корректный manual-тест.
-"""
+--- BEGIN ENDPOINT JSON ---
+{payload_json}
+--- END ENDPOINT JSON ---
+""",
+))
+
+
+@timed("prompt_render")
+def prepare_manual_prompt(payload: Dict[str, Any]) -> RenderedPrompt:
+    return prompt_registry.get("api_manual_test").render(payload_json=serialize_payload(payload))
 
 
-def generate_api_manual_test(payload: Dict[str, Any]) -> str:
+async def generate_api_manual_test(payload: Dict[str, Any], use_cache: bool = True) -> str:
     prompt = prepare_manual_prompt(payload)
-    code = call_llm(prompt)
+    code = await call_llm_async(prompt, use_cache=use_cache)
     return code.strip()
 
 
@@ -1,20 +1,20 @@
-import json
-from typing import Dict, Any
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
-from app.services.llm_service import call_llm
+from app.services.api_test_skeleton import Skeleton, build_skeleton, merge_with_skeleton
+from app.services.payload_compactor import serialize_payload
+from app.services.llm_service import call_llm_async, call_llm_candidates_async, stream_llm
+from app.services.metrics import timed
+from app.services.prompt_templates import PromptTemplate, RenderedPrompt, prompt_registry
 
 
-def prepare_prompt(payload: Dict[str, Any]) -> str:
-    pretty_json = json.dumps(payload, indent=2, ensure_ascii=False)
-
-    return f"""
-Ты — Senior QA Automation Engineer. 
+API_TEST_TEMPLATE = prompt_registry.register(PromptTemplate(
+    name="api_test",
+    version="2",
+    system="""
+Ты — Senior QA Automation Engineer.
 Твоя задача — сгенерировать корректный Python-код автотестов на pytest,
-который проверяет API-эндпоинт по следующей структурированной информации:
-
---- BEGIN ENDPOINT JSON ---
-{pretty_json}
---- END ENDPOINT JSON ---
+который проверяет API-эндпоинт по структурированной информации (JSON эндпоинта)
+из сообщения пользователя.
 
 ‼ОБЯЗАТЕЛЬНЫЕ ТРЕБОВАНИЯ:
 
@@ -34,7 +34,7 @@ def prepare_prompt(payload: Dict[str, Any]) -> str:
 5. Всегда добавляй фикстуру:
     @pytest.fixture
     def auth_header():
-        return {{"Authorization": "Bearer TEST_TOKEN"}}
+        return {"Authorization": "Bearer TEST_TOKEN"}
 
 6. Позитивный тест:
     - test_<operation_id>_success
@@ -67,21 +67,138 @@ def prepare_prompt(payload: Dict[str, Any]) -> str:
         - assert isinstance(value, str)
 
 10. Код должен быть валидным, компилироваться и полностью соответствовать данным из payload.
+""",
+    user="""
+Сгенерируй итоговый Python-код автотестов для этого API-эндпоинта:
+
+--- BEGIN ENDPOINT JSON ---
+{payload_json}
+--- END ENDPOINT JSON ---
+""",
+))
+
+
+API_TEST_SCENARIO_TEMPLATE = prompt_registry.register(PromptTemplate(
+    name="api_test_scenario",
+    version="1",
+    system="""
+Ты — Senior QA Automation Engineer.
+Файл pytest-тестов для API-эндпоинта уже начат: импорты, фикстура, хелперы
+и типовые негативные тесты сгенерированы шаблоном. Допиши только тесты
+сценария по JSON эндпоинта из сообщения пользователя.
+
+‼ОБЯЗАТЕЛЬНЫЕ ТРЕБОВАНИЯ:
+
+1. Выводи ТОЛЬКО Python-код, без Markdown и без ```python.
+2. Не повторяй импорты, фикстуры, константы, хелперы и тесты из списка готового —
+   они уже в файле, используй их.
+3. Используй AAA-паттерн: комментарии # Arrange, # Act, # Assert.
+4. Позитивный тест test_<operation_id>_success:
+    - url = build_url(), response = send(url, auth_header)
+    - проверка успешного status_code и структуры response_schema
+    - assert_enum_fields / assert_uuid_fields для объекта ответа
+      (для списка — для каждого элемента), если они есть в списке готового
+5. Другие сценарии по описанию эндпоинта и коды из error_codes, которых нет
+   в списке готового, — с assert_error_shape, если он есть.
+""",
+    user="""
+Уже готово в файле:
+{skeleton_summary}
+
+Допиши тесты сценария для этого API-эндпоинта:
+
+--- BEGIN ENDPOINT JSON ---
+{payload_json}
+--- END ENDPOINT JSON ---
+""",
+))
+
+# Поля payload, которые целиком покрыты каркасом и модели не нужны
+_SKELETON_COVERED = ("uuid_path_params", "negative_cases", "error_schemas", "has_exceptions")
 
-Сгенерируй итоговый Python-код автотестов для данного API.
-"""
 
+@timed("prompt_render")
+def prepare_prompt(payload: Dict[str, Any]) -> RenderedPrompt:
+    return prompt_registry.get("api_test").render(payload_json=serialize_payload(payload))
 
-def generate_api_test(payload: Dict[str, Any]) -> str:
+
+def scenario_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Вызывает LLM для генерации pytest кода.
+    Payload для модели, когда каркас уже есть: без негативных кейсов и схем
+    ошибок (остаются только их коды), без enum/uuid полей — их проверяют хелперы.
     """
+    trimmed = {key: value for key, value in payload.items() if key not in _SKELETON_COVERED}
+    trimmed["error_codes"] = sorted(payload.get("error_schemas") or {})
+    fields_meta = payload.get("fields_meta")
+    if fields_meta:
+        trimmed["fields_meta"] = {
+            key: value for key, value in fields_meta.items() if key not in ("enum_fields", "uuid_fields")
+        }
+    return trimmed
+
+
+@timed("prompt_render")
+def prepare_scenario_prompt(payload: Dict[str, Any], skeleton: Skeleton) -> RenderedPrompt:
+    return prompt_registry.get("api_test_scenario").render(
+        skeleton_summary=skeleton.summary(),
+        payload_json=serialize_payload(scenario_payload(payload)),
+    )
+
+
+async def generate_api_test(payload: Dict[str, Any], use_cache: bool = True, skeleton: bool = False) -> str:
+    """
+    Вызывает LLM для генерации pytest кода. С skeleton=True типовая часть
+    строится локально, а модель пишет только тесты сценария.
+    """
+    if skeleton:
+        prepared = build_skeleton(payload)
+        code = await call_llm_async(prepare_scenario_prompt(payload, prepared), use_cache=use_cache)
+        return merge_with_skeleton(prepared.code, code.strip()).strip()
+
     prompt = prepare_prompt(payload)
-    code = call_llm(prompt)
+    code = await call_llm_async(prompt, use_cache=use_cache)
 
     return code.strip()
 
 
+async def generate_api_test_candidates(payload: Dict[str, Any], n: int, skeleton: bool = False) -> List[str]:
+    """
+    n вариантов pytest-кода за один запрос к модели (где поддерживается n).
+    """
+    if skeleton:
+        prepared = build_skeleton(payload)
+        codes = await call_llm_candidates_async(prepare_scenario_prompt(payload, prepared), n)
+        return [merge_with_skeleton(prepared.code, code.strip()).strip() for code in codes]
+    return await call_llm_candidates_async(prepare_prompt(payload), n)
+
+
+async def _stream_with_skeleton(prepared: Skeleton, payload: Dict[str, Any], use_cache: bool) -> AsyncIterator[str]:
+    yield prepared.code + "\n\n"
+    async for chunk in stream_llm(prepare_scenario_prompt(payload, prepared), use_cache=use_cache):
+        yield chunk
+
+
+def stream_api_test(
+    payload: Dict[str, Any], use_cache: bool = True, skeleton: bool = False
+) -> Tuple[AsyncIterator[str], Optional[Callable[[str], str]]]:
+    """
+    Потоковый вариант generate_api_test: куски кода по мере генерации и
+    функция, собирающая из всего потока итоговый код (None — поток как есть).
+    Каркас отдаётся первым куском, сразу, код модели дописывается за ним;
+    итоговый код — merge_with_skeleton, как в generate_api_test.
+    """
+    if not skeleton:
+        return stream_llm(prepare_prompt(payload), use_cache=use_cache), None
+
+    prepared = build_skeleton(payload)
+
+    def finalize(streamed: str) -> str:
+        model_code = streamed[len(prepared.code):] if streamed.startswith(prepared.code) else streamed
+        return merge_with_skeleton(prepared.code, model_code.strip()).strip()
+
+    return _stream_with_skeleton(prepared, payload, use_cache), finalize
+
+
 def compose_test_file(test_name: str, tests_code: str) -> str:
     """
     Собирает итоговый .py файл для эндпоинта.
@@ -0,0 +1,230 @@
+import ast
+import os
+import re
+from typing import Any, Dict, List, NamedTuple
+
+from app.services.mock_api_server import MISSING_UUID, synthesize_value
+
+# Базовый URL в сгенерированных тестах (в песочнице запросы всё равно уходят на mock)
+API_TEST_BASE_URL = os.getenv("API_TEST_BASE_URL", "https://api.example.com")
+
+INVALID_UUID = "not-a-uuid"
+
+
+class Skeleton(NamedTuple):
+    """
+    Детерминированная часть файла тестов: код, имена готовых тестов
+    и хелперы, которыми должна пользоваться модель.
+    """
+    code: str
+    tests: List[str]
+    helpers: List[str]
+
+    def summary(self) -> str:
+        lines = [f"- {helper}" for helper in self.helpers]
+        lines += [f"- тест {name}" for name in self.tests]
+        return "\n".join(lines)
+
+
+def _identifier_part(text: str) -> str:
+    name = re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", text)
+    return re.sub(r"[^0-9a-zA-Z]+", "_", name).strip("_").lower()
+
+
+def test_prefix(payload: Dict[str, Any]) -> str:
+    base = payload.get("operation_id") or f"{payload['method']}_{payload['path']}"
+    return _identifier_part(base) or "endpoint"
+
+
+def _params_call(values: Dict[str, str]) -> str:
+    # Имена параметров из спеки — только строковые литералы: {vm-id}, class и т.п.
+    # не должны ни ломать код, ни становиться им
+    return f"build_url(**{values!r})" if values else "build_url()"
+
+
+def _error_shape(schema: Dict[str, Any]) -> Dict[str, List[str]]:
+    properties = schema.get("properties") or {}
+    # Обязательные поля из схемы; если их нет — message и code, как в остальных тестах
+    required = schema.get("required") or [name for name in ("message", "code") if name in properties]
+    strings = [name for name, sub in properties.items() if isinstance(sub, dict) and sub.get("type") == "string"]
+    return {"required": list(required), "strings": strings}
+
+
+def _function(name: str, arrange: List[str], act: List[str], asserts: List[str], fixture: bool = True) -> str:
+    args = "auth_header" if fixture else ""
+    body = ["    # Arrange", *arrange, "    # Act", *act, "    # Assert", *asserts]
+    return f"def {name}({args}):\n" + "\n".join(body)
+
+
+def build_skeleton(payload: Dict[str, Any]) -> Skeleton:
+    """
+    Всё, что выводится из payload механически: фикстура auth_header, хелперы
+    запроса, проверки формы ошибок, enum и uuid полей, тесты на невалидный UUID,
+    404 и 401. Модель дописывает только сценарные тесты.
+    """
+    prefix = test_prefix(payload)
+    path_params = [p for p in payload.get("parameters", []) if isinstance(p, dict) and p.get("in") == "path"]
+    uuid_params = list(payload.get("uuid_path_params") or [])
+    fields_meta = payload.get("fields_meta") or {}
+    enum_fields = fields_meta.get("enum_fields") or {}
+    uuid_fields = fields_meta.get("uuid_fields") or []
+    error_schemas = payload.get("error_schemas") or {}
+    negative = payload.get("negative_cases") or {}
+
+    valid_params = {p["name"]: synthesize_value(p.get("schema")) or "1" for p in path_params}
+    request_body = synthesize_value(payload.get("request_schema")) if payload.get("request_schema") else None
+
+    header = [
+        "import re",
+        "",
+        "import httpx",
+        "import pytest",
+        "",
+        f"BASE_URL = {API_TEST_BASE_URL!r}",
+        f"PATH = {payload['path']!r}",
+        f"METHOD = {payload['method'].upper()!r}",
+        f"VALID_PATH_PARAMS = {valid_params!r}",
+        f"REQUEST_BODY = {request_body!r}",
+        'UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")',
+    ]
+    helpers = [
+        "фикстура auth_header",
+        "константы BASE_URL, PATH, METHOD, VALID_PATH_PARAMS, REQUEST_BODY, UUID_RE",
+        "build_url(**path_params) -> str — URL с валидными path-параметрами, можно переопределить",
+        "send(url, headers, json=REQUEST_BODY) -> httpx.Response — запрос методом METHOD",
+    ]
+    blocks = [
+        '@pytest.fixture\ndef auth_header():\n    return {"Authorization": "Bearer TEST_TOKEN"}',
+        "def build_url(**path_params):\n"
+        "    url = PATH\n"
+        "    for name, value in {**VALID_PATH_PARAMS, **path_params}.items():\n"
+        '        url = url.replace("{" + name + "}", str(value))\n'
+        "    return BASE_URL + url",
+        "def send(url, headers, json=REQUEST_BODY):\n"
+        "    return httpx.request(METHOD, url, headers=headers, json=json)",
+    ]
+
+    if error_schemas:
+        shapes = {code: _error_shape(schema) for code, schema in error_schemas.items()}
+        header.append(f"ERROR_SHAPES = {shapes!r}")
+        helpers.append("assert_error_shape(status_code, body) — форма ошибки по error_schemas")
+        blocks.append(
+            "def assert_error_shape(status_code, body):\n"
+            "    shape = ERROR_SHAPES.get(str(status_code))\n"
+            "    if shape is None:\n"
+            "        return\n"
+            "    assert isinstance(body, dict)\n"
+            '    for field in shape["required"]:\n'
+            "        assert field in body\n"
+            '    for field in shape["strings"]:\n'
+            "        if field in body:\n"
+            "            assert isinstance(body[field], str)"
+        )
+    if enum_fields:
+        header.append(f"ENUM_FIELDS = {enum_fields!r}")
+        helpers.append("assert_enum_fields(item) — значения enum-полей объекта ответа")
+        blocks.append(
+            "def assert_enum_fields(item):\n"
+            "    for field, allowed in ENUM_FIELDS.items():\n"
+            "        if field in item:\n"
+            "            assert item[field] in allowed"
+        )
+    if uuid_fields:
+        header.append(f"UUID_FIELDS = {uuid_fields!r}")
+        helpers.append("assert_uuid_fields(item) — uuid-поля объекта ответа по UUID_RE")
+        blocks.append(
+            "def assert_uuid_fields(item):\n"
+            "    for field in UUID_FIELDS:\n"
+            "        if item.get(field) is not None:\n"
+            "            assert UUID_RE.match(item[field])"
+        )
+
+    def error_asserts(expected: str, code: str) -> List[str]:
+        lines = [f"    assert response.status_code {expected}"]
+        if code in error_schemas:
+            lines.append("    assert_error_shape(response.status_code, response.json())")
+        return lines
+
+    tests = []
+    for index, param in enumerate(uuid_params, start=1):
+        suffix = _identifier_part(str(param)) or str(index)
+        name = f"test_{prefix}_invalid_uuid" if len(uuid_params) == 1 else f"test_{prefix}_invalid_uuid_{suffix}"
+        if name in tests:
+            name = f"{name}_{index}"
+        tests.append(name)
+        blocks.append(_function(
+            name,
+            [f"    url = {_params_call({param: INVALID_UUID})}"],
+            ["    response = send(url, auth_header)"],
+            error_asserts("in (400, 422)", "400"),
+        ))
+    # 404 проверяем только на uuid-параметрах: для них известен «несуществующий» id
+    if negative.get("supports_404") and uuid_params:
+        name = f"test_{prefix}_not_found"
+        tests.append(name)
+        blocks.append(_function(
+            name,
+            [f"    url = {_params_call({param: MISSING_UUID for param in uuid_params})}"],
+            ["    response = send(url, auth_header)"],
+            error_asserts("== 404", "404"),
+        ))
+    if "401" in error_schemas:
+        name = f"test_{prefix}_unauthorized"
+        tests.append(name)
+        blocks.append(_function(
+            name,
+            ["    url = build_url()"],
+            ["    response = send(url, {})"],
+            error_asserts("== 401", "401"),
+            fixture=False,
+        ))
+
+    code = "\n".join(header) + "\n\n\n" + "\n\n\n".join(blocks) + "\n"
+    return Skeleton(code, tests, helpers)
+
+
+def _top_level_names(tree: ast.Module) -> set:
+    names = set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.Assign):
+            names.update(target.id for target in node.targets if isinstance(target, ast.Name))
+    return names
+
+
+def merge_with_skeleton(skeleton_code: str, model_code: str) -> str:
+    """
+    Каркас + код модели. Импорты модели, которых нет в каркасе, поднимаются
+    наверх; функции и константы модели с именами из каркаса отбрасываются —
+    каркас главнее. Код, который не разбирается, дописывается как есть.
+    """
+    try:
+        tree = ast.parse(model_code)
+    except SyntaxError:
+        return skeleton_code + "\n\n" + model_code.strip() + "\n"
+
+    skeleton_tree = ast.parse(skeleton_code)
+    defined = _top_level_names(skeleton_tree)
+    skeleton_imports = {
+        ast.unparse(node) for node in skeleton_tree.body if isinstance(node, (ast.Import, ast.ImportFrom))
+    }
+
+    lines = model_code.splitlines()
+    imports, blocks = [], []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            if ast.unparse(node) not in skeleton_imports:
+                imports.append(ast.unparse(node))
+            continue
+        if _top_level_names(ast.Module(body=[node], type_ignores=[])) & defined:
+            continue
+        start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+        blocks.append("\n".join(lines[start - 1:node.end_lineno]))
+
+    merged = skeleton_code
+    if imports:
+        merged = "\n".join(imports) + "\n" + merged
+    if blocks:
+        merged += "\n\n" + "\n\n\n".join(blocks) + "\n"
+    return merged
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from functools import partial
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.api_test_generator import generate_api_test
+from app.services.llm_scheduler import BULK, lane
+from app.services.llm_service import generate_allure_manual_testcase
+from app.services.repair import generate_with_repair
+from app.services.state_backend import SQLiteBackend, StateBackend, state_backend
+from app.services.test_validators import validate_manual_test, validate_pytest_api
+
+# Сколько корутин-воркеров разбирают очередь bulk-задач (общий лимит на все задачи процесса)
+BULK_JOB_WORKERS = int(os.getenv("BULK_JOB_WORKERS", "8"))
+# Файл с задачами и готовыми тестами, если STATE_BACKEND не общий
+BULK_JOBS_SQLITE_PATH = os.getenv("BULK_JOBS_SQLITE_PATH", "bulk_jobs.sqlite3")
+# Сколько секунд хранятся задачи и их результаты
+BULK_JOBS_TTL = float(os.getenv("BULK_JOBS_TTL", str(7 * 24 * 3600)))
+# Аренда задачи воркером: если владелец не продлил её за это время, задачу подхватит другой
+BULK_JOBS_LEASE = float(os.getenv("BULK_JOBS_LEASE", "15"))
+
+_JOBS_NAMESPACE = "bulk_jobs"
+_CLAIMS_NAMESPACE = "bulk_claims"
+# Индекс незавершённых задач: resume не перечитывает завершённые, которые хранятся BULK_JOBS_TTL
+_PENDING_NAMESPACE = "bulk_pending"
+
+logger = logging.getLogger(__name__)
+
+
+def _items_namespace(job_id: str) -> str:
+    return f"bulk_items:{job_id}"
+
+
+async def generate_bulk_item(kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Один тест задачи. Кэш не используем: в bulk-режиме нужны разные варианты.
+    """
+    if kind == "manual":
+        generate = partial(generate_allure_manual_testcase, params["requirements"], use_cache=False)
+        validator = validate_manual_test
+    else:
+        generate = partial(
+            generate_api_test, params["payload"], use_cache=False, skeleton=params.get("skeleton", False)
+        )
+        validator = validate_pytest_api
+
+    if params.get("repair"):
+        return await generate_with_repair(generate, validator)
+    code = await generate()
+    return {"code": code, "validation": await asyncio.to_thread(validator, code)}
+
+
+class BulkJobQueue:
+    """
+    Очередь bulk-генерации: задача разбивается на тесты, их разбирают
+    BULK_JOB_WORKERS корутин. Каждый готовый тест сразу сохраняется в хранилище,
+    поэтому после перезапуска задача продолжается с недостающих тестов.
+    Незавершённую задачу ведёт один воркер — тот, кто держит её аренду.
+    """
+
+    def __init__(
+        self,
+        store: StateBackend,
+        workers: int = BULK_JOB_WORKERS,
+        lease: float = BULK_JOBS_LEASE,
+    ):
+        self.store = store
+        self.workers = workers
+        self.lease = lease
+        self.owner = uuid.uuid4().hex
+        self._queue: Optional["asyncio.Queue"] = None
+        self._tasks: List[asyncio.Task] = []
+        # Незавершённые задачи, которые ведёт этот процесс
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # Тесты, которые сейчас генерируются, по задачам: их отменяют при потере аренды
+        self._running: Dict[str, Set[asyncio.Task]] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> int:
+        """
+        Запускает воркеры и подхватывает незавершённые задачи; возвращает их число.
+        """
+        if self.running:
+            return 0
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._keep_leases()))
+        resumed = await self.resume()
+        if resumed:
+            logger.info("Продолжены bulk-задачи: %s", resumed)
+        return resumed
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # Отпускаем аренду, чтобы после перезапуска задачи подхватились сразу
+        for job_id in self._jobs:
+            self.store.delete(_CLAIMS_NAMESPACE, job_id)
+        self._jobs.clear()
+        self._running.clear()
+        self._tasks = []
+        self._queue = None
+
+    async def join(self) -> None:
+        if self._queue is not None:
+            await self._queue.join()
+
+    def submit(self, kind: str, params: Dict[str, Any], count: int) -> Dict[str, Any]:
+        if not self.running:
+            raise RuntimeError("Очередь bulk-задач не запущена")
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": kind,
+            "params": params,
+            "count": count,
+            "status": "pending",
+            "completed": 0,
+            "failed": 0,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        self.store.add(_CLAIMS_NAMESPACE, job["job_id"], self.owner, self.lease)
+        self._save(job)
+        self.store.set(_PENDING_NAMESPACE, job["job_id"], job["kind"], BULK_JOBS_TTL)
+        self._enqueue(job, [])
+        return progress(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Прогресс задачи и все уже готовые тесты (по test_number).
+        """
+        job = self._jobs.get(job_id) or self.store.get_json(_JOBS_NAMESPACE, job_id)
+        if job is None:
+            return None
+        return {**progress(job), "results": self.results(job_id)}
+
+    def results(self, job_id: str) -> List[Dict[str, Any]]:
+        namespace = _items_namespace(job_id)
+        items = [self.store.get_json(namespace, key) for key in self.store.keys(namespace)]
+        return sorted((item for item in items if item), key=lambda item: item["test_number"])
+
+    async def resume(self) -> int:
+        """
+        Берёт в работу незавершённые задачи, аренду которых никто не держит.
+        Хранилище читается в отдельном потоке, чтобы не блокировать event loop.
+        """
+        claimed = await asyncio.to_thread(self._claim_orphans)
+        for job, done in claimed:
+            self._enqueue(job, done)
+        return len(claimed)
+
+    def _claim_orphans(self) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        claimed = []
+        for job_id in self.store.keys(_PENDING_NAMESPACE):
+            if job_id in self._jobs:
+                continue
+            job = self.store.get_json(_JOBS_NAMESPACE, job_id)
+            if job is None or job["status"] == "done":
+                self.store.delete(_PENDING_NAMESPACE, job_id)
+                continue
+            if not self.store.add(_CLAIMS_NAMESPACE, job_id, self.owner, self.lease):
+                continue
+            claimed.append((job, self.results(job_id)))
+        return claimed
+
+    def _enqueue(self, job: Dict[str, Any], done: List[Dict[str, Any]]) -> None:
+        job_id = job["job_id"]
+        job["completed"] = sum(1 for item in done if "error" not in item)
+        job["failed"] = len(done) - job["completed"]
+        self._jobs[job_id] = job
+
+        finished = {item["test_number"] for item in done}
+        pending = [n for n in range(1, job["count"] + 1) if n not in finished]
+        if not pending:
+            self._finish(job)
+            return
+        for test_number in pending:
+            self._queue.put_nowait((job_id, test_number))
+
+    async def _worker(self) -> None:
+        # Тесты задач идут в полосе BULK — после интерактивных запросов
+        with lane(BULK):
+            while True:
+                job_id, test_number = await self._queue.get()
+                # Отдельная asyncio-задача: её отменяет _drop, не останавливая воркер
+                item = asyncio.create_task(self._run_item(job_id, test_number))
+                running = self._running.setdefault(job_id, set())
+                running.add(item)
+                try:
+                    (error,) = await asyncio.gather(item, return_exceptions=True)
+                    if isinstance(error, Exception):
+                        logger.error("Не удалось сохранить тест %s задачи %s", test_number, job_id, exc_info=error)
+                finally:
+                    running.discard(item)
+                    if not running and self._running.get(job_id) is running:
+                        del self._running[job_id]
+                    self._queue.task_done()
+
+    async def _run_item(self, job_id: str, test_number: int) -> None:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        try:
+            item = await generate_bulk_item(job["kind"], job["params"])
+        except Exception as e:
+            item = {"error": str(e)}
+
+        self.store.set_json(
+            _items_namespace(job_id), str(test_number), {"test_number": test_number, **item}, BULK_JOBS_TTL
+        )
+        job["failed" if "error" in item else "completed"] += 1
+        job["status"] = "running"
+        if job["completed"] + job["failed"] >= job["count"]:
+            self._finish(job)
+        else:
+            self._save(job)
+
+    def _finish(self, job: Dict[str, Any]) -> None:
+        job["status"] = "done"
+        job["finished_at"] = time.time()
+        self._save(job)
+        self._jobs.pop(job["job_id"], None)
+        self.store.delete(_CLAIMS_NAMESPACE, job["job_id"])
+        self.store.delete(_PENDING_NAMESPACE, job["job_id"])
+
+    def _save(self, job: Dict[str, Any]) -> None:
+        self.store.set_json(_JOBS_NAMESPACE, job["job_id"], job, BULK_JOBS_TTL)
+
+    async def _keep_leases(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            lost = await asyncio.to_thread(self._renew_leases, list(self._jobs))
+            for job_id in lost:
+                self._drop(job_id)
+            # Задачи упавших воркеров
+            await self.resume()
+
+    def _renew_leases(self, job_ids: List[str]) -> List[str]:
+        """
+        Продлевает аренду только там, где владелец всё ещё мы; истёкшую, но никем
+        не занятую берёт снова. Возвращает задачи, которые забрал другой воркер.
+        """
+        return [
+            job_id for job_id in job_ids
+            if not self.store.renew(_CLAIMS_NAMESPACE, job_id, self.owner, self.lease)
+            and not self.store.add(_CLAIMS_NAMESPACE, job_id, self.owner, self.lease)
+        ]
+
+    def _drop(self, job_id: str) -> None:
+        # Аренда истекла и задачу, возможно, уже ведёт другой воркер: свои тесты по ней отменяем
+        if self._jobs.pop(job_id, None) is None:
+            return
+        logger.warning("Потеряна аренда bulk-задачи %s", job_id)
+        for item in self._running.pop(job_id, set()):
+            item.cancel()
+
+
+def progress(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "total": job["count"],
+        "completed": job["completed"],
+        "failed": job["failed"],
+        "created_at": job["created_at"],
+        "finished_at": job["finished_at"],
+    }
+
+
+_bulk_queue: Optional[BulkJobQueue] = None
+
+
+def get_bulk_queue() -> BulkJobQueue:
+    global _bulk_queue
+    if _bulk_queue is None:
+        store = state_backend if state_backend.shared else SQLiteBackend(BULK_JOBS_SQLITE_PATH)
+        _bulk_queue = BulkJobQueue(store)
+    return _bulk_queue
@@ -0,0 +1,181 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.services.dedup import NearDuplicateIndex, cluster_codes
+from app.services.llm_scheduler import BULK, lane
+from app.services.validator_engine import validate_batch
+
+# Сколько генераций одного bulk-запроса может одновременно ждать модель
+BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", "8"))
+# Сколько кандидатов просим у модели одним запросом в режиме top_k
+BULK_CANDIDATES_PER_CALL = int(os.getenv("BULK_CANDIDATES_PER_CALL", "5"))
+# Режим distinct: не больше distinct * DISTINCT_MAX_FACTOR генераций на запрос
+DISTINCT_MAX_FACTOR = int(os.getenv("DISTINCT_MAX_FACTOR", "3"))
+
+
+async def run_bulk(
+    count: int,
+    generate_one: Callable[[int], Awaitable[Dict[str, Any]]],
+    max_concurrency: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Запускает count генераций с ограничением на число одновременных вызовов.
+    Результаты возвращаются в порядке test_number, ошибка одного теста
+    не влияет на остальные. Вызовы модели идут в полосе BULK — после интерактивных.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or BULK_MAX_CONCURRENCY)
+
+    async def run_one(test_number: int) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                item = await generate_one(test_number)
+                return {"test_number": test_number, **item}
+            except Exception as e:
+                return {"test_number": test_number, "error": str(e)}
+
+    # Задачи gather копируют контекст, а с ним и полосу приоритета
+    with lane(BULK):
+        return list(await asyncio.gather(
+            *(run_one(i + 1) for i in range(count))
+        ))
+
+
+async def validate_results(
+    results: List[Dict[str, Any]],
+    validator: Callable[[str], dict],
+) -> List[Dict[str, Any]]:
+    """
+    Валидирует сгенерированный код всех успешных результатов одним пакетом
+    (в пуле процессов) и добавляет поле validation, если его ещё нет.
+    """
+    generated = [item for item in results if "code" in item and "validation" not in item]
+    validations = await asyncio.to_thread(
+        validate_batch, validator, [item["code"] for item in generated]
+    )
+    for item, validation in zip(generated, validations):
+        item["validation"] = validation
+    return results
+
+
+async def run_candidates(
+    count: int,
+    generate_batch: Callable[[int], Awaitable[List[str]]],
+    max_concurrency: Optional[int] = None,
+    per_call: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Получает count кандидатов пачками по per_call за вызов модели.
+    Результаты — как у run_bulk: по одному на кандидата, ошибка пачки
+    помечает все её кандидаты.
+    """
+    per_call = per_call or BULK_CANDIDATES_PER_CALL
+    sizes = [min(per_call, count - start) for start in range(0, count, per_call)]
+
+    async def generate_one(batch_number: int) -> Dict[str, Any]:
+        return {"codes": await generate_batch(sizes[batch_number - 1])}
+
+    batches = await run_bulk(len(sizes), generate_one, max_concurrency)
+
+    results: List[Dict[str, Any]] = []
+    for batch, size in zip(batches, sizes):
+        for code in batch.get("codes", [None] * size):
+            item = {"code": code} if code is not None else {"error": batch["error"]}
+            results.append({"test_number": len(results) + 1, **item})
+    return results
+
+
+def candidate_score(validation: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    Чем меньше, тем лучше: сначала число ошибок, затем предупреждений.
+    """
+    findings = validation.get("findings", [])
+    errors = sum(1 for f in findings if f["severity"] == "error")
+    return errors, len(findings) - errors
+
+
+def _validation_score(item: Dict[str, Any]) -> Tuple[int, int]:
+    return candidate_score(item.get("validation", {}))
+
+
+def top_results(results: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+    """
+    k лучших провалидированных результатов; при равенстве — в порядке test_number.
+    """
+    validated = [item for item in results if "validation" in item]
+    return sorted(validated, key=lambda item: candidate_score(item["validation"]))[:top_k]
+
+
+def deduplicate_results(
+    results: List[Dict[str, Any]],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Оставляет по одному тесту из каждого кластера почти одинаковых — лучший
+    по валидатору (при равенстве — первый). Возвращает (тесты, кластеры).
+    """
+    by_number = {item["test_number"]: item for item in results if item.get("code")}
+    clusters = cluster_codes((number, item["code"]) for number, item in by_number.items())
+
+    unique, report = [], []
+    for members in clusters:
+        best = min(members, key=lambda number: _validation_score(by_number[number]))
+        unique.append(by_number[best])
+        report.append({"representative": best, "members": members, "size": len(members)})
+    unique.sort(key=lambda item: item["test_number"])
+    return unique, report
+
+
+async def run_until_distinct(
+    distinct: int,
+    generate_one: Callable[[int], Awaitable[Dict[str, Any]]],
+    validator: Callable[[str], dict],
+    max_concurrency: Optional[int] = None,
+    max_total: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Генерирует тесты пачками, пока не наберётся distinct непохожих друг на друга
+    или не будет потрачен бюджет max_total генераций. Каждая следующая пачка —
+    ровно столько тестов, сколько ещё не хватает. Из кластера, как и в
+    deduplicate_results, остаётся лучший по валидатору (при равенстве — первый).
+    """
+    max_total = max_total or distinct * DISTINCT_MAX_FACTOR
+    index = NearDuplicateIndex()
+    # Лучший тест каждого кластера по его первому члену
+    best: Dict[int, Dict[str, Any]] = {}
+    clusters: Dict[int, List[int]] = {}
+    root: Dict[int, int] = {}
+    errors: List[Dict[str, Any]] = []
+    generated = 0
+
+    while len(clusters) < distinct and generated < max_total:
+        batch = min(distinct - len(clusters), max_total - generated)
+        results = await run_bulk(batch, generate_one, max_concurrency)
+        await validate_results(results, validator)
+        for item in results:
+            item["test_number"] += generated
+            if "code" not in item:
+                errors.append(item)
+                continue
+            number = item["test_number"]
+            duplicate_of = index.add(number, item["code"])
+            if duplicate_of is None:
+                root[number] = number
+                clusters[number] = [number]
+                best[number] = item
+            else:
+                root[number] = root[duplicate_of]
+                clusters[root[number]].append(number)
+                if _validation_score(item) < _validation_score(best[root[number]]):
+                    best[root[number]] = item
+        generated += batch
+
+    return {
+        "generated_tests": generated,
+        "distinct_tests": len(clusters),
+        "results": sorted(best.values(), key=lambda item: item["test_number"]),
+        "clusters": [
+            {"representative": best[first]["test_number"], "members": members, "size": len(members)}
+            for first, members in clusters.items()
+        ],
+        "errors": errors,
+    }
@@ -0,0 +1,159 @@
+import ast
+import hashlib
+import os
+import random
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Оценка сходства (Jaccard по шинглам), начиная с которой тесты считаются дубликатами
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+# MinHash: число хэш-функций = полосы LSH * строки в полосе
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+DEDUP_ROWS = int(os.getenv("DEDUP_ROWS", "6"))
+# Длина шингла в токенах нормализованного AST
+DEDUP_SHINGLE = int(os.getenv("DEDUP_SHINGLE", "5"))
+
+# Слова дампа AST без маркеров контекста Load/Store — они есть у каждого имени
+_TOKEN_RE = re.compile(r"\w+")
+_CONTEXT_TOKENS = {"Load", "Store", "Del"}
+
+
+class _Canonicalizer(ast.NodeTransformer):
+    """
+    Имена переменных, функций, классов и аргументов заменяются на v0, v1, ...
+    в порядке появления, строковые литералы — на "S". Атрибуты (httpx.get,
+    allure.step) остаются: это то, что тест на самом деле вызывает.
+    """
+
+    def __init__(self):
+        self.names: Dict[str, str] = {}
+
+    def _canonical(self, name: str) -> str:
+        return self.names.setdefault(name, f"v{len(self.names)}")
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        node.id = self._canonical(node.id)
+        return node
+
+    def visit_arg(self, node: ast.arg) -> ast.AST:
+        node.arg = self._canonical(node.arg)
+        node.annotation = None
+        return node
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.AST:
+        node.name = self._canonical(node.name)
+        node.returns = None
+        self.generic_visit(node)
+        return node
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> ast.AST:
+        node.name = self._canonical(node.name)
+        self.generic_visit(node)
+        return node
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        if isinstance(node.value, str):
+            node.value = "S"
+        return node
+
+    def visit_JoinedStr(self, node: ast.JoinedStr) -> ast.AST:
+        return ast.copy_location(ast.Constant("S"), node)
+
+
+def normalize_code(code: str) -> str:
+    """
+    Нормализованный AST теста: одинаковый у тестов, отличающихся только
+    именами, текстами строк и форматированием. Код с синтаксической
+    ошибкой сравнивается по тексту без пробелов.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return " ".join(code.split())
+    # Импорты одинаковы у всех тестов пачки и только размывают сходство
+    tree.body = [node for node in tree.body if not isinstance(node, (ast.Import, ast.ImportFrom))]
+    return ast.dump(_Canonicalizer().visit(tree), annotate_fields=False)
+
+
+def shingles(normalized: str, size: int = DEDUP_SHINGLE) -> set:
+    tokens = [token for token in _TOKEN_RE.findall(normalized) if token not in _CONTEXT_TOKENS]
+    if len(tokens) <= size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def _shingle_hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class NearDuplicateIndex:
+    """
+    MinHash-сигнатуры + LSH по полосам: кандидаты в дубликаты — только тесты,
+    совпавшие хотя бы в одной полосе, поэтому сравнений почти линейное число,
+    а не n². Кандидаты проверяются оценкой Jaccard по сигнатурам.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEDUP_THRESHOLD,
+        bands: int = DEDUP_BANDS,
+        rows: int = DEDUP_ROWS,
+        seed: int = 1,
+    ):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        rng = random.Random(seed)
+        # Хэш-функции MinHash: 64-битный хэш шингла XOR случайная маска
+        self._masks = [rng.getrandbits(64) for _ in range(bands * rows)]
+        self._signatures: Dict[Any, Tuple[int, ...]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[Any]] = defaultdict(list)
+        self.comparisons = 0
+
+    def signature(self, code: str) -> Tuple[int, ...]:
+        hashes = [_shingle_hash(s) for s in shingles(normalize_code(code))]
+        return tuple(min(h ^ mask for h in hashes) for mask in self._masks)
+
+    @staticmethod
+    def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+        return sum(x == y for x, y in zip(first, second)) / len(first)
+
+    def add(self, key: Any, code: str) -> Optional[Any]:
+        """
+        Добавляет тест; возвращает ключ самого похожего из уже добавленных,
+        если сходство не ниже порога, иначе None.
+        """
+        signature = self.signature(code)
+        # dict, а не set — чтобы при равном сходстве побеждал добавленный раньше
+        candidates: Dict[Any, None] = {}
+        for band in range(self.bands):
+            bucket = (band, signature[band * self.rows:(band + 1) * self.rows])
+            candidates.update(dict.fromkeys(self._buckets[bucket]))
+            self._buckets[bucket].append(key)
+        self._signatures[key] = signature
+
+        best, best_score = None, 0.0
+        for other in candidates:
+            self.comparisons += 1
+            score = self.similarity(signature, self._signatures[other])
+            if score >= self.threshold and score > best_score:
+                best, best_score = other, score
+        return best
+
+
+def cluster_codes(items: Iterable[Tuple[Any, str]], threshold: float = DEDUP_THRESHOLD) -> List[List[Any]]:
+    """
+    Кластеры почти одинаковых тестов (ключи в порядке добавления);
+    тест попадает в кластер самого похожего из добавленных до него.
+    """
+    index = NearDuplicateIndex(threshold)
+    root: Dict[Any, Any] = {}
+    clusters: Dict[Any, List[Any]] = {}
+    for key, code in items:
+        duplicate_of = index.add(key, code)
+        root[key] = root[duplicate_of] if duplicate_of is not None else key
+        clusters.setdefault(root[key], []).append(key)
+    return list(clusters.values())
@@ -0,0 +1,129 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.state_backend import SQLiteBackend, StateBackend, state_backend
+
+_NAMESPACE = "llm_cache"
+
+
+class LLMResponseCache:
+    """
+    Кэш ответов модели: LRU в памяти с TTL и опциональный второй уровень
+    в общем хранилище (SQLite), который переживает перезапуск сервиса
+    и общий для всех воркеров.
+    Ключ — sha256 от модели, параметров сэмплирования и промпта.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 3600,
+        sqlite_path: Optional[str] = None,
+        backend: Optional[StateBackend] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._backend = SQLiteBackend(sqlite_path) if sqlite_path else backend
+        self._stats = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0}
+
+    @staticmethod
+    def make_key(params: Dict[str, Any]) -> str:
+        raw = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._get_memory(key)
+        if value is None and self._backend is not None:
+            value = self._get_disk(key)
+        return self._count(value)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """
+        get для event loop: запрос к SQLite уходит в поток, память — без переключений.
+        """
+        value = self._get_memory(key)
+        if value is None and self._backend is not None:
+            value = await asyncio.to_thread(self._get_disk, key)
+        return self._count(value)
+
+    def set(self, key: str, value: str) -> None:
+        self._set_memory(key, value)
+        if self._backend is not None:
+            self._backend.set(_NAMESPACE, key, value, self.ttl)
+
+    async def aset(self, key: str, value: str) -> None:
+        self._set_memory(key, value)
+        if self._backend is not None:
+            await asyncio.to_thread(self._backend.set, _NAMESPACE, key, value, self.ttl)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self._backend is not None:
+            self._backend.clear(_NAMESPACE)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_enabled": self._backend is not None,
+            }
+
+    # Под self._lock — только память: запросы к диску идут без блокировки,
+    # чтобы медленный диск не задерживал попадания в память
+    def _get_memory(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry[1]
+            if entry:
+                del self._memory[key]
+            return None
+
+    def _get_disk(self, key: str) -> Optional[str]:
+        value = self._backend.get(_NAMESPACE, key)
+        if value is not None:
+            with self._lock:
+                self._remember(key, value, time.time() + self.ttl)
+                self._stats["disk_hits"] += 1
+        return value
+
+    def _set_memory(self, key: str, value: str) -> None:
+        with self._lock:
+            self._remember(key, value, time.time() + self.ttl)
+
+    def _count(self, value: Optional[str]) -> Optional[str]:
+        with self._lock:
+            self._stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+
+response_cache = LLMResponseCache(
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+    ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+    sqlite_path=os.getenv("LLM_CACHE_SQLITE_PATH") or None,
+    # Общее хранилище нескольких воркеров — второй уровень кэша по умолчанию
+    backend=state_backend if state_backend.shared else None,
+)
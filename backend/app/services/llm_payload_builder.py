@@ -1,13 +1,23 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from app.services.openapi_parser import OpenAPIParser, Endpoint
+from app.services.openapi_parser import ERROR_STATUS_CODES, OpenAPIParser, AnyEndpoint
+from app.services.payload_compactor import compact_payload
+from app.services.metrics import timed
 
 
+@timed("payload_build")
 def build_llm_payload(
     parser: OpenAPIParser,
-    endpoint: Endpoint,
-    mode: str = "auto"
+    endpoint: AnyEndpoint,
+    mode: str = "auto",
+    compact: bool = False,
+    token_budget: Optional[int] = None,
 ) -> Dict[str, Any]:
+    """
+    Структурированное описание эндпоинта для промпта.
+    compact=True (или заданный token_budget) — сжатые схемы без описаний
+    и примеров, отчёт о сжатии в payload["compaction"].
+    """
 
     # --- Основные схемы ---
     response_schema = parser.get_response_schema(endpoint)
@@ -40,14 +50,14 @@ def build_llm_payload(
     # --- Ошибки по статус-кодам ---
     error_schemas = {
         code: schema
-        for code in ["400", "401", "403", "404", "500"]
+        for code in ERROR_STATUS_CODES
         if (schema := parser.get_error_schema(endpoint, code))
     }
 
     has_exceptions = bool(error_schemas)
 
     # --- Итоговый payload ---
-    return {
+    payload = {
         "mode": mode,                          # auto/manual
         "path": endpoint.path,
         "method": endpoint.method,
@@ -64,4 +74,8 @@ def build_llm_payload(
 
         "error_schemas": error_schemas,
         "has_exceptions": has_exceptions,
-    }
\ No newline at end of file
+    }
+
+    if compact or token_budget:
+        return compact_payload(payload, token_budget=token_budget)
+    return payload
@@ -0,0 +1,233 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import openai
+
+# Ограничения на трафик к модели со всего сервиса; 0 — без ограничения.
+# Планировщик у каждого воркера uvicorn свой, поэтому лимит делится на WEB_CONCURRENCY
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+LLM_RATE_RPS = float(os.getenv("LLM_RATE_RPS", "0")) / WEB_CONCURRENCY
+LLM_RATE_TPM = float(os.getenv("LLM_RATE_TPM", "0")) / WEB_CONCURRENCY
+# Повторы при 429 / 5xx / сетевых ошибках: число повторов и границы задержки, секунды
+LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "4"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "10"))
+
+# Полосы приоритета: меньше — раньше
+INTERACTIVE = 0
+BULK = 1
+LANE_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+llm_lane: contextvars.ContextVar[int] = contextvars.ContextVar("llm_lane", default=INTERACTIVE)
+
+
+@contextmanager
+def lane(priority: int) -> Iterator[None]:
+    """
+    Вызовы модели внутри блока (и в созданных в нём задачах) идут в полосе priority.
+    """
+    token = llm_lane.set(priority)
+    try:
+        yield
+    finally:
+        llm_lane.reset(token)
+
+
+class LLMOverloadedError(RuntimeError):
+    """
+    Модель отвечает 429 и после всех повторов.
+    """
+
+
+class TokenBucket:
+    """
+    Пополняется на rate единиц в секунду до capacity. reserve списывает сразу
+    (баланс может уйти в минус) и возвращает, сколько ждать, — поэтому
+    ожидающие обслуживаются в порядке резерва.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        self._refill()
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class PriorityLimiter:
+    """
+    Не более limit одновременных вызовов. Освободившийся слот получает ожидающий
+    с наименьшим priority, при равенстве — пришедший раньше.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    def waiting(self) -> Dict[str, int]:
+        counts = {name: 0 for name in LANE_NAMES.values()}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                name = LANE_NAMES.get(priority, str(priority))
+                counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    async def acquire(self, priority: int) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Слот успели передать — отдаём его следующему
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # Слот переходит ожидающему, active не меняется
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LLMScheduler:
+    """
+    Единая точка для трафика к модели: ограничение параллелизма с полосами
+    приоритета, token bucket на запросы и токены, повторы с jittered backoff.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        rps: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        retries: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+    ):
+        rps = LLM_RATE_RPS if rps is None else rps
+        tokens_per_minute = LLM_RATE_TPM if tokens_per_minute is None else tokens_per_minute
+        self.retries = LLM_RETRY_ATTEMPTS if retries is None else retries
+        self.base_delay = LLM_RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = LLM_RETRY_MAX_DELAY if max_delay is None else max_delay
+
+        self.limiter = PriorityLimiter(max_concurrency)
+        self.request_bucket = TokenBucket(rps, max(1.0, rps)) if rps > 0 else None
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute > 0 else None
+        )
+        self.counters = {"calls": 0, "retries": 0, "rate_limited": 0, "throttled_seconds": 0.0}
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """
+        Retry-After от сервера, иначе full jitter: случайно от 0 до base * 2^attempt.
+        """
+        hinted = retry_after(error)
+        if hinted is not None:
+            return min(hinted, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0) -> AsyncIterator[None]:
+        """
+        Слот на один вызов модели в полосе текущего контекста (без повторов —
+        для стриминга, где часть ответа уже могла уйти клиенту).
+        """
+        await self.limiter.acquire(llm_lane.get())
+        try:
+            delay = 0.0
+            if self.request_bucket:
+                delay = self.request_bucket.reserve(1)
+            if self.token_bucket and tokens:
+                delay = max(delay, self.token_bucket.reserve(tokens))
+            if delay:
+                self.counters["throttled_seconds"] += delay
+                await asyncio.sleep(delay)
+            self.counters["calls"] += 1
+            yield
+        finally:
+            self.limiter.release()
+
+    async def run(self, call: Callable[[], Awaitable[Any]], tokens: int = 0) -> Any:
+        """
+        Выполняет call в слоте, повторяя при 429 / 5xx / сетевых ошибках.
+        На время паузы между попытками слот освобождается.
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self.slot(tokens):
+                    response = await call()
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                if isinstance(e, openai.RateLimitError):
+                    self.counters["rate_limited"] += 1
+                if attempt >= self.retries:
+                    if isinstance(e, openai.RateLimitError):
+                        raise LLMOverloadedError("Модель перегружена (429), повторы исчерпаны") from e
+                    raise
+                delay = self.backoff(attempt, e)
+                attempt += 1
+                self.counters["retries"] += 1
+                await asyncio.sleep(delay)
+                continue
+
+            # Резервировали с запасом (max_tokens) — возвращаем неизрасходованное
+            usage = getattr(response, "usage", None)
+            if self.token_bucket and tokens and usage and usage.total_tokens:
+                self.token_bucket.refund(max(0, tokens - usage.total_tokens))
+            return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "active": self.limiter.active,
+            "waiting": self.limiter.waiting(),
+        }
@@ -1,49 +1,242 @@
 from dotenv import load_dotenv
 load_dotenv(".env")
 
+import asyncio
 import os
-from openai import OpenAI
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
-client = OpenAI(
-    api_key=os.getenv("CLOUDRU_API_KEY"),
-    base_url=os.getenv("CLOUDRU_BASE_URL"),
-)
+import httpx
+from openai import AsyncOpenAI, BadRequestError
 
-def call_llm(prompt: str) -> str:
+from app.services.llm_cache import LLM_CACHE_ENABLED, response_cache
+from app.services.llm_scheduler import LLMScheduler
+from app.services.metrics import llm_errors_total, record_usage, stage_timer, timed
+from app.services.prompt_templates import PromptTemplate, RenderedPrompt, prompt_registry
+
+# Строка — одно сообщение user (как раньше); RenderedPrompt — system + user
+Prompt = Union[str, RenderedPrompt]
+
+# Таймауты и размер пула соединений к модели
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+# Общий на процесс бюджет одновременных запросов к модели (все ручки и задачи)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Отдаёт ли модель несколько вариантов за один запрос (параметр n)
+LLM_SUPPORTS_N = os.getenv("LLM_SUPPORTS_N", "1") == "1"
+
+_async_client: Optional[AsyncOpenAI] = None
+_scheduler: Optional[LLMScheduler] = None
+# Запросы к модели в процессе выполнения: ключ кэша -> задача
+_inflight: Dict[str, "asyncio.Task[str]"] = {}
+_coalesced_calls = 0
+_n_supported = LLM_SUPPORTS_N
+# Как API сообщают, что не принимают параметр n: "Unsupported parameter: 'n'", "n must be 1"
+_N_PARAM_RE = re.compile(r"""['"`]n['"`]|\bn\s+(must|should|is|=|>|<)""", re.IGNORECASE)
+
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    Общий асинхронный клиент с пулом соединений — создаётся при первом вызове.
+    """
+    global _async_client
+    if _async_client is None:
+        timeout = httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        _async_client = AsyncOpenAI(
+            api_key=os.getenv("CLOUDRU_API_KEY"),
+            base_url=os.getenv("CLOUDRU_BASE_URL"),
+            timeout=timeout,
+            # Повторы делает планировщик — с учётом лимитов и приоритетов
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                ),
+            ),
+        )
+    return _async_client
+
+
+def get_scheduler() -> LLMScheduler:
+    """
+    Общий на процесс планировщик: бюджет LLM_MAX_CONCURRENCY, лимиты и повторы.
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler(LLM_MAX_CONCURRENCY)
+    return _scheduler
+
+
+async def close_async_client() -> None:
+    global _async_client, _scheduler
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    _scheduler = None
+
+
+def _estimated_tokens(params: Dict[str, Any], n: int = 1) -> int:
+    # Грубая оценка для лимита по токенам: ~4 символа на токен плюс max_tokens ответа
+    prompt_chars = sum(len(m["content"]) for m in params["messages"])
+    return prompt_chars // 4 + params["max_tokens"] * n
+
+
+def _completion_params(prompt: Prompt) -> Dict[str, Any]:
+    if isinstance(prompt, RenderedPrompt):
+        messages = prompt.messages()
+    else:
+        messages = [{"role": "user", "content": prompt}]
+    return {
+        "model": os.getenv("CLOUDRU_MODEL"),
+        "max_tokens": 2500,
+        "temperature": 0.5,
+        "presence_penalty": 0,
+        "top_p": 0.95,
+        "messages": messages,
+    }
+
+
+async def _create(**params: Any) -> Any:
     """
-    Простая функция — принимает промпт, возвращает чистый текст ответа.
-    Все параметры берутся из .env (как в твоём исходном коде).
+    Один запрос к модели: время этапа llm, токены из usage, ошибки по типу.
     """
-    response = client.chat.completions.create(
-        model=os.getenv("CLOUDRU_MODEL"),
-        max_tokens=2500,
-        temperature=0.5,
-        presence_penalty=0,
-        top_p=0.95,
-        messages=[
-            {"role": "user", "content": prompt}
-        ]
+    try:
+        with stage_timer("llm"):
+            response = await get_async_client().chat.completions.create(**params)
+    except Exception as e:
+        llm_errors_total.inc(type(e).__name__)
+        raise
+    record_usage(getattr(response, "usage", None))
+    return response
+
+
+async def _complete(params: Dict[str, Any]) -> str:
+    response = await get_scheduler().run(
+        lambda: _create(**params),
+        _estimated_tokens(params),
     )
     return response.choices[0].message.content.strip()
 
 
-def generate_allure_manual_testcase(requirements: str) -> str:
+async def _complete_and_cache(params: Dict[str, Any], key: str) -> str:
+    content = await _complete(params)
+    if LLM_CACHE_ENABLED:
+        await response_cache.aset(key, content)
+    return content
+
+
+async def call_llm_async(prompt: Prompt, use_cache: bool = True) -> str:
     """
-    Генерирует один manual-тест в формате Allure TestOps as Code (Python).
-    Пока без строгой валидации — просто просим модель выдать код по шаблону.
+    Вызов модели через общий клиент и планировщик (лимиты, повторы, метрики).
+    Одинаковые одновременные запросы с use_cache=True делят один вызов модели;
+    с use_cache=False каждый вызов идёт в модель отдельно.
+    """
+    global _coalesced_calls
+    params = _completion_params(prompt)
+    if not use_cache:
+        return await _complete(params)
+
+    key = response_cache.make_key(params)
+    if LLM_CACHE_ENABLED and (cached := await response_cache.aget(key)) is not None:
+        return cached
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_complete_and_cache(params, key))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    else:
+        _coalesced_calls += 1
+    # shield: отмена одного ожидающего не отменяет вызов для остальных
+    return await asyncio.shield(task)
+
+
+def inflight_stats() -> Dict[str, int]:
+    return {"in_flight": len(_inflight), "coalesced": _coalesced_calls}
+
+
+def _rejects_n(error: BadRequestError) -> bool:
+    if getattr(error, "param", None) == "n":
+        return True
+    body = error.body if isinstance(error.body, dict) else {}
+    return body.get("param") == "n" or bool(_N_PARAM_RE.search(str(body.get("message") or error.message)))
+
+
+async def call_llm_candidates_async(prompt: Prompt, n: int) -> List[str]:
     """
-    prompt = f"""
+    n разных вариантов ответа на один промпт, без кэша: одним запросом с параметром n,
+    а если модель его не поддерживает или вернула меньше — параллельными вызовами.
+    """
+    global _n_supported
+    params = _completion_params(prompt)
+    candidates: List[str] = []
+    if n > 1 and _n_supported:
+        try:
+            response = await get_scheduler().run(
+                lambda: _create(**params, n=n),
+                _estimated_tokens(params, n),
+            )
+            candidates = [choice.message.content.strip() for choice in response.choices]
+        except BadRequestError as e:
+            # Модель отвергла параметр n — больше его не отправляем; другие 400 (длина
+            # контекста и т.п.) относятся к этому промпту и флаг не трогают
+            if not _rejects_n(e):
+                raise
+            _n_supported = False
+
+    missing = n - len(candidates)
+    if missing > 0:
+        candidates += await asyncio.gather(*(_complete(params) for _ in range(missing)))
+    return candidates[:n]
+
+
+async def stream_llm(prompt: Prompt, use_cache: bool = True) -> AsyncIterator[str]:
+    """
+    Потоковый вызов модели: отдаёт куски текста по мере генерации.
+    Собранный ответ кладётся в кэш; при попадании в кэш ответ отдаётся одним куском.
+    """
+    params = _completion_params(prompt)
+    use_cache = use_cache and LLM_CACHE_ENABLED
+    key = response_cache.make_key(params)
+    if use_cache and (cached := await response_cache.aget(key)) is not None:
+        yield cached
+        return
+
+    parts = []
+    async with get_scheduler().slot(_estimated_tokens(params)):
+        with stage_timer("llm"):
+            stream = await get_async_client().chat.completions.create(
+                **params, stream=True, stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                # usage приходит отдельным последним куском (include_usage)
+                record_usage(getattr(chunk, "usage", None))
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    parts.append(text)
+                    yield text
+
+    if use_cache:
+        await response_cache.aset(key, "".join(parts).strip())
+
+
+MANUAL_TEST_TEMPLATE = prompt_registry.register(PromptTemplate(
+    name="manual_test",
+    version="2",
+    system="""
 Ты — опытный QA-инженер. Твоя задача — сгенерировать manual-тест
-в формате Allure TestOps as Code (Python). 
+в формате Allure TestOps as Code (Python) по требованиям из сообщения пользователя.
 
-Условия: 
+Условия:
 1. Тест предназначен ДЛЯ Cloud.ru калькулятора цен.
 2. Базовый URL калькулятора:
-   https://cloud.ru/calculator 
-
-Требования к тесту (описание сценария на естественном языке):
-\"\"\"{requirements}\"\"\"
-Ты уделяешь запросу выше приоритетное внимание.
+   https://cloud.ru/calculator
+3. Требованиям пользователя уделяй приоритетное внимание.
 
 Требуемый формат кода (это ПРИМЕР требуемого ответа):
 
@@ -71,6 +264,31 @@ class TestCalculatorUI:
 - Добавь необходимые импорты: import allure и from pytest import mark.
 - Код должен быть полностью запускаемым без ошибок.
 - Не добавляй текст до и после кода.
-"""
+""",
+    user="""
+Требования к тесту (описание сценария на естественном языке):
+\"\"\"{requirements}\"\"\"
+""",
+))
+
+
+@timed("prompt_render")
+def prepare_allure_manual_prompt(requirements: str) -> RenderedPrompt:
+    return prompt_registry.get("manual_test").render(requirements=requirements)
+
+
+async def generate_allure_manual_testcase(requirements: str, use_cache: bool = True) -> str:
+    """
+    Генерирует один manual-тест в формате Allure TestOps as Code (Python).
+    Пока без строгой валидации — просто просим модель выдать код по шаблону.
+    """
+    prompt = prepare_allure_manual_prompt(requirements)
+    return await call_llm_async(prompt, use_cache=use_cache)
+
+
+async def generate_allure_manual_candidates(requirements: str, n: int) -> List[str]:
+    return await call_llm_candidates_async(prepare_allure_manual_prompt(requirements), n)
+
 
-    return call_llm(prompt)
\ No newline at end of file
+def stream_allure_manual_testcase(requirements: str, use_cache: bool = True) -> AsyncIterator[str]:
+    return stream_llm(prepare_allure_manual_prompt(requirements), use_cache=use_cache)
\ No newline at end of file
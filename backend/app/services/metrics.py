@@ -0,0 +1,192 @@
+import asyncio
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Границы корзин гистограмм, секунды: от разбора спеки (мс) до ответа модели (минуты)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def value(self, *values: str) -> float:
+        return self._values.get(values, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, count in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, values)} {count}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # labels -> (счётчики по корзинам, сумма, количество)
+        self._series: Dict[Labels, Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *values: str) -> None:
+        with self._lock:
+            counts, total, count = self._series.get(values) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+            self._series[values] = (counts, total + seconds, count + 1)
+
+    def count(self, *values: str) -> int:
+        series = self._series.get(values)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    le = _format_labels(self.labels, values, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {bucket_count}")
+                inf = _format_labels(self.labels, values, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List = []
+        # Значения, которые берутся из других модулей в момент выдачи метрик
+        self._gauges: List[Tuple[str, str, Callable[[], Dict[Labels, float]], Tuple[str, ...]]] = []
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Histogram:
+        metric = Histogram(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str,
+        collect: Callable[[], Dict[Labels, float]],
+        labels: Tuple[str, ...] = (),
+    ) -> None:
+        self._gauges.append((name, help_text, collect, labels))
+
+    def render(self) -> str:
+        """
+        Все метрики в текстовом формате Prometheus (exposition format 0.0.4).
+        """
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, help_text, collect, labels in self._gauges:
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge"])
+            for values, value in sorted(collect().items()):
+                lines.append(f"{name}{_format_labels(labels, values)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    "testgen_stage_seconds",
+    "Время этапов генерации: spec_parse, payload_build, prompt_render, llm, validation",
+    ("stage",),
+)
+http_request_seconds = registry.histogram(
+    "testgen_http_request_seconds", "Время обработки HTTP-запроса", ("method", "route")
+)
+http_requests_total = registry.counter(
+    "testgen_http_requests_total", "HTTP-запросы по ручкам и кодам ответа", ("method", "route", "status")
+)
+http_errors_total = registry.counter(
+    "testgen_http_errors_total", "Ответы 5xx и необработанные исключения по ручкам", ("method", "route")
+)
+llm_tokens_total = registry.counter(
+    "testgen_llm_tokens_total", "Токены модели из response.usage", ("type",)
+)
+llm_errors_total = registry.counter(
+    "testgen_llm_errors_total", "Ошибки вызовов модели по типу исключения", ("error",)
+)
+spec_cache_requests_total = registry.counter(
+    "testgen_spec_cache_requests_total", "Обращения к кэшу распарсенных спек", ("result",)
+)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - started, stage)
+
+
+def timed(stage: str) -> Callable:
+    """
+    Декоратор: время каждого вызова функции (sync или async) идёт в этап stage.
+    """
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage_timer(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def record_usage(usage: Optional[object]) -> None:
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, kind, None)
+        if value:
+            llm_tokens_total.inc(kind.split("_")[0], amount=value)
@@ -1,8 +1,51 @@
+import hashlib
 import json
+import mmap
+import os
+import re
 import yaml
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple, Union
 from pydantic import BaseModel
 
+try:
+    import orjson  # быстрый JSON-парсер, не обязателен
+except ImportError:
+    orjson = None
+
+# libyaml в разы быстрее pure-Python загрузчика; если PyYAML собран без неё — обычный
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Первый значимый символ (после BOM и пробелов) — { или [ => JSON
+_JSON_START = re.compile(r"\ufeff?\s*[{\[]")
+_JSON_START_BYTES = re.compile(rb"(?:\xef\xbb\xbf)?\s*[{\[]")
+
+
+def sniff_format(raw: Union[str, bytes]) -> str:
+    """
+    "json" или "yaml" по началу текста — без полного разбора.
+    """
+    pattern = _JSON_START_BYTES if isinstance(raw, (bytes, bytearray, mmap.mmap)) else _JSON_START
+    return "json" if pattern.match(raw) else "yaml"
+
+
+def _loads_json(raw: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def parse_spec_text(raw: Union[str, bytes]) -> Any:
+    """
+    Разбирает текст спеки: JSON (через orjson, если установлен) или YAML (через libyaml).
+    """
+    if sniff_format(raw) == "json":
+        try:
+            return _loads_json(raw)
+        except ValueError:
+            # YAML во flow-стиле тоже начинается с { — например, {openapi: 3.0.0}
+            pass
+    return yaml.load(raw, Loader=YAML_LOADER)
+
 class Endpoint(BaseModel):
     path: str
     method: str
@@ -13,6 +56,76 @@ class Endpoint(BaseModel):
     responses: Dict[str, Any]
 
 
+HTTP_METHODS = ("get", "post", "put", "patch", "delete")
+# Коды ответов, схемы ошибок которых попадают в payload для модели
+ERROR_STATUS_CODES = ("400", "401", "403", "404", "500")
+
+
+def endpoint_key(endpoint: "AnyEndpoint") -> str:
+    return f"{endpoint.method} {endpoint.path}"
+
+
+class EndpointView:
+    """
+    Лёгкое представление операции поверх spec.raw: ничего не копирует,
+    схемы тела запроса и ответа раскрываются только при обращении.
+    Совместимо с Endpoint по атрибутам.
+    """
+
+    __slots__ = ("path", "method", "_details", "_parser")
+
+    def __init__(self, parser: "OpenAPIParser", path: str, method: str, details: Dict[str, Any]):
+        self.path = path
+        self.method = method.upper()
+        self._details = details
+        self._parser = parser
+
+    @property
+    def summary(self) -> Optional[str]:
+        return self._details.get("summary")
+
+    @property
+    def operation_id(self) -> Optional[str]:
+        return self._details.get("operationId")
+
+    @property
+    def parameters(self) -> List[Dict[str, Any]]:
+        return self._details.get("parameters", [])
+
+    @property
+    def request_body(self) -> Optional[Dict[str, Any]]:
+        return self._details.get("requestBody")
+
+    @property
+    def responses(self) -> Dict[str, Any]:
+        return self._details.get("responses", {})
+
+    @property
+    def request_schema(self) -> Optional[Dict[str, Any]]:
+        return self._parser.get_request_schema(self)
+
+    @property
+    def response_schema(self) -> Optional[Dict[str, Any]]:
+        return self._parser.get_response_schema(self)
+
+    def to_endpoint(self) -> Endpoint:
+        return Endpoint(
+            path=self.path,
+            method=self.method,
+            summary=self.summary,
+            operation_id=self.operation_id,
+            parameters=self.parameters,
+            request_body=self.request_body,
+            responses=self.responses,
+        )
+
+    def __repr__(self) -> str:
+        return f"EndpointView({self.method} {self.path})"
+
+
+AnyEndpoint = Union[Endpoint, EndpointView]
+
+
 class OpenAPISpec(BaseModel):
     raw: Dict[str, Any]
 
@@ -26,62 +139,88 @@ class OpenAPISpec(BaseModel):
 class OpenAPIParser:
     def __init__(self, data: Dict[str, Any]):
         self.spec = OpenAPISpec(raw=data)
+        # Кэши резолвера схем: по $ref и по id() исходной схемы
+        self._ref_cache: Dict[str, Any] = {}
+        self._schema_cache: Dict[int, Tuple[Any, Any]] = {}
 
     @staticmethod
     def load_from_file(path: str) -> "OpenAPIParser":
-        if path.endswith(".json"):
-            with open(path, "r") as f:
-                data = json.load(f)
-        else:
-            with open(path, "r") as f:
-                data = yaml.safe_load(f)
+        """
+        Формат определяется по содержимому, а не по расширению. JSON читается
+        через mmap без промежуточной строки, YAML — потоком из файла.
+        """
+        with open(path, "rb") as f:
+            # Пустой файл нельзя отобразить в память
+            if os.fstat(f.fileno()).st_size == 0:
+                return OpenAPIParser(parse_spec_text(b""))
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                data = None
+                if sniff_format(mm) == "json":
+                    try:
+                        data = OpenAPIParser._load_json_mmap(mm)
+                    except ValueError:
+                        pass
+                if data is None:
+                    f.seek(0)
+                    data = yaml.load(f, Loader=YAML_LOADER)
         return OpenAPIParser(data)
 
     @staticmethod
-    def load_from_string(raw: str) -> "OpenAPIParser":
-        try:
-            data = json.loads(raw)
-        except json.JSONDecodeError:
-            data = yaml.safe_load(raw)
-        return OpenAPIParser(data)
-
-    def list_endpoints(self) -> List[Dict[str, Any]]:
-        result = []
-        paths = self.spec.get_paths()
+    def _load_json_mmap(mm: mmap.mmap) -> Any:
+        if orjson is not None:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+        return json.loads(mm[:])
 
-        for path, methods in paths.items():
+    @staticmethod
+    def load_from_string(raw: Union[str, bytes]) -> "OpenAPIParser":
+        return OpenAPIParser(parse_spec_text(raw))
+
+    def iter_endpoints(self) -> Iterator[EndpointView]:
+        """
+        Ленивый обход операций спеки без построения моделей Endpoint.
+        """
+        for path, methods in self.spec.get_paths().items():
             for method, details in methods.items():
-                if method.lower() not in ["get", "post", "put", "patch", "delete"]:
+                # Пропускаем не-HTTP методы
+                if method.lower() not in HTTP_METHODS:
                     continue
+                yield EndpointView(self, path, method, details)
+
+    def find_endpoint(self, path: str, method: str) -> Optional[EndpointView]:
+        """
+        Прямой поиск операции по (path, method) — O(1), без обхода спеки.
+        """
+        methods = self.spec.get_paths().get(path)
+        if not isinstance(methods, dict) or method.lower() not in HTTP_METHODS:
+            return None
 
-                entry = {
-                    "path": path,
-                    "method": method.upper(),
-                    "summary": details.get("summary"),
-                    "operationId": details.get("operationId"),
-                    "parameters": details.get("parameters", []),
-                    "requestBody": details.get("requestBody"),
-                    "responses": details.get("responses", {}),
-                }
-                result.append(entry)
+        details = methods.get(method.lower())
+        if details is None:
+            details = next(
+                (d for m, d in methods.items() if m.lower() == method.lower()),
+                None,
+            )
+        if details is None:
+            return None
+        return EndpointView(self, path, method, details)
 
-        return result
+    def list_endpoints(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "path": ep.path,
+                "method": ep.method,
+                "summary": ep.summary,
+                "operationId": ep.operation_id,
+                "parameters": ep.parameters,
+                "requestBody": ep.request_body,
+                "responses": ep.responses,
+            }
+            for ep in self.iter_endpoints()
+        ]
 
     def list_structured_endpoints(self) -> List[Endpoint]:
-        eps = []
-        for ep in self.list_endpoints():
-            eps.append(
-                Endpoint(
-                    path=ep["path"],
-                    method=ep["method"],
-                    summary=ep.get("summary"),
-                    operation_id=ep.get("operationId"),
-                    parameters=ep.get("parameters", []),
-                    request_body=ep.get("requestBody"),
-                    responses=ep.get("responses", {}),
-                )
-            )
-        return eps
+        return self.parse_endpoints()
 
     def resolve_ref(self, ref: str) -> Dict[str, Any]:
         parts = ref.lstrip("#/").split("/")
@@ -92,44 +231,107 @@ class OpenAPIParser:
                 raise ValueError(f"Invalid $ref path: {ref}")
         return node
 
-    def get_path_parameters(self, endpoint: Endpoint) -> List[Dict[str, Any]]:
+    def get_path_parameters(self, endpoint: AnyEndpoint) -> List[Dict[str, Any]]:
         return [p for p in endpoint.parameters if p.get("in") == "path"]
 
-    def get_query_parameters(self, endpoint: Endpoint) -> List[Dict[str, Any]]:
+    def get_query_parameters(self, endpoint: AnyEndpoint) -> List[Dict[str, Any]]:
         return [p for p in endpoint.parameters if p.get("in") == "query"]
 
     def _resolve_schema(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Возвращает схему с раскрытыми $ref. spec.raw не изменяется,
+        результат для каждого $ref считается один раз и переиспользуется
+        (поэтому возвращаемые схемы нельзя изменять на месте).
+        Ссылка на предка (цикл) заменяется заглушкой {"x-circular-ref": <ref>}.
+        Схема из цикла, уже раскрытая в этом вызове, но в другом контексте,
+        заменяется заглушкой {"x-ref": <ref>} — иначе раскрытие сильно связанных
+        схем росло бы экспоненциально.
+        """
         if not schema:
             return schema
 
-        if "$ref" in schema:
-            resolved = self.resolve_ref(schema["$ref"])
-            return self._resolve_schema(resolved)
-
-        if schema.get("type") == "array":
-            items = schema.get("items", {})
-            if "$ref" in items:
-                resolved_items = self.resolve_ref(items["$ref"])
-                schema["items"] = self._resolve_schema(resolved_items)
+        cached = self._schema_cache.get(id(schema))
+        if cached is not None and cached[0] is schema:
+            return cached[1]
+
+        resolved, _ = self._resolve_node(schema, set(), {})
+        # Держим ссылку на исходный dict, чтобы id() не переиспользовался
+        self._schema_cache[id(schema)] = (schema, resolved)
+        return resolved
+
+    def _placeholder(self, marker: str, ref: str) -> Dict[str, Any]:
+        placeholder = {marker: ref}
+        target = self.resolve_ref(ref)
+        if "type" in target:
+            placeholder["type"] = target["type"]
+        return placeholder
+
+    def _resolve_node(
+        self, node: Any, ancestors: Set[str], expanded: Dict[str, Tuple[Any, frozenset]]
+    ) -> Tuple[Any, frozenset]:
+        """
+        Раскрывает $ref в node. Возвращает (результат, множество $ref, которые
+        были заменены заглушками) — от этого зависит, можно ли кэшировать результат.
+        ancestors — $ref, которые раскрываются сейчас (путь от корня);
+        expanded — $ref, раскрытые в текущем вызове _resolve_schema, но не
+        попавшие в кэш из-за заглушек. Каждая $ref раскрывается не больше одного
+        раза за вызов, поэтому даже полностью связанный граф — за O(размера).
+        """
+        if not isinstance(node, dict):
+            return node, frozenset()
+
+        if "$ref" in node:
+            ref = node["$ref"]
+            if ref in self._ref_cache:
+                return self._ref_cache[ref], frozenset()
+            if ref in ancestors:
+                return self._placeholder("x-circular-ref", ref), frozenset([ref])
+            if ref in expanded:
+                resolved, circular = expanded[ref]
+                # Все заглушки прошлого раскрытия указывают на предков и здесь — результат тот же
+                if circular <= ancestors:
+                    return resolved, circular
+                return self._placeholder("x-ref", ref), frozenset([ref])
+
+            ancestors.add(ref)
+            resolved, circular = self._resolve_node(self.resolve_ref(ref), ancestors, expanded)
+            ancestors.discard(ref)
+            circular = circular - {ref}
+            # Результат с заглушками на другие $ref зависит от того, откуда начали
+            # раскрытие, — в общий кэш не кладём, чтобы он не зависел от порядка запросов
+            if circular:
+                expanded[ref] = (resolved, circular)
             else:
-                schema["items"] = self._resolve_schema(items)
-            return schema
-
-        if schema.get("type") == "object":
-            props = schema.get("properties", {})
-            for name, sub in props.items():
-                schema["properties"][name] = self._resolve_schema(sub)
-
-        # oneOf / anyOf lists
-        if "oneOf" in schema:
-            schema["oneOf"] = [self._resolve_schema(s) for s in schema["oneOf"]]
-
-        if "anyOf" in schema:
-            schema["anyOf"] = [self._resolve_schema(s) for s in schema["anyOf"]]
-
-        return schema
-
-    def get_response_schema(self, endpoint: Endpoint, status_code: str = "200") -> Optional[Dict[str, Any]]:
+                self._ref_cache[ref] = resolved
+            return resolved, circular
+
+        result = dict(node)
+        circular: frozenset = frozenset()
+
+        for key in ("items", "additionalProperties", "not"):
+            if isinstance(node.get(key), dict):
+                result[key], sub_circular = self._resolve_node(node[key], ancestors, expanded)
+                circular |= sub_circular
+
+        if isinstance(node.get("properties"), dict):
+            props = {}
+            for name, sub in node["properties"].items():
+                props[name], sub_circular = self._resolve_node(sub, ancestors, expanded)
+                circular |= sub_circular
+            result["properties"] = props
+
+        for key in ("oneOf", "anyOf", "allOf"):
+            if isinstance(node.get(key), list):
+                variants = []
+                for sub in node[key]:
+                    resolved, sub_circular = self._resolve_node(sub, ancestors, expanded)
+                    variants.append(resolved)
+                    circular |= sub_circular
+                result[key] = variants
+
+        return result, circular
+
+    def get_response_schema(self, endpoint: AnyEndpoint, status_code: str = "200") -> Optional[Dict[str, Any]]:
         responses = endpoint.responses
         if status_code not in responses:
             return None
@@ -143,7 +345,7 @@ class OpenAPIParser:
 
         return self._resolve_schema(schema)
 
-    def get_request_schema(self, endpoint: Endpoint) -> Optional[Dict[str, Any]]:
+    def get_request_schema(self, endpoint: AnyEndpoint) -> Optional[Dict[str, Any]]:
         if not endpoint.request_body:
             return None
 
@@ -189,30 +391,9 @@ class OpenAPIParser:
         }
 
     def parse_endpoints(self) -> List[Endpoint]:
-        endpoints = []
-        paths = self.spec.get_paths()
-
-        for path, methods in paths.items():
-            for method, details in methods.items():
-                # Пропускаем не-HTTP методы
-                if method.lower() not in ["get", "post", "put", "patch", "delete"]:
-                    continue
+        return [ep.to_endpoint() for ep in self.iter_endpoints()]
 
-                endpoint = Endpoint(
-                    path=path,
-                    method=method.upper(),
-                    summary=details.get("summary"),
-                    operation_id=details.get("operationId"),
-                    parameters=details.get("parameters", []),  # List[Dict]
-                    request_body=details.get("requestBody"),  # Dict or None
-                    responses=details.get("responses", {}),  # Dict[str, Any]
-                )
-
-                endpoints.append(endpoint)
-
-        return endpoints
-
-    def get_error_schema(self, endpoint: Endpoint, status_code: str) -> Optional[Dict[str, Any]]:
+    def get_error_schema(self, endpoint: AnyEndpoint, status_code: str) -> Optional[Dict[str, Any]]:
         resp = endpoint.responses.get(status_code)
         if not resp:
             return None
@@ -224,8 +405,45 @@ class OpenAPIParser:
         if not schema:
             return None
 
-        # Если ошибка через $ref
-        if "$ref" in schema:
-            return self._resolve_schema(schema)
+        return self._resolve_schema(schema)
 
-        return self._resolve_schema(schema)
\ No newline at end of file
+    def fingerprint(self, endpoint: AnyEndpoint) -> str:
+        """
+        Отпечаток всего, что build_llm_payload берёт из эндпоинта: параметры,
+        схемы запроса, ответа и ошибок с раскрытыми $ref. Не меняется от порядка
+        ключей, форматирования и переноса схем между components и операцией.
+        """
+        material = {
+            "path": endpoint.path,
+            "method": endpoint.method,
+            "summary": endpoint.summary,
+            "operation_id": endpoint.operation_id,
+            "parameters": [
+                {**param, "schema": self._resolve_schema(param["schema"])}
+                if isinstance(param.get("schema"), dict) else param
+                for param in (self._resolve_schema(p) for p in endpoint.parameters)
+            ],
+            "request_schema": self.get_request_schema(endpoint),
+            "response_schema": self.get_response_schema(endpoint),
+            "error_schemas": {code: self.get_error_schema(endpoint, code) for code in ERROR_STATUS_CODES},
+            "supports_404": "404" in endpoint.responses,
+        }
+        raw = json.dumps(material, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    def fingerprints(self) -> Dict[str, str]:
+        return {endpoint_key(ep): self.fingerprint(ep) for ep in self.iter_endpoints()}
+
+    def diff(self, old: "OpenAPIParser") -> Dict[str, List[str]]:
+        """
+        Какие эндпоинты добавлены, удалены, изменились и не изменились
+        относительно предыдущей версии спеки (по отпечаткам).
+        """
+        new, before = self.fingerprints(), old.fingerprints()
+        common = new.keys() & before.keys()
+        return {
+            "added": sorted(new.keys() - before.keys()),
+            "removed": sorted(before.keys() - new.keys()),
+            "changed": sorted(key for key in common if new[key] != before[key]),
+            "unchanged": sorted(key for key in common if new[key] == before[key]),
+        }
@@ -0,0 +1,129 @@
+import json
+import math
+import os
+from typing import Any, Dict, Optional
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken не обязателен
+    _encoding = None
+
+# Глубина вложенности схем в компактном payload по умолчанию
+PAYLOAD_MAX_DEPTH = int(os.getenv("PAYLOAD_MAX_DEPTH", "6"))
+
+# Ключи, которые модели для генерации тестов не нужны
+STRIP_KEYS = {"description", "example", "examples", "title", "externalDocs", "xml", "deprecated"}
+
+# Части payload со схемами, которые сжимаем
+SCHEMA_KEYS = ("request_schema", "response_schema")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Число токенов в тексте: через tiktoken, если он установлен,
+    иначе грубая оценка ~4 символа на токен.
+    """
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def serialize_payload(payload: Dict[str, Any]) -> str:
+    """
+    JSON payload для промпта: компактный payload — минифицированный,
+    обычный — с отступами, как раньше. Служебный отчёт compaction в промпт не попадает.
+    """
+    data = {k: v for k, v in payload.items() if k != "compaction"}
+    if "compaction" in payload:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
+class SchemaCompactor:
+    """
+    Сжимает схемы одного payload: убирает описания и примеры, ограничивает
+    глубину и заменяет повторяющиеся подсхемы ссылкой {"$same": <путь первой>}.
+    Повторы ищутся по идентичности объектов: резолвер отдаёт одну и ту же
+    схему для каждого использования одного $ref.
+    """
+
+    def __init__(self, max_depth: int):
+        self.max_depth = max_depth
+        self.deduplicated = 0
+        self.truncated = 0
+        self._seen: Dict[int, str] = {}
+
+    def compact(self, node: Any, path: str, depth: int = 0) -> Any:
+        if isinstance(node, list):
+            return [self.compact(item, f"{path}[{i}]", depth) for i, item in enumerate(node)]
+        if not isinstance(node, dict):
+            return node
+
+        is_composite = "properties" in node or "items" in node
+        if is_composite:
+            if id(node) in self._seen:
+                self.deduplicated += 1
+                return {"$same": self._seen[id(node)]}
+            if depth >= self.max_depth:
+                self.truncated += 1
+                return {"type": node.get("type", "object"), "truncated": True}
+            self._seen[id(node)] = path
+
+        result = {}
+        for key, value in node.items():
+            if key in STRIP_KEYS:
+                continue
+            if key == "properties" and isinstance(value, dict):
+                result[key] = {
+                    name: self.compact(sub, f"{path}.{name}", depth + 1)
+                    for name, sub in value.items()
+                }
+            elif key == "items":
+                result[key] = self.compact(value, f"{path}[]", depth + 1)
+            else:
+                result[key] = self.compact(value, path, depth)
+
+        return result
+
+
+def compact_payload(
+    payload: Dict[str, Any],
+    token_budget: Optional[int] = None,
+    max_depth: int = PAYLOAD_MAX_DEPTH,
+) -> Dict[str, Any]:
+    """
+    Возвращает компактную копию payload с отчётом в payload["compaction"].
+    Если задан token_budget, глубина уменьшается, пока payload не уложится в бюджет.
+    """
+    original_tokens = estimate_tokens(serialize_payload(payload))
+
+    depth = max_depth
+    while True:
+        compactor = SchemaCompactor(depth)
+        compacted = dict(payload)
+        for key in SCHEMA_KEYS:
+            compacted[key] = compactor.compact(payload.get(key), key)
+        compacted["error_schemas"] = {
+            code: compactor.compact(schema, f"error_schemas.{code}")
+            for code, schema in (payload.get("error_schemas") or {}).items()
+        }
+        compacted["parameters"] = compactor.compact(payload.get("parameters") or [], "parameters")
+        compacted["compaction"] = {}
+
+        tokens = estimate_tokens(serialize_payload(compacted))
+        if token_budget is None or tokens <= token_budget or depth <= 1:
+            break
+        depth -= 1
+
+    compacted["compaction"] = {
+        "original_tokens": original_tokens,
+        "compacted_tokens": tokens,
+        "saved_tokens": original_tokens - tokens,
+        "max_depth": depth,
+        "deduplicated_schemas": compactor.deduplicated,
+        "truncated_schemas": compactor.truncated,
+        "token_budget": token_budget,
+        "within_budget": token_budget is None or tokens <= token_budget,
+    }
+    return compacted
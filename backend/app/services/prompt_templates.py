@@ -0,0 +1,124 @@
+import hashlib
+import os
+import threading
+from string import Formatter
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Какие версии шаблонов использовать: "api_test=2,e2e=1"; по умолчанию — последняя зарегистрированная
+PROMPT_VERSIONS = os.getenv("PROMPT_VERSIONS", "")
+
+
+class RenderedPrompt(NamedTuple):
+    """
+    Готовый промпт: постоянное системное сообщение и переменная часть в конце.
+    """
+    system: str
+    user: str
+    template_id: str
+
+    def messages(self) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user},
+        ]
+
+
+class PromptTemplate:
+    """
+    Шаблон промпта. Инструкции целиком в system — он одинаков для всех вызовов
+    шаблона, и OpenAI-совместимый бэкенд может переиспользовать KV-кэш префикса.
+    user разбирается на куски один раз при создании, а не на каждом вызове.
+    """
+
+    def __init__(self, name: str, version: str, system: str, user: str):
+        self.name = name
+        self.version = version
+        self.system = system.strip()
+        self.user = user
+        self._parts: List[Tuple[str, Optional[str]]] = [
+            (literal, field) for literal, field, _, _ in Formatter().parse(user)
+        ]
+        self.fields = {field for _, field in self._parts if field}
+
+    @property
+    def id(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    @property
+    def prefix_hash(self) -> str:
+        return hashlib.sha256(self.system.encode("utf-8")).hexdigest()[:12]
+
+    def render(self, **values: Any) -> RenderedPrompt:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Шаблону {self.id} не хватает полей: {', '.join(sorted(missing))}")
+        user = "".join(
+            literal + (str(values[field]) if field else "") for literal, field in self._parts
+        )
+        return RenderedPrompt(self.system, user.strip(), self.id)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "version": self.version,
+            "fields": sorted(self.fields),
+            "system_chars": len(self.system),
+            "prefix_hash": self.prefix_hash,
+        }
+
+
+def _parse_versions(raw: str) -> Dict[str, str]:
+    pinned = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        name, _, version = item.partition("=")
+        pinned[name.strip()] = version.strip()
+    return pinned
+
+
+class PromptRegistry:
+    """
+    Все версии шаблонов по имени. Активная версия — закреплённая в PROMPT_VERSIONS
+    или последняя зарегистрированная.
+    """
+
+    def __init__(self, pinned: Optional[Dict[str, str]] = None):
+        self._templates: Dict[str, Dict[str, PromptTemplate]] = {}
+        self._pinned = dict(pinned or {})
+        self._lock = threading.Lock()
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        with self._lock:
+            self._templates.setdefault(template.name, {})[template.version] = template
+        return template
+
+    def pin(self, name: str, version: Optional[str]) -> None:
+        with self._lock:
+            if version is None:
+                self._pinned.pop(name, None)
+            else:
+                self._pinned[name] = version
+
+    def get(self, name: str, version: Optional[str] = None) -> PromptTemplate:
+        versions = self._templates.get(name)
+        if not versions:
+            raise KeyError(f"Шаблон {name} не зарегистрирован")
+        version = version or self._pinned.get(name)
+        if version is None:
+            return list(versions.values())[-1]
+        if version not in versions:
+            raise KeyError(f"Нет версии {version} шаблона {name}")
+        return versions[version]
+
+    def versions(self, name: str) -> List[PromptTemplate]:
+        return list(self._templates.get(name, {}).values())
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [
+            {**template.info(), "active": template is self.get(name)}
+            for name, versions in self._templates.items()
+            for template in versions.values()
+        ]
+
+
+prompt_registry = PromptRegistry(_parse_versions(PROMPT_VERSIONS))
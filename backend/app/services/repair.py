@@ -0,0 +1,119 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.services.llm_service import call_llm_async
+from app.services.metrics import timed
+from app.services.prompt_templates import PromptTemplate, RenderedPrompt, prompt_registry
+
+# Максимум вызовов модели на один результат (первая генерация + исправления)
+REPAIR_MAX_ATTEMPTS = int(os.getenv("REPAIR_MAX_ATTEMPTS", "3"))
+# Общий бюджет времени на генерацию с исправлениями, секунды
+REPAIR_TIME_BUDGET = float(os.getenv("REPAIR_TIME_BUDGET", "180"))
+
+
+REPAIR_TEMPLATE = prompt_registry.register(PromptTemplate(
+    name="repair",
+    version="2",
+    system="""
+Тебе присылают Python-код теста, который не прошёл автоматическую проверку,
+и список ошибок проверки.
+
+Исправь код так, чтобы устранить ВСЕ перечисленные ошибки, сохранив остальное без изменений.
+Выводи ТОЛЬКО исправленный Python-код, без Markdown и без ```python.
+""",
+    user="""
+Ошибки проверки:
+{error_list}
+
+--- BEGIN CODE ---
+{code}
+--- END CODE ---
+""",
+))
+
+
+@timed("prompt_render")
+def prepare_repair_prompt(code: str, errors: List[str]) -> RenderedPrompt:
+    error_list = "\n".join(f"- {e}" for e in errors)
+    return prompt_registry.get("repair").render(code=code, error_list=error_list)
+
+
+class RepairStats:
+    """
+    Сколько вызовов модели потребовалось на результат и чем всё закончилось.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts: Dict[int, int] = {}
+        self.valid = 0
+        self.invalid = 0
+
+    def record(self, attempts: int, valid: bool) -> None:
+        with self._lock:
+            self.attempts[attempts] = self.attempts.get(attempts, 0) + 1
+            if valid:
+                self.valid += 1
+            else:
+                self.invalid += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.valid + self.invalid
+            calls = sum(n * count for n, count in self.attempts.items())
+            return {
+                "results": total,
+                "valid": self.valid,
+                "invalid": self.invalid,
+                "attempts_histogram": dict(sorted(self.attempts.items())),
+                "avg_attempts": calls / total if total else 0.0,
+            }
+
+
+repair_stats = RepairStats()
+
+
+async def generate_with_repair(
+    generate: Callable[[], Awaitable[str]],
+    validate: Callable[[str], dict],
+    max_attempts: Optional[int] = None,
+    time_budget: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Генерирует код и, пока валидатор находит ошибки, просит модель исправить
+    только сам код по списку ошибок — без исходного промпта.
+    Останавливается на валидном коде, исчерпании попыток или бюджета времени.
+    """
+    max_attempts = max_attempts or REPAIR_MAX_ATTEMPTS
+    time_budget = time_budget or REPAIR_TIME_BUDGET
+    started = time.monotonic()
+
+    code = await generate()
+    validation = validate(code)
+    attempts = 1
+
+    while validation["errors"] and attempts < max_attempts:
+        remaining = time_budget - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+        attempts += 1
+        try:
+            fixed = await asyncio.wait_for(
+                call_llm_async(
+                    prepare_repair_prompt(code, validation["errors"]), use_cache=False
+                ),
+                remaining,
+            )
+        except asyncio.TimeoutError:
+            break
+
+        fixed_validation = validate(fixed)
+        # Не подменяем результат исправлением, которое сделало хуже
+        if len(fixed_validation["errors"]) <= len(validation["errors"]):
+            code, validation = fixed, fixed_validation
+
+    repair_stats.record(attempts, not validation["errors"])
+    return {"code": code, "validation": validation, "attempts": attempts}
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import os
+import select
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.services.mock_api_server import MockAPIServer
+from app.services.openapi_parser import OpenAPIParser
+
+# Сколько pytest-прогонов одновременно и сколько секунд даём одному прогону
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", "4"))
+SANDBOX_TIMEOUT = float(os.getenv("SANDBOX_TIMEOUT", "60"))
+
+# После стольких прогонов воркер перезапускается: тесты могут оставить после себя состояние
+SANDBOX_WORKER_MAX_RUNS = int(os.getenv("SANDBOX_WORKER_MAX_RUNS", "50"))
+# Пользователь, от имени которого работают воркеры (нужен запуск сервера от root); пусто — тот же
+SANDBOX_USER = os.getenv("SANDBOX_USER", "")
+
+_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+
+def sandbox_env() -> Dict[str, str]:
+    """
+    Окружение воркера: только то, что нужно интерпретатору. Ключи модели
+    и прочие переменные сервера в сгенерированный код не попадают.
+    """
+    env = {"PATH": os.environ.get("PATH", os.defpath)}
+    if os.environ.get("PYTHONPATH"):
+        env["PYTHONPATH"] = os.environ["PYTHONPATH"]
+    return env
+
+
+class SandboxWorker:
+    """
+    Долгоживущий процесс с pytest (sandbox_worker.py): интерпретатор и импорты
+    поднимаются один раз, дальше каждый прогон — один вызов pytest.main.
+    """
+
+    def __init__(self):
+        self.runs = 0
+        user = {"user": SANDBOX_USER, "group": SANDBOX_USER, "extra_groups": []} if SANDBOX_USER else {}
+        self.proc = subprocess.Popen(
+            [sys.executable, _WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=sandbox_env(),
+            cwd=tempfile.gettempdir(),
+            text=True,
+            **user,
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def run(self, job: Dict[str, str], timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Ответ воркера ({"exit_code", "violations"}) или None, если прогон не
+        уложился в timeout (тогда воркер убит и больше не используется).
+        """
+        self.proc.stdin.write(json.dumps(job) + "\n")
+        self.proc.stdin.flush()
+        ready, _, _ = select.select([self.proc.stdout], [], [], timeout)
+        line = self.proc.stdout.readline() if ready else ""
+        if not line:
+            self.stop()
+            if ready:
+                raise RuntimeError("Воркер песочницы завершился во время прогона")
+            return None
+        self.runs += 1
+        return json.loads(line)
+
+    def stop(self) -> None:
+        if self.alive:
+            self.proc.kill()
+        self.proc.wait()
+        for stream in (self.proc.stdin, self.proc.stdout):
+            stream.close()
+
+
+_sandbox_pool: Optional[ThreadPoolExecutor] = None
+# У каждого потока пула свой воркер; список — чтобы остановить всех при выключении
+_local = threading.local()
+_workers: List[SandboxWorker] = []
+_workers_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> ThreadPoolExecutor:
+    """
+    Общий на процесс пул: ограничивает число одновременных прогонов pytest.
+    """
+    global _sandbox_pool
+    if _sandbox_pool is None:
+        _sandbox_pool = ThreadPoolExecutor(max_workers=SANDBOX_WORKERS, thread_name_prefix="sandbox")
+    return _sandbox_pool
+
+
+def get_sandbox_worker() -> SandboxWorker:
+    worker = getattr(_local, "worker", None)
+    if worker is not None and worker.alive and worker.runs < SANDBOX_WORKER_MAX_RUNS:
+        return worker
+    if worker is not None:
+        worker.stop()
+    worker = _local.worker = SandboxWorker()
+    with _workers_lock:
+        _workers[:] = [w for w in _workers if w.alive]
+        _workers.append(worker)
+    return worker
+
+
+def shutdown_sandbox_pool() -> None:
+    global _sandbox_pool
+    if _sandbox_pool is not None:
+        _sandbox_pool.shutdown(cancel_futures=True)
+        _sandbox_pool = None
+    with _workers_lock:
+        for worker in _workers:
+            worker.stop()
+        _workers.clear()
+
+
+def parse_junit(path: str) -> Dict[str, Dict[str, Any]]:
+    tests: Dict[str, Dict[str, Any]] = {}
+    for case in ET.parse(path).getroot().iter("testcase"):
+        outcome, message = "passed", None
+        for tag in ("failure", "error", "skipped"):
+            node = case.find(tag)
+            if node is not None:
+                outcome = {"failure": "failed"}.get(tag, tag)
+                message = node.get("message")
+                break
+        tests[case.get("name")] = {"outcome": outcome, "message": message}
+    return tests
+
+
+def run_pytest_file(code: str, mock_url: str, timeout: float = SANDBOX_TIMEOUT) -> Dict[str, Any]:
+    """
+    Компилирует и запускает сгенерированный файл в воркере песочницы текущего
+    потока. Возвращает результат по каждой тестовой функции.
+    """
+    try:
+        compile(code, "test_generated.py", "exec")
+    except SyntaxError as e:
+        return {"status": "compile_error", "error": f"{e.msg} (строка {e.lineno})", "tests": {}}
+
+    with tempfile.TemporaryDirectory(prefix="sandbox_") as workdir:
+        with open(os.path.join(workdir, "test_generated.py"), "w") as f:
+            f.write(code)
+        if SANDBOX_USER:
+            shutil.chown(workdir, SANDBOX_USER, SANDBOX_USER)
+        job = {
+            "workdir": workdir,
+            "mock_url": mock_url,
+            "report": os.path.join(workdir, "report.xml"),
+            "output": os.path.join(workdir, "output.txt"),
+        }
+        response = get_sandbox_worker().run(job, timeout)
+        if response is None:
+            return {"status": "timeout", "error": f"Прогон дольше {timeout} с", "tests": {}}
+
+        tests = parse_junit(job["report"]) if os.path.exists(job["report"]) else {}
+        with open(job["output"]) as f:
+            output = f.read()
+
+    exit_code = response["exit_code"]
+    if response["violations"]:
+        # Тест пытался выйти за песочницу: ни вывод, ни сообщения тестов не отдаём —
+        # в них могло попасть то, что он успел прочитать
+        return {
+            "status": "blocked",
+            "exit_code": exit_code,
+            "error": "Тест обращался к запрещённым ресурсам",
+            "violations": response["violations"],
+            "tests": {name: {"outcome": test["outcome"], "message": None} for name, test in tests.items()},
+        }
+
+    passed = bool(tests) and all(t["outcome"] in ("passed", "skipped") for t in tests.values())
+    return {
+        "status": "passed" if passed else "failed",
+        "exit_code": exit_code,
+        "tests": tests,
+        "output": output[-2000:],
+    }
+
+
+async def verify_api_test(parser: OpenAPIParser, code: str, timeout: float = SANDBOX_TIMEOUT) -> Dict[str, Any]:
+    """
+    Запускает сгенерированный API-тест против локального mock-сервера,
+    построенного по той же спеке.
+    """
+    loop = asyncio.get_running_loop()
+    with MockAPIServer(parser) as mock:
+        return await loop.run_in_executor(
+            get_sandbox_pool(), run_pytest_file, code, mock.base_url, timeout
+        )
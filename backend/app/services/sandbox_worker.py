@@ -0,0 +1,206 @@
+"""
+Процесс-воркер песочницы. Запускается один раз и прогоняет pytest для
+присланных файлов, пока не закроют stdin: по строке JSON на задание
+({"workdir", "mock_url", "report", "output"}), в ответ — {"exit_code",
+"violations"}: коды и события, которые запретил аудит-хук.
+
+Импортирует только stdlib, pytest и httpx — пакет app ему не нужен.
+"""
+import contextlib
+import ctypes  # noqa: F401 — грузит libc до аудит-хука: его импортируют плагины pytest
+import json
+import os
+import sys
+import sysconfig
+import tempfile
+import traceback
+
+import httpx
+import pytest
+
+# httpcore при первом запросе импортирует trio, если он установлен, а тот при
+# импорте ищет libc через subprocess — импортируем заранее, до аудит-хука
+with contextlib.suppress(ImportError):
+    import trio  # noqa: F401
+
+# Адрес mock-сервера текущего прогона: куда перенаправляется httpx и куда разрешена сеть
+_mock = {"url": None}
+# Каталог текущего прогона (единственное место, где можно писать) и что запретил хук
+_run = {"workdir": None, "violations": []}
+
+_BLOCKED_EVENTS = {
+    "subprocess.Popen", "os.system", "os.exec", "os.spawn", "os.posix_spawn",
+    "os.fork", "os.forkpty", "pty.spawn", "ctypes.dlopen",
+    "os.kill", "os.killpg", "signal.pthread_kill",
+}
+_ADDRESS_EVENTS = {"socket.connect", "socket.sendto", "socket.sendmsg"}
+# Изменение файлов: разрешено только внутри каталога прогона
+_WRITE_EVENTS = {
+    "os.remove", "os.rename", "os.rmdir", "os.mkdir", "os.truncate", "os.chmod", "os.chown",
+    "os.link", "os.symlink", "os.utime", "shutil.rmtree", "shutil.move", "shutil.copyfile",
+}
+_LIST_EVENTS = {"os.listdir", "os.scandir"}
+_WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_APPEND | os.O_TRUNC
+# Читать можно только stdlib, site-packages с pytest и httpx и каталог прогона
+_READ_ROOTS = tuple(sorted({
+    os.path.realpath(path) + os.sep
+    for path in [
+        os.path.dirname(sysconfig.get_paths()["stdlib"]),
+        *(sysconfig.get_paths()[name] for name in ("platstdlib", "purelib", "platlib")),
+        *(os.path.dirname(os.path.dirname(module.__file__)) for module in (pytest, httpx)),
+    ]
+}))
+_DEVICES = {os.devnull}
+
+
+def _is_mock_host(host) -> bool:
+    url = _mock["url"]
+    if isinstance(host, bytes):
+        host = host.decode(errors="replace")
+    return url is not None and host == url.host
+
+
+def _in_workdir(path) -> bool:
+    workdir = _run["workdir"]
+    if isinstance(path, int) or os.fsdecode(path) in _DEVICES:
+        return True
+    if workdir is None:
+        return False
+    return (os.path.realpath(os.fsdecode(path)) + os.sep).startswith(workdir + os.sep)
+
+
+def _readable(path) -> bool:
+    if _in_workdir(path):
+        return True
+    return (os.path.realpath(os.fsdecode(path)) + os.sep).startswith(_READ_ROOTS)
+
+
+def _deny(event: str, detail) -> None:
+    # Пишем только имя события: детали (пути, адреса) могли бы стать каналом утечки
+    _run["violations"].append(event)
+    raise PermissionError(f"В песочнице запрещено: {event} {detail!r}")
+
+
+def _guard(event: str, args: tuple) -> None:
+    """
+    Аудит-хук: его нельзя снять из Python-кода теста. Запрещает запуск
+    процессов и сигналы, загрузку нативных библиотек, сеть куда-либо, кроме
+    mock, чтение вне stdlib, site-packages и каталога прогона, запись вне него.
+    """
+    if event in _BLOCKED_EVENTS:
+        _deny(event, None)
+    elif event == "open":
+        path, mode, flags = args
+        if path is None:
+            return
+        writes = any(c in mode for c in "wax+") if isinstance(mode, str) else bool(flags & _WRITE_FLAGS)
+        if not (_in_workdir(path) if writes else _readable(path)):
+            _deny(event, path)
+    elif event in _WRITE_EVENTS:
+        paths = [arg for arg in args[:2] if isinstance(arg, (str, bytes, os.PathLike))]
+        if not all(_in_workdir(path) for path in paths):
+            _deny(event, paths)
+    elif event in _LIST_EVENTS:
+        if args and args[0] is not None and not isinstance(args[0], int) and not _readable(args[0]):
+            _deny(event, args[0])
+    elif event in _ADDRESS_EVENTS:
+        address = args[1]
+        if address is None:
+            return
+        if not (isinstance(address, tuple) and _is_mock_host(address[0]) and address[1] == _mock["url"].port):
+            _deny(event, address)
+    elif event == "socket.getaddrinfo" and not _is_mock_host(args[0]):
+        _deny(event, args[0])
+
+
+def _redirect(request: httpx.Request) -> None:
+    url = _mock["url"]
+    request.url = request.url.copy_with(scheme=url.scheme, host=url.host, port=url.port)
+
+
+async def _redirect_async(request: httpx.Request) -> None:
+    _redirect(request)
+
+
+def _patch(client_cls, hook) -> None:
+    # Все запросы httpx уходят на mock-сервер, путь и query сохраняются
+    original_init = client_cls.__init__
+
+    def __init__(self, *args, **kwargs):
+        hooks = dict(kwargs.pop("event_hooks", None) or {})
+        hooks["request"] = [hook] + list(hooks.get("request", []))
+        original_init(self, *args, event_hooks=hooks, **kwargs)
+
+    client_cls.__init__ = __init__
+
+
+def _forget_modules(workdir: str) -> None:
+    # Модули прогона (test_generated и всё из его каталога) не должны достаться следующему
+    prefix = os.path.realpath(workdir) + os.sep
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None) or ""
+        if os.path.realpath(path).startswith(prefix):
+            del sys.modules[name]
+
+
+def run_job(job: dict) -> int:
+    _mock["url"] = httpx.URL(job["mock_url"])
+    _run["workdir"] = os.path.realpath(job["workdir"])
+    _run["violations"] = []
+    # Временные файлы pytest (захват вывода и т.п.) — тоже в каталоге прогона
+    tempfile.tempdir = _run["workdir"]
+    os.chdir(job["workdir"])
+    config = os.path.join(job["workdir"], "pytest.ini")
+    try:
+        with open(config, "w") as f:
+            f.write("[pytest]\n")
+        with open(job["output"], "w") as output, contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            # Свой pytest.ini и --noconftest: pytest не читает конфиги из родительских каталогов
+            return int(pytest.main([
+                "-q",
+                "-c", config,
+                "--noconftest",
+                "-p", "no:cacheprovider",
+                "--import-mode=importlib",
+                f"--junitxml={job['report']}",
+                "test_generated.py",
+            ]))
+    finally:
+        _forget_modules(job["workdir"])
+        _run["workdir"] = None
+
+
+def main() -> None:
+    # Ответы пишем в копию stdout; сам fd 1 закрываем от вывода тестов
+    protocol = os.fdopen(os.dup(1), "w")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+
+    _patch(httpx.Client, _redirect)
+    _patch(httpx.AsyncClient, _redirect_async)
+    # Байткод в stdlib и site-packages писать нельзя — и не нужно пытаться. Импорт
+    # ищет модули только там, где читать можно (не в каталоге скрипта и не в PYTHONPATH)
+    sys.dont_write_bytecode = True
+    sys.path[:] = [path for path in sys.path if path and _readable(path)]
+    sys.path_importer_cache.clear()
+    # Сторонние плагины pytest (anyio, trio и т.п.) сгенерированным тестам не нужны
+    os.environ["PYTEST_DISABLE_PLUGIN_AUTOLOAD"] = "1"
+    sys.addaudithook(_guard)
+
+    for line in sys.stdin:
+        job = json.loads(line)
+        try:
+            exit_code = run_job(job)
+        except Exception:
+            exit_code = int(pytest.ExitCode.INTERNAL_ERROR)
+            _run["workdir"] = os.path.realpath(job["workdir"])
+            with open(job["output"], "a") as output:
+                output.write(traceback.format_exc())
+            _run["workdir"] = None
+        violations = sorted(set(_run["violations"]))
+        protocol.write(json.dumps({"exit_code": exit_code, "violations": violations}) + "\n")
+        protocol.flush()
+
+
+if __name__ == "__main__":
+    main()
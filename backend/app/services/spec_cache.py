@@ -0,0 +1,47 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from app.services.metrics import spec_cache_requests_total, stage_timer
+from app.services.openapi_parser import OpenAPIParser
+
+SPEC_CACHE_MAX_ENTRIES = int(os.getenv("SPEC_CACHE_MAX_ENTRIES", "16"))
+
+_parsers: "OrderedDict[str, OpenAPIParser]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def spec_hash(raw: str) -> str:
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_parser(raw: str) -> OpenAPIParser:
+    """
+    Возвращает распарсенный OpenAPIParser для текста спеки.
+    Парсеры кэшируются по sha256 содержимого (LRU, SPEC_CACHE_MAX_ENTRIES штук),
+    поэтому повторные запросы по той же спеке не парсят её заново.
+    """
+    key = spec_hash(raw)
+    with _lock:
+        parser = _parsers.get(key)
+        if parser is not None:
+            _parsers.move_to_end(key)
+            spec_cache_requests_total.inc("hit")
+            return parser
+
+    spec_cache_requests_total.inc("miss")
+    with stage_timer("spec_parse"):
+        parser = OpenAPIParser.load_from_string(raw)
+
+    with _lock:
+        _parsers[key] = parser
+        _parsers.move_to_end(key)
+        while len(_parsers) > SPEC_CACHE_MAX_ENTRIES:
+            _parsers.popitem(last=False)
+    return parser
+
+
+def clear_spec_cache() -> None:
+    with _lock:
+        _parsers.clear()
@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.services.openapi_parser import OpenAPIParser
+from app.services.spec_cache import get_parser, spec_hash
+from app.services.state_backend import StateBackend, state_backend
+
+# Лимиты хранилища загруженных спек (размер считается по исходному тексту)
+SPEC_STORE_MAX_BYTES = int(os.getenv("SPEC_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+SPEC_STORE_MAX_SPECS = int(os.getenv("SPEC_STORE_MAX_SPECS", "64"))
+# Сколько секунд текст спеки хранится в общем хранилище (для других воркеров)
+SPEC_STORE_TTL = float(os.getenv("SPEC_STORE_TTL", str(24 * 3600)))
+
+_NAMESPACE = "specs"
+
+
+class SpecNotFoundError(KeyError):
+    pass
+
+
+class SpecTooLargeError(ValueError):
+    pass
+
+
+class StoredSpec:
+    def __init__(self, spec_id: str, parser: OpenAPIParser, size: int):
+        self.spec_id = spec_id
+        self.parser = parser
+        self.size = size
+        self.endpoint_count = sum(1 for _ in parser.iter_endpoints())
+        self.created_at = time.time()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "spec_id": self.spec_id,
+            "size": self.size,
+            "endpoints": self.endpoint_count,
+            "created_at": self.created_at,
+        }
+
+
+class SpecStore:
+    """
+    Хранилище загруженных спек: спека загружается и парсится один раз,
+    дальше генерация идёт по spec_id. При превышении лимитов вытесняются
+    давно не использованные спеки (LRU).
+    С общим backend текст спеки сохраняется и там: воркер, которому спека
+    не загружалась, парсит её при первом обращении по spec_id.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = SPEC_STORE_MAX_BYTES,
+        max_specs: int = SPEC_STORE_MAX_SPECS,
+        backend: Optional[StateBackend] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.max_specs = max_specs
+        self.backend = backend
+        self._specs: "OrderedDict[str, StoredSpec]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, raw: str) -> StoredSpec:
+        size = len(raw.encode("utf-8"))
+        if size > self.max_bytes:
+            raise SpecTooLargeError(
+                f"Спека занимает {size} байт, лимит хранилища — {self.max_bytes}"
+            )
+
+        spec_id = spec_hash(raw)
+        with self._lock:
+            stored = self._specs.get(spec_id)
+            if stored is not None:
+                self._specs.move_to_end(spec_id)
+                return stored
+
+        stored = self._store_local(spec_id, raw, size)
+        if self.backend is not None:
+            self.backend.set(_NAMESPACE, spec_id, raw, SPEC_STORE_TTL)
+        return stored
+
+    def _store_local(self, spec_id: str, raw: str, size: int) -> StoredSpec:
+        parser = get_parser(raw)
+        stored = StoredSpec(spec_id, parser, size)
+
+        with self._lock:
+            if spec_id in self._specs:
+                stored = self._specs[spec_id]
+            else:
+                self._specs[spec_id] = stored
+                self._total_bytes += size
+            self._specs.move_to_end(spec_id)
+            self._evict()
+        return stored
+
+    def get(self, spec_id: str) -> StoredSpec:
+        with self._lock:
+            stored = self._specs.get(spec_id)
+            if stored is not None:
+                self._specs.move_to_end(spec_id)
+                return stored
+
+        raw = self.backend.get(_NAMESPACE, spec_id) if self.backend is not None else None
+        if raw is None:
+            raise SpecNotFoundError(spec_id)
+        return self._store_local(spec_id, raw, len(raw.encode("utf-8")))
+
+    def remove(self, spec_id: str) -> None:
+        with self._lock:
+            stored = self._specs.pop(spec_id, None)
+            if stored is not None:
+                self._total_bytes -= stored.size
+        removed = self.backend.delete(_NAMESPACE, spec_id) if self.backend is not None else False
+        if stored is None and not removed:
+            raise SpecNotFoundError(spec_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "specs": len(self._specs),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "max_specs": self.max_specs,
+            }
+
+    def _evict(self) -> None:
+        while self._specs and (
+            len(self._specs) > self.max_specs or self._total_bytes > self.max_bytes
+        ):
+            _, stored = self._specs.popitem(last=False)
+            self._total_bytes -= stored.size
+
+
+spec_store = SpecStore(backend=state_backend if state_backend.shared else None)
+
+
+def resolve_parser(openapi: Optional[str], spec_id: Optional[str]) -> OpenAPIParser:
+    """
+    Парсер для запроса: по spec_id из хранилища или по тексту спеки.
+    """
+    if spec_id:
+        return spec_store.get(spec_id).parser
+    return get_parser(openapi)
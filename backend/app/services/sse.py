@@ -0,0 +1,35 @@
+import json
+from typing import Any, AsyncIterator, Callable, Optional
+
+
+def format_sse(event: str, data: Any) -> str:
+    """
+    Одно событие Server-Sent Events: data сериализуется в JSON.
+    """
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def stream_generation(
+    chunks: AsyncIterator[str],
+    validate: Callable[[str], dict],
+    finalize: Optional[Callable[[str], str]] = None,
+) -> AsyncIterator[str]:
+    """
+    Пересылает куски кода событиями token, а в конце отдаёт событие result
+    с собранным кодом и результатом валидации (или error при сбое модели).
+    finalize, если задан, собирает итоговый код из склеенных кусков.
+    """
+    parts = []
+    try:
+        async for text in chunks:
+            parts.append(text)
+            yield format_sse("token", {"text": text})
+    except Exception as e:
+        yield format_sse("error", {"detail": f"Ошибка модели: {str(e)}"})
+        return
+
+    code = "".join(parts).strip()
+    if finalize is not None:
+        code = finalize(code)
+    yield format_sse("result", {"code": code, "validation": validate(code)})
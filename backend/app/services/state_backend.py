@@ -0,0 +1,252 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+# Где хранится общее состояние (кэш ответов модели, спеки, прогресс задач):
+# memory — в процессе (один воркер), sqlite — в файле, общем для воркеров и реплик на хосте
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+STATE_SQLITE_PATH = os.getenv("STATE_SQLITE_PATH", "state.sqlite3")
+# Раз в столько записей истёкшие значения удаляются из хранилища (0 — никогда)
+STATE_PURGE_EVERY = int(os.getenv("STATE_PURGE_EVERY", "500"))
+
+
+class StateBackend(ABC):
+    """
+    Строковые значения по (namespace, key) с необязательным TTL в секундах.
+    shared=True — значения видят все процессы, использующие тот же бэкенд.
+    """
+
+    shared = False
+    _writes = 0
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    def add(self, namespace: str, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        """
+        Записывает значение, только если ключа нет (или он истёк); True — записали.
+        """
+
+    @abstractmethod
+    def renew(self, namespace: str, key: str, value: str, ttl: float) -> bool:
+        """
+        Продлевает TTL, только если ключ не истёк и хранит value; True — продлили.
+        """
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def keys(self, namespace: str) -> List[str]:
+        ...
+
+    @abstractmethod
+    def clear(self, namespace: str) -> None:
+        ...
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """
+        Удаляет истёкшие значения всех namespace; возвращает, сколько удалено.
+        """
+
+    def _count_write(self) -> None:
+        # Истёкшие значения, которые никто не читает, иначе копились бы вечно
+        self._writes += 1
+        if STATE_PURGE_EVERY and self._writes % STATE_PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def get_json(self, namespace: str, key: str) -> Any:
+        value = self.get(namespace, key)
+        return json.loads(value) if value is not None else None
+
+    def set_json(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set(namespace, key, json.dumps(value, ensure_ascii=False), ttl)
+
+
+class MemoryBackend(StateBackend):
+    def __init__(self):
+        self._data: Dict[Tuple[str, str], Tuple[Optional[float], str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get((namespace, key))
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[(namespace, key)]
+                return None
+            return value
+
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[(namespace, key)] = (expires_at, value)
+        self._count_write()
+
+    def add(self, namespace: str, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get((namespace, key))
+            if entry is not None and (entry[0] is None or entry[0] > now):
+                return False
+            self._data[(namespace, key)] = (now + ttl if ttl is not None else None, value)
+        self._count_write()
+        return True
+
+    def renew(self, namespace: str, key: str, value: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get((namespace, key))
+            if entry is None or entry[1] != value or (entry[0] is not None and entry[0] <= now):
+                return False
+            self._data[(namespace, key)] = (now + ttl, value)
+            return True
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            return self._data.pop((namespace, key), None) is not None
+
+    def keys(self, namespace: str) -> List[str]:
+        now = time.time()
+        with self._lock:
+            return [
+                key for (ns, key), (expires_at, _) in self._data.items()
+                if ns == namespace and (expires_at is None or expires_at > now)
+            ]
+
+    def clear(self, namespace: str) -> None:
+        with self._lock:
+            for item in [item for item in self._data if item[0] == namespace]:
+                del self._data[item]
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [item for item, (expires_at, _) in self._data.items() if expires_at is not None and expires_at <= now]
+            for item in expired:
+                del self._data[item]
+        return len(expired)
+
+
+class SQLiteBackend(StateBackend):
+    """
+    Одна таблица в SQLite-файле. WAL и busy_timeout позволяют нескольким
+    процессам читать и писать одновременно.
+    """
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._db.commit()
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM state WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row[0]
+
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, expires_at),
+            )
+            self._db.commit()
+        self._count_write()
+
+    def add(self, namespace: str, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        with self._lock:
+            # Одна транзакция: истёкшую запись удаляем, затем вставляем, если ключа нет
+            self._db.execute(
+                "DELETE FROM state WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                (namespace, key, now),
+            )
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, now + ttl if ttl is not None else None),
+            )
+            self._db.commit()
+        self._count_write()
+        return cursor.rowcount > 0
+
+    def renew(self, namespace: str, key: str, value: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE state SET expires_at = ? WHERE namespace = ? AND key = ? AND value = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (now + ttl, namespace, key, value, now),
+            )
+            self._db.commit()
+            return cursor.rowcount > 0
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+            self._db.commit()
+            return cursor.rowcount > 0
+
+    def keys(self, namespace: str) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key FROM state WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, time.time()),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def clear(self, namespace: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM state WHERE namespace = ?", (namespace,))
+            self._db.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+
+def create_backend(kind: str = STATE_BACKEND, sqlite_path: str = STATE_SQLITE_PATH) -> StateBackend:
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(sqlite_path)
+    raise ValueError(f"Неизвестный STATE_BACKEND: {kind} (ожидается memory или sqlite)")
+
+
+state_backend = create_backend()
@@ -0,0 +1,345 @@
+import asyncio
+import io
+import json
+import os
+import re
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Union
+
+from app.services.openapi_parser import AnyEndpoint, EndpointView, OpenAPIParser
+from app.services.llm_payload_builder import build_llm_payload
+from app.services.api_test_generator import generate_api_test, compose_test_file
+from app.services.api_manual_test_generator import (
+    generate_api_manual_test,
+    compose_manual_test_file,
+)
+from app.services.bulk_runner import run_bulk
+from app.services.test_validators import validate_pytest_api, validate_manual_test
+from app.services.state_backend import StateBackend, state_backend
+from app.services.prompt_templates import prompt_registry
+
+# Сколько задач держим в памяти (старые завершённые вытесняются)
+SUITE_JOBS_MAX = int(os.getenv("SUITE_JOBS_MAX", "32"))
+# Сколько секунд прогресс и файлы задачи хранятся в общем хранилище
+SUITE_JOBS_TTL = float(os.getenv("SUITE_JOBS_TTL", str(24 * 3600)))
+# Как часто воркер без задачи в памяти перечитывает её прогресс из хранилища
+SUITE_JOBS_POLL_INTERVAL = float(os.getenv("SUITE_JOBS_POLL_INTERVAL", "0.5"))
+# Сколько секунд хранятся готовые тесты эндпоинтов для инкрементальной перегенерации
+ENDPOINT_TESTS_TTL = float(os.getenv("ENDPOINT_TESTS_TTL", str(30 * 24 * 3600)))
+
+_JOBS_NAMESPACE = "suite_jobs"
+_FILES_NAMESPACE = "suite_files"
+_RESULTS_NAMESPACE = "suite_results"
+_ENDPOINT_TESTS_NAMESPACE = "endpoint_tests"
+
+
+def endpoint_file_name(endpoint: AnyEndpoint, mode: str) -> str:
+    base = endpoint.operation_id or f"{endpoint.method}_{endpoint.path}"
+    name = re.sub(r"[^0-9a-zA-Z]+", "_", base).strip("_").lower()
+    suffix = "_manual" if mode == "manual" else ""
+    return f"test_{name}{suffix}.py"
+
+
+def endpoint_file_names(endpoints: List[AnyEndpoint], mode: str) -> List[str]:
+    """
+    Имена файлов в порядке эндпоинтов; совпавшие после нормализации
+    (getVM и getVm, /a-b и /a_b) получают суффикс _2, _3, ...
+    """
+    names: List[str] = []
+    used = set()
+    for endpoint in endpoints:
+        name = endpoint_file_name(endpoint, mode)
+        stem, number = name[:-len(".py")], 2
+        while name in used:
+            name = f"{stem}_{number}.py"
+            number += 1
+        used.add(name)
+        names.append(name)
+    return names
+
+
+def build_archive(files: Dict[str, str], summary: Dict[str, Any]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, content in sorted(files.items()):
+            zf.writestr(name, content)
+        zf.writestr("report.json", json.dumps(summary, ensure_ascii=False, indent=2))
+    return buffer.getvalue()
+
+
+class SuiteJob:
+    """
+    Генерация тестов по всем эндпоинтам спеки: один файл на эндпоинт.
+    """
+
+    def __init__(
+        self,
+        parser: OpenAPIParser,
+        mode: str = "auto",
+        max_concurrency: Optional[int] = None,
+        compact: bool = False,
+        token_budget: Optional[int] = None,
+        incremental: bool = False,
+        skeleton: bool = False,
+        outputs: StateBackend = state_backend,
+    ):
+        self.id = uuid.uuid4().hex
+        self.parser = parser
+        self.mode = mode
+        self.max_concurrency = max_concurrency
+        self.compact = compact
+        self.token_budget = token_budget
+        # Готовые тесты по отпечатку эндпоинта: с incremental=True модель вызывается
+        # только для эндпоинтов, которые изменились с прошлой генерации
+        self.incremental = incremental
+        self.outputs = outputs
+        # Каркас API-тестов строится локально, модель пишет только сценарии
+        self.skeleton = skeleton
+        self.endpoints: List[EndpointView] = list(parser.iter_endpoints())
+        self.file_names = endpoint_file_names(self.endpoints, mode)
+        self.status = "pending"
+        self.completed = 0
+        self.failed = 0
+        self.reused = 0
+        self.files: Dict[str, str] = {}
+        self.results: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        # Общее хранилище: туда пишется прогресс, чтобы его видели другие воркеры
+        self.backend: Optional[StateBackend] = None
+        self._changed = asyncio.Condition()
+        self._version = 0
+        # Последняя версия, записанная в хранилище; запись — по одной за раз
+        self._persisted = -1
+        self._persist_lock = asyncio.Lock()
+
+    @property
+    def total(self) -> int:
+        return len(self.endpoints)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def progress(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "mode": self.mode,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "reused": self.reused,
+            "error": self.error,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {**self.progress(), "results": self.results}
+
+    async def wait_for_change(self, version: int, timeout: float) -> int:
+        """
+        Ждёт, пока прогресс изменится относительно version; возвращает новую версию.
+        """
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: self._version != version),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                pass
+            return self._version
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+        await self._persist()
+
+    async def _persist(self) -> None:
+        """
+        Пишет прогресс в хранилище в отдельном потоке. Пока идёт запись,
+        изменения копятся: следующая запись сразу берёт последнюю версию.
+        """
+        if self.backend is None:
+            return
+        async with self._persist_lock:
+            if self._persisted == self._version:
+                return
+            version = self._version
+            await asyncio.to_thread(self._save, version, self.progress(), self.finished)
+
+    def _save(self, version: int, progress: Dict[str, Any], finished: bool) -> None:
+        """
+        На каждое изменение — только счётчики; результаты и файлы — один раз,
+        когда задача завершилась (до прогресса, чтобы их видел тот, кто увидел done).
+        """
+        if finished:
+            self.backend.set_json(_RESULTS_NAMESPACE, self.id, self.results, SUITE_JOBS_TTL)
+            self.backend.set_json(_FILES_NAMESPACE, self.id, self.files, SUITE_JOBS_TTL)
+        self.backend.set_json(
+            _JOBS_NAMESPACE, self.id, {"version": version, "progress": progress}, SUITE_JOBS_TTL
+        )
+        self._persisted = version
+
+    async def _generate_one(self, test_number: int) -> Dict[str, Any]:
+        endpoint = self.endpoints[test_number - 1]
+        label = f"{endpoint.method} {endpoint.path}"
+        try:
+            file_name = self.file_names[test_number - 1]
+            output_key = self._output_key(endpoint)
+            stored = self.outputs.get_json(_ENDPOINT_TESTS_NAMESPACE, output_key) if self.incremental else None
+            if stored is not None:
+                self.files[file_name] = stored["content"]
+                self.completed += 1
+                self.reused += 1
+                return {"endpoint": label, "file": file_name, "validation": stored["validation"], "reused": True}
+
+            payload = build_llm_payload(
+                self.parser,
+                endpoint,
+                mode=self.mode,
+                compact=self.compact,
+                token_budget=self.token_budget,
+            )
+            if self.mode == "manual":
+                code = await generate_api_manual_test(payload)
+                validation = validate_manual_test(code)
+                content = compose_manual_test_file(label, code)
+            else:
+                code = await generate_api_test(payload, skeleton=self.skeleton)
+                validation = validate_pytest_api(code)
+                content = compose_test_file(label, code)
+
+            self.files[file_name] = content
+            # Сохраняем только для incremental-задач и только тесты без ошибок валидатора
+            if self.incremental and not validation["errors"]:
+                self.outputs.set_json(
+                    _ENDPOINT_TESTS_NAMESPACE,
+                    output_key,
+                    {"content": content, "validation": validation},
+                    ENDPOINT_TESTS_TTL,
+                )
+            self.completed += 1
+            return {"endpoint": label, "file": file_name, "validation": validation}
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            await self._notify()
+
+    async def run(self) -> None:
+        self.status = "running"
+        await self._notify()
+        try:
+            results = await run_bulk(self.total, self._generate_one, self.max_concurrency)
+            self.results = [
+                {**item, "endpoint": item.get("endpoint") or self._label(item["test_number"])}
+                for item in results
+            ]
+            self.status = "done"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+        finally:
+            self.finished_at = time.time()
+            await self._notify()
+
+    def archive(self) -> bytes:
+        return build_archive(self.files, self.summary())
+
+    def _output_key(self, endpoint: EndpointView) -> str:
+        # Новая версия шаблона промпта — новые тесты
+        if self.mode == "manual":
+            template = prompt_registry.get("api_manual_test")
+        else:
+            template = prompt_registry.get("api_test_scenario" if self.skeleton else "api_test")
+        options = f"{template.id}:{int(self.compact)}:{self.token_budget or 0}"
+        return f"{options}:{self.parser.fingerprint(endpoint)}"
+
+    def _label(self, test_number: int) -> str:
+        endpoint = self.endpoints[test_number - 1]
+        return f"{endpoint.method} {endpoint.path}"
+
+
+class StoredSuiteJob:
+    """
+    Задача, запущенная другим воркером: прогресс и файлы читаются из общего хранилища.
+    """
+
+    def __init__(self, backend: StateBackend, job_id: str, snapshot: Dict[str, Any]):
+        self.backend = backend
+        self.id = job_id
+        self._snapshot = snapshot
+        self._results: Optional[List[Dict[str, Any]]] = None
+
+    @classmethod
+    def load(cls, backend: StateBackend, job_id: str) -> Optional["StoredSuiteJob"]:
+        snapshot = backend.get_json(_JOBS_NAMESPACE, job_id)
+        return cls(backend, job_id, snapshot) if snapshot is not None else None
+
+    @property
+    def finished(self) -> bool:
+        return self._snapshot["progress"]["status"] in ("done", "failed")
+
+    def summary(self) -> Dict[str, Any]:
+        # Результаты пишутся один раз, при завершении; до этого их нет
+        if self._results is None and self.finished:
+            self._results = self.backend.get_json(_RESULTS_NAMESPACE, self.id) or []
+        return {**self.progress(), "results": self._results or []}
+
+    def progress(self) -> Dict[str, Any]:
+        return self._snapshot["progress"]
+
+    async def wait_for_change(self, version: int, timeout: float) -> int:
+        deadline = time.monotonic() + timeout
+        while self._snapshot["version"] == version and time.monotonic() < deadline:
+            await asyncio.sleep(SUITE_JOBS_POLL_INTERVAL)
+            snapshot = await asyncio.to_thread(self.backend.get_json, _JOBS_NAMESPACE, self.id)
+            self._snapshot = snapshot or self._snapshot
+        return self._snapshot["version"]
+
+    def archive(self) -> bytes:
+        files = self.backend.get_json(_FILES_NAMESPACE, self.id) or {}
+        return build_archive(files, self.summary())
+
+
+class SuiteJobRegistry:
+    def __init__(self, max_jobs: int = SUITE_JOBS_MAX, backend: Optional[StateBackend] = None):
+        self.max_jobs = max_jobs
+        self.backend = backend
+        self._jobs: "OrderedDict[str, SuiteJob]" = OrderedDict()
+        # Держим ссылки на задачи, чтобы их не собрал GC
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, job: SuiteJob) -> SuiteJob:
+        job.backend = self.backend
+        # Первая запись — сразу: задачу должны видеть другие воркеры, как только вернули job_id
+        if self.backend is not None:
+            job._save(job._version, job.progress(), job.finished)
+        self._jobs[job.id] = job
+        task = asyncio.create_task(job.run())
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        self._evict()
+        return job
+
+    def get(self, job_id: str) -> Union[SuiteJob, StoredSuiteJob, None]:
+        job = self._jobs.get(job_id)
+        if job is None and self.backend is not None:
+            return StoredSuiteJob.load(self.backend, job_id)
+        return job
+
+    def _evict(self) -> None:
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].finished:
+                del self._jobs[job_id]
+
+
+suite_jobs = SuiteJobRegistry(backend=state_backend if state_backend.shared else None)
@@ -1,155 +1,132 @@
-import re
+from typing import Any, Dict, List
+
+from app.services.metrics import timed
+from app.services.validator_engine import (
+    AAA_WORDS,
+    SourceFacts,
+    finding,
+    markdown_findings,
+    syntax_findings,
+)
+
+
+def _result(flags: Dict[str, bool], findings: List[Dict[str, Any]]) -> dict:
+    return {
+        **flags,
+        "errors": [f["message"] for f in findings],
+        "findings": findings,
+    }
 
 
-def validate_manual_test(code: str) -> dict:
-    result = {
-        "is_python": False,
-        "imports_ok": False,
-        "has_class": False,
-        "has_allure_manual": False,
-        "has_mark_manual": False,
-        "has_steps": False,
-        "aaa_ok": False,
-        "errors": []
-    }
+def _aaa_ok(facts: SourceFacts) -> bool:
+    return all(word in facts.aaa_words() for word in AAA_WORDS)
+
 
-    # Похоже ли на Python
-    if re.search(r"^\s*(import|from)\s+", code):
-        result["is_python"] = True
-    else:
-        result["errors"].append("Код не похож на Python (нет import/from).")
-
-    # Импорты allure + mark
-    if "import allure" in code and "from pytest import mark" in code:
-        result["imports_ok"] = True
-    else:
-        result["errors"].append("Не найдены импорты allure или mark.")
-
-    # Класс
-    if re.search(r"class\s+\w+", code):
-        result["has_class"] = True
-    else:
-        result["errors"].append("Не найден класс теста.")
-
-    # @allure.manual
-    if "@allure.manual" in code:
-        result["has_allure_manual"] = True
-    else:
-        result["errors"].append("Нет аннотации @allure.manual.")
-
-    # @mark.manual
-    if "@mark.manual" in code:
-        result["has_mark_manual"] = True
-    else:
-        result["errors"].append("Нет аннотации @mark.manual.")
-
-    # Шаги allure.step
-    if "with allure.step" in code:
-        result["has_steps"] = True
-    else:
-        result["errors"].append("Нет шагов с with allure.step.")
-
-    # AAA (может быть либо по текстам, либо по step)
-    if (
-        "Arrange" in code and
-        "Act" in code and
-        "Assert" in code
-    ) or "with allure.step" in code:
-        result["aaa_ok"] = True
-    else:
-        result["errors"].append("Нет AAA-паттерна.")
-
-    return result
+def _is_python(facts: SourceFacts) -> bool:
+    return facts.parsed and bool(facts.imports or facts.from_imports)
 
+
+@timed("validation")
+def validate_manual_test(code: str) -> dict:
+    facts = SourceFacts(code)
+    findings = syntax_findings(facts)
+
+    flags = {
+        "is_python": _is_python(facts),
+        "imports_ok": facts.has_import("allure") and facts.has_from_import("pytest", "mark"),
+        "has_class": bool(facts.classes),
+        "has_allure_manual": bool(facts.decorated("allure.manual")),
+        "has_mark_manual": bool(
+            facts.decorated("mark.manual") or facts.decorated("pytest.mark.manual")
+        ),
+        "has_steps": bool(facts.steps),
+    }
+    # AAA может быть либо по текстам, либо по шагам allure.step
+    flags["aaa_ok"] = _aaa_ok(facts) or flags["has_steps"]
+
+    if not flags["is_python"]:
+        findings.append(finding("is_python", "Код не похож на Python (нет import/from)."))
+    if not flags["imports_ok"]:
+        findings.append(finding("imports_ok", "Не найдены импорты allure или mark."))
+    if not flags["has_class"]:
+        findings.append(finding("has_class", "Не найден класс теста."))
+    if not flags["has_allure_manual"]:
+        findings.append(finding("has_allure_manual", "Нет аннотации @allure.manual."))
+    if not flags["has_mark_manual"]:
+        findings.append(finding("has_mark_manual", "Нет аннотации @mark.manual."))
+    if not flags["has_steps"]:
+        findings.append(finding("has_steps", "Нет шагов с with allure.step."))
+    if not flags["aaa_ok"]:
+        findings.append(finding("aaa_ok", "Нет AAA-паттерна."))
+
+    return _result(flags, findings)
+
+@timed("validation")
 def validate_e2e_test(code: str) -> dict:
-    result = {
-        "is_python": False,
-        "imports_ok": False,
-        "has_test_fn": False,
-        "uses_playwright": False,
-        "aaa_ok": False,
-        "no_markdown": False,
-        "errors": []
+    facts = SourceFacts(code)
+    findings = syntax_findings(facts)
+
+    uses_playwright = facts.has_from_module("playwright.sync_api")
+    flags = {
+        "is_python": _is_python(facts),
+        "imports_ok": uses_playwright,
+        "has_test_fn": bool(facts.test_functions()),
+        "uses_playwright": uses_playwright,
+        "aaa_ok": _aaa_ok(facts),
+        "no_markdown": not facts.markdown_lines,
     }
 
-    # Python-подобность
-    if re.search(r"^\s*(import|from)\s+", code):
-        result["is_python"] = True
-    else:
-        result["errors"].append("Код не похож на Python.")
-
-    # Импорты playwright
-    if "from playwright.sync_api" in code:
-        result["imports_ok"] = True
-        result["uses_playwright"] = True
-    else:
-        result["errors"].append("Нет импорта from playwright.sync_api.")
-
-    # def test_...
-    if re.search(r"def\s+test_\w+", code):
-        result["has_test_fn"] = True
-    else:
-        result["errors"].append("Нет функции test_.")
-
-    # AAA через комменты
-    if "Arrange" in code and "Act" in code and "Assert" in code:
-        result["aaa_ok"] = True
-    else:
-        result["errors"].append("Нет AAA-паттерна.")
-
-    # Markdown
-    if "```" not in code:
-        result["no_markdown"] = True
-    else:
-        result["errors"].append("Код содержит Markdown-разметку ```.")
-
-    return result
+    if not flags["is_python"]:
+        findings.append(finding("is_python", "Код не похож на Python."))
+    if not flags["imports_ok"]:
+        findings.append(finding("imports_ok", "Нет импорта from playwright.sync_api."))
+    if not flags["has_test_fn"]:
+        findings.append(finding("has_test_fn", "Нет функции test_."))
+    if not flags["aaa_ok"]:
+        findings.append(finding("aaa_ok", "Нет AAA-паттерна."))
+    findings.extend(markdown_findings(facts))
+
+    return _result(flags, findings)
 
+@timed("validation")
 def validate_pytest_api(code: str) -> dict:
-    result = {
-        "is_python": False,
-        "imports_ok": False,
-        "has_fixture": False,
-        "has_test_fn": False,
-        "aaa_ok": False,
-        "no_markdown": False,
-        "errors": []
+    facts = SourceFacts(code)
+    findings = syntax_findings(facts)
+
+    auth_header_lines = [line for name, line, _ in facts.functions if name == "auth_header"]
+    flags = {
+        "is_python": _is_python(facts),
+        "imports_ok": facts.has_import("httpx") and facts.has_import("pytest"),
+        "has_fixture": any(
+            name == "auth_header" and "pytest.fixture" in decorators
+            for name, _, decorators in facts.functions
+        ),
+        "has_test_fn": bool(facts.test_functions()),
+        "aaa_ok": _aaa_ok(facts),
+        "no_markdown": not facts.markdown_lines,
     }
 
-    # Python
-    if re.search(r"^\s*(import|from)\s+", code):
-        result["is_python"] = True
-    else:
-        result["errors"].append("Код не похож на Python.")
-
-    # Импорты pytest + httpx
-    if "import httpx" in code and "import pytest" in code:
-        result["imports_ok"] = True
-    else:
-        result["errors"].append("Нет import pytest или import httpx.")
-
-    # auth_header fixture
-    if re.search(r"@pytest\.fixture", code) and "auth_header" in code:
-        result["has_fixture"] = True
-    else:
-        result["errors"].append("Нет фикстуры @pytest.fixture auth_header.")
-
-    # def test_...
-    if re.search(r"def\s+test_\w+", code):
-        result["has_test_fn"] = True
-    else:
-        result["errors"].append("Нет функции test_.")
-
-    # AAA (обычно в комментариях)
-    if "Arrange" in code and "Act" in code and "Assert" in code:
-        result["aaa_ok"] = True
-    else:
-        result["errors"].append("Нет AAA-паттерна.")
-
-    # Markdown
-    if "```" not in code:
-        result["no_markdown"] = True
-    else:
-        result["errors"].append("Код содержит Markdown-разметку ```.")
-
-    return result
+    if not flags["is_python"]:
+        findings.append(finding("is_python", "Код не похож на Python."))
+    if not flags["imports_ok"]:
+        findings.append(finding("imports_ok", "Нет import pytest или import httpx."))
+    if not flags["has_fixture"]:
+        findings.append(finding(
+            "has_fixture",
+            "Нет фикстуры @pytest.fixture auth_header.",
+            auth_header_lines[0] if auth_header_lines else None,
+        ))
+    if not flags["has_test_fn"]:
+        findings.append(finding("has_test_fn", "Нет функции test_."))
+    if not flags["aaa_ok"]:
+        findings.append(finding("aaa_ok", "Нет AAA-паттерна."))
+    findings.extend(markdown_findings(facts))
+
+    return _result(flags, findings)
+
+
+VALIDATORS = {
+    "manual": validate_manual_test,
+    "e2e": validate_e2e_test,
+    "api": validate_pytest_api,
+}
@@ -1,20 +1,22 @@
-from app.services.llm_service import call_llm
+from typing import AsyncIterator
 
+from app.services.llm_service import call_llm_async, stream_llm
+from app.services.metrics import timed
+from app.services.prompt_templates import PromptTemplate, RenderedPrompt, prompt_registry
 
-def prepare_e2e_prompt(requirements: str) -> str:
-    return f"""
+
+E2E_TEST_TEMPLATE = prompt_registry.register(PromptTemplate(
+    name="e2e_test",
+    version="2",
+    system="""
 Ты — Senior QA Automation Engineer.
 Твоя задача — сгенерировать корректный e2e автотест на Playwright (Python)
-по следующему пользовательскому сценарию:
-
---- BEGIN REQUIREMENTS ---
-{requirements}
---- END REQUIREMENTS ---
+по пользовательскому сценарию из сообщения пользователя.
 
 ‼ Условия:
 1. Тест предназначен ДЛЯ Cloud.ru калькулятора цен.
 2. Базовый URL калькулятора:
-   https://cloud.ru/calculator 
+   https://cloud.ru/calculator
 3. Не используй calculator.net.
 4. Используй локаторы, основанные на:
    - текстовых кнопках ("Добавить сервис")
@@ -26,12 +28,30 @@ def prepare_e2e_prompt(requirements: str) -> str:
 - from playwright.sync_api import Page, expect
 - AAA-паттерн (Arrange / Act / Assert)
 - def test_<описание>(page: Page):
+""",
+    user="""
+Сгенерируй реальный Playwright тест для Cloud.ru калькулятора по сценарию:
+
+--- BEGIN REQUIREMENTS ---
+{requirements}
+--- END REQUIREMENTS ---
+""",
+))
 
-Сгенерируй реальный Playwright тест для Cloud.ru калькулятора.
-"""
 
+@timed("prompt_render")
+def prepare_e2e_prompt(requirements: str) -> RenderedPrompt:
+    return prompt_registry.get("e2e_test").render(requirements=requirements)
 
-def generate_ui_e2e_test(requirements: str) -> str:
+
+async def generate_ui_e2e_test(requirements: str, use_cache: bool = True) -> str:
     prompt = prepare_e2e_prompt(requirements)
-    code = call_llm(prompt)
+    code = await call_llm_async(prompt, use_cache=use_cache)
     return code.strip()
+
+
+def stream_ui_e2e_test(requirements: str, use_cache: bool = True) -> AsyncIterator[str]:
+    """
+    Потоковый вариант generate_ui_e2e_test: куски кода по мере генерации.
+    """
+    return stream_llm(prepare_e2e_prompt(requirements), use_cache=use_cache)
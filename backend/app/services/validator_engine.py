@@ -0,0 +1,204 @@
+import ast
+import io
+import os
+import re
+import time
+import tokenize
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.metrics import stage_seconds
+
+# Процессы для пакетной валидации (bulk и задачи по всей спеке)
+VALIDATION_WORKERS = int(os.getenv("VALIDATION_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Меньшие пакеты валидируем в текущем процессе — пул дороже самой проверки
+VALIDATION_POOL_MIN_BATCH = int(os.getenv("VALIDATION_POOL_MIN_BATCH", "8"))
+
+AAA_WORDS = ("Arrange", "Act", "Assert")
+_AAA_RE = re.compile(r"\b(Arrange|Act|Assert)\b")
+
+
+def dotted_name(node: ast.AST) -> str:
+    """
+    "allure.step" для allure.step / allure.step(...), "" — если это не имя.
+    """
+    if isinstance(node, ast.Call):
+        return dotted_name(node.func)
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = dotted_name(node.value)
+        return f"{base}.{node.attr}" if base else ""
+    return ""
+
+
+class SourceFacts(ast.NodeVisitor):
+    """
+    Всё, что нужно правилам валидаторов, собранное за один обход AST:
+    импорты, классы и функции с декораторами, шаги allure.step,
+    строковые литералы и комментарии.
+    """
+
+    def __init__(self, code: str):
+        self.code = code
+        self.syntax_error: Optional[SyntaxError] = None
+        self.imports: Dict[str, int] = {}
+        self.from_imports: Dict[str, int] = {}
+        self.classes: List[Tuple[str, int, List[str]]] = []
+        self.functions: List[Tuple[str, int, List[str]]] = []
+        self.steps: List[Tuple[str, int]] = []
+        self.strings: List[Tuple[str, int]] = []
+        self.comments: List[Tuple[str, int]] = []
+        self.markdown_lines = [
+            i for i, line in enumerate(code.splitlines(), start=1) if "```" in line
+        ]
+
+        # Строки с ``` вырезаем, чтобы остальные правила видели сам код;
+        # их наличие проверяет отдельное правило no_markdown
+        self.source = "\n".join(
+            "" if "```" in line else line for line in code.splitlines()
+        )
+
+        try:
+            tree = ast.parse(self.source)
+        except SyntaxError as e:
+            self.syntax_error = e
+            return
+
+        self.visit(tree)
+        self._collect_comments()
+
+    @property
+    def parsed(self) -> bool:
+        return self.syntax_error is None
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            self.imports.setdefault(alias.name, node.lineno)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        for alias in node.names:
+            self.from_imports.setdefault(f"{node.module}.{alias.name}", node.lineno)
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        self.classes.append((node.name, node.lineno, [dotted_name(d) for d in node.decorator_list]))
+        self.generic_visit(node)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        self.functions.append((node.name, node.lineno, [dotted_name(d) for d in node.decorator_list]))
+        self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_With(self, node: ast.With):
+        for item in node.items:
+            expr = item.context_expr
+            if dotted_name(expr) == "allure.step" and isinstance(expr, ast.Call):
+                title = ""
+                if expr.args and isinstance(expr.args[0], ast.Constant):
+                    title = str(expr.args[0].value)
+                self.steps.append((title, node.lineno))
+        self.generic_visit(node)
+
+    def visit_Constant(self, node: ast.Constant):
+        if isinstance(node.value, str):
+            self.strings.append((node.value, node.lineno))
+
+    def _collect_comments(self) -> None:
+        try:
+            for tok in tokenize.generate_tokens(io.StringIO(self.source).readline):
+                if tok.type == tokenize.COMMENT:
+                    self.comments.append((tok.string, tok.start[0]))
+        except (tokenize.TokenError, IndentationError):
+            pass
+
+    # --- Запросы для правил ---
+
+    def has_import(self, module: str) -> bool:
+        return module in self.imports
+
+    def has_from_import(self, module: str, name: str) -> bool:
+        return f"{module}.{name}" in self.from_imports
+
+    def has_from_module(self, module: str) -> bool:
+        return any(key.startswith(f"{module}.") for key in self.from_imports)
+
+    def decorated(self, decorator: str) -> List[int]:
+        return [
+            line
+            for _, line, decorators in self.classes + self.functions
+            if decorator in decorators
+        ]
+
+    def test_functions(self) -> List[Tuple[str, int, List[str]]]:
+        return [f for f in self.functions if f[0].startswith("test_")]
+
+    def aaa_words(self) -> Dict[str, int]:
+        """
+        Слова Arrange / Act / Assert (целым словом) в комментариях,
+        заголовках шагов и строках — слово -> первая строка.
+        """
+        found: Dict[str, int] = {}
+        for text, line in self.comments + self.steps + self.strings:
+            for word in _AAA_RE.findall(text):
+                found.setdefault(word, line)
+        return found
+
+
+def finding(rule: str, message: str, line: Optional[int] = None, severity: str = "error") -> Dict[str, Any]:
+    return {"rule": rule, "message": message, "line": line, "severity": severity}
+
+
+def syntax_findings(facts: SourceFacts) -> List[Dict[str, Any]]:
+    if facts.parsed:
+        return []
+    err = facts.syntax_error
+    return [finding("syntax", f"Код не компилируется: {err.msg}", err.lineno)]
+
+
+def markdown_findings(facts: SourceFacts) -> List[Dict[str, Any]]:
+    return [
+        finding("no_markdown", "Код содержит Markdown-разметку ```.", line)
+        for line in facts.markdown_lines[:1]
+    ]
+
+
+_validation_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_validation_pool() -> ProcessPoolExecutor:
+    global _validation_pool
+    if _validation_pool is None:
+        _validation_pool = ProcessPoolExecutor(max_workers=VALIDATION_WORKERS)
+    return _validation_pool
+
+
+def shutdown_validation_pool() -> None:
+    global _validation_pool
+    if _validation_pool is not None:
+        _validation_pool.shutdown(cancel_futures=True)
+        _validation_pool = None
+
+
+def _timed_call(validator: Callable[[str], dict], code: str) -> Tuple[dict, float]:
+    started = time.perf_counter()
+    result = validator(code)
+    return result, time.perf_counter() - started
+
+
+def validate_batch(validator: Callable[[str], dict], codes: List[str]) -> List[dict]:
+    """
+    Валидирует пакет файлов; большие пакеты — параллельно в пуле процессов.
+    validator должен быть функцией уровня модуля (её передаём в процессы).
+    """
+    if len(codes) < VALIDATION_POOL_MIN_BATCH:
+        return [validator(code) for code in codes]
+    # Метрики процессов пула до родителя не доходят: время каждой проверки
+    # возвращается вместе с результатом и записывается здесь
+    results = []
+    timed_results = get_validation_pool().map(partial(_timed_call, validator), codes, chunksize=4)
+    for result, seconds in timed_results:
+        stage_seconds.observe(seconds, "validation")
+        results.append(result)
+    return results
@@ -0,0 +1,67 @@
+import logging
+import os
+from typing import Dict
+
+from app.services import api_manual_test_generator, api_test_generator, repair, ui_e2e_test_generator  # noqa: F401
+from app.services.llm_payload_builder import build_llm_payload
+from app.services.llm_service import get_async_client, get_scheduler
+from app.services.metrics import stage_timer
+from app.services.openapi_parser import OpenAPIParser
+from app.services.prompt_templates import prompt_registry
+from app.services.test_validators import VALIDATORS
+
+# Прогревать воркер при старте (клиент модели, шаблоны, валидаторы): 1 — да, 0 — нет
+WARMUP = os.getenv("WARMUP", "1") == "1"
+
+logger = logging.getLogger(__name__)
+
+_WARMUP_SPEC = {
+    "openapi": "3.0.0",
+    "paths": {
+        "/items/{item_id}": {
+            "get": {
+                "operationId": "getItem",
+                "parameters": [
+                    {"name": "item_id", "in": "path", "required": True,
+                     "schema": {"type": "string", "format": "uuid"}},
+                ],
+                "responses": {"200": {"description": "ok"}, "404": {"description": "not found"}},
+            }
+        }
+    },
+}
+
+_WARMUP_CODE = "import pytest\n\n\ndef test_warmup():\n    # Arrange\n    # Act\n    # Assert\n    assert True\n"
+
+
+async def warmup() -> Dict[str, int]:
+    """
+    Делает при старте воркера то, за что иначе заплатил бы первый запрос:
+    создаёт пул соединений к модели и планировщик, рендерит шаблоны,
+    прогоняет валидаторы и сборку payload. Модель не вызывается.
+    """
+    if not WARMUP:
+        return {}
+
+    with stage_timer("warmup"):
+        get_async_client()
+        get_scheduler()
+
+        templates = 0
+        for info in prompt_registry.list():
+            if not info["active"]:
+                continue
+            template = prompt_registry.get(info["name"])
+            template.render(**{field: "" for field in template.fields})
+            templates += 1
+
+        for validator in VALIDATORS.values():
+            validator(_WARMUP_CODE)
+
+        parser = OpenAPIParser(_WARMUP_SPEC)
+        for endpoint in parser.iter_endpoints():
+            build_llm_payload(parser, endpoint)
+
+    stats = {"templates": templates, "validators": len(VALIDATORS)}
+    logger.info("Воркер прогрет: %s", stats)
+    return stats
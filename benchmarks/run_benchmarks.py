@@ -0,0 +1,349 @@
+"""
+Бенчмарки парсера, payload builder, валидаторов и полного запроса через FastAPI.
+
+    python benchmarks/run_benchmarks.py                       # все размеры
+    python benchmarks/run_benchmarks.py --sizes 10,100 --repeat 3
+    python benchmarks/run_benchmarks.py --baseline benchmarks/results/base.json
+
+Результат — JSON (по умолчанию benchmarks/results/<время>.json); с --baseline
+сравнивает медианы и завершается с кодом 1, если что-то замедлилось сильнее --threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT))
+
+# Клиент модели создаётся с ключом из окружения — модель в бенчмарках не вызывается
+os.environ.setdefault("CLOUDRU_API_KEY", "bench-key")
+os.environ.setdefault("CLOUDRU_BASE_URL", "http://127.0.0.1:9/v1")
+os.environ.setdefault("CLOUDRU_MODEL", "bench-model")
+
+from app.services import api_manual_test_generator, api_test_generator, repair, ui_e2e_test_generator  # noqa: E402,F401
+from app.services.api_test_skeleton import build_skeleton  # noqa: E402
+from app.services.llm_payload_builder import build_llm_payload  # noqa: E402
+from app.services.openapi_parser import OpenAPIParser  # noqa: E402
+from app.services.prompt_templates import prompt_registry  # noqa: E402
+from app.services.test_validators import VALIDATORS  # noqa: E402
+from benchmarks.synthetic_specs import make_cyclic_spec, make_deep_spec, make_spec, make_wide_spec  # noqa: E402
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+DEFAULT_OUTPUT_DIR = ROOT / "benchmarks" / "results"
+
+SAMPLE_CODE = {
+    "manual": '''import allure
+from pytest import mark
+
+
+@allure.manual
+@allure.label("owner", "qa_team")
+@allure.feature("UI Calculator")
+@allure.story("Basic operations")
+@allure.suite("manual")
+@mark.manual
+class TestCalculatorUI:
+    @allure.title("Сложение")
+    @allure.tag("CRITICAL")
+    @allure.label("priority", "critical")
+    def test_add(self) -> None:
+        with allure.step("Arrange: открыть калькулятор"):
+            pass
+        with allure.step("Act: ввести 2 + 3"):
+            pass
+        with allure.step("Assert: на экране 5"):
+            pass
+''',
+    "e2e": '''import allure
+import pytest
+from playwright.sync_api import Page, expect
+
+
+@allure.feature("Calculator")
+@pytest.mark.e2e
+def test_calculator_opens(page: Page):
+    with allure.step("Arrange: открыть страницу"):
+        page.goto("https://cloud.ru/calculator")
+    with allure.step("Act: нажать кнопку"):
+        page.get_by_role("button", name="Рассчитать").click()
+    with allure.step("Assert: результат виден"):
+        expect(page.get_by_text("Итого")).to_be_visible()
+''',
+    "api": '''import httpx
+import pytest
+
+BASE_URL = "https://api.example.com"
+
+
+@pytest.fixture
+def auth_header():
+    return {"Authorization": "Bearer TEST_TOKEN"}
+
+
+def test_get_item(auth_header):
+    # Arrange
+    url = f"{BASE_URL}/v1/resources0/7c9e6679-7425-40de-944b-e07fc1f90ae7"
+    # Act
+    response = httpx.get(url, headers=auth_header)
+    # Assert
+    assert response.status_code == 200
+''',
+}
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "max_s": max(timings),
+        "repeat": repeat,
+    }
+
+
+def bench_parser(sizes: List[int], repeat: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for size in sizes:
+        spec = make_spec(size)
+        raw_json = json.dumps(spec)
+        raw_yaml = yaml.safe_dump(spec, sort_keys=False)
+        parser = OpenAPIParser.load_from_string(raw_json)
+        views = list(parser.iter_endpoints())
+        # YAML на 10k эндпоинтов парсится долго — меряем его меньше раз
+        yaml_repeat = repeat if size < 1000 else 1
+
+        results[str(size)] = {
+            "spec_bytes_json": len(raw_json),
+            "spec_bytes_yaml": len(raw_yaml),
+            "load_json": measure(lambda: OpenAPIParser.load_from_string(raw_json), repeat),
+            "load_yaml": measure(lambda: OpenAPIParser.load_from_string(raw_yaml), yaml_repeat),
+            "parse_endpoints": measure(
+                lambda: OpenAPIParser.load_from_string(raw_json).parse_endpoints(), repeat
+            ),
+            # Холодный payload: новый парсер без кэшей $ref на каждый прогон
+            "build_llm_payload_all": measure(
+                lambda: [build_llm_payload(p, ep) for p in [OpenAPIParser(spec)] for ep in p.iter_endpoints()],
+                repeat,
+            ),
+            "build_llm_payload_one": measure(lambda: build_llm_payload(parser, views[-1]), repeat),
+        }
+    return results
+
+
+def bench_resolve(repeat: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    cases = [("deep", depth, make_deep_spec(depth)) for depth in (10, 50, 100)]
+    cases += [("wide", width, make_wide_spec(width)) for width in (100, 1000, 5000)]
+    cases += [("cyclic", size, make_cyclic_spec(size)) for size in (9, 30)]
+    for kind, size, spec in cases:
+        def resolve_cold():
+            parser = OpenAPIParser(spec)
+            endpoint = next(parser.iter_endpoints())
+            parser.get_response_schema(endpoint)
+
+        results[f"{kind}_{size}"] = measure(resolve_cold, repeat)
+    return results
+
+
+def bench_validators(repeat: int, batch: int = 200) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name, validator in VALIDATORS.items():
+        code = SAMPLE_CODE.get(name)
+        if code is None:
+            continue
+        results[name] = measure(lambda: [validator(code) for _ in range(batch)], repeat)
+        results[name]["files_per_run"] = batch
+    return results
+
+
+def bench_prompt_templates(repeat: int, renders: int = 1000) -> Dict[str, Any]:
+    """
+    Все зарегистрированные версии шаблонов: время рендера и доля постоянного
+    префикса (system) в промпте — чем она больше, тем больше переиспользует кэш бэкенда.
+    """
+    sample = build_llm_payload(*_sample_endpoint())
+    payload = json.dumps(sample, ensure_ascii=False)
+    values = {
+        "payload_json": payload,
+        "skeleton_summary": build_skeleton(sample).summary(),
+        "requirements": "Проверка сложения двух чисел в UI калькуляторе",
+        "code": SAMPLE_CODE["api"],
+        "error_list": "- Нет фикстуры auth_header.",
+    }
+    results: Dict[str, Any] = {}
+    for info in prompt_registry.list():
+        template = prompt_registry.get(info["name"], info["version"])
+        args = {field: values[field] for field in template.fields}
+        rendered = template.render(**args)
+        results[template.id] = {
+            **measure(lambda: [template.render(**args) for _ in range(renders)], repeat),
+            "renders_per_run": renders,
+            "prefix_share": len(rendered.system) / (len(rendered.system) + len(rendered.user)),
+        }
+    return results
+
+
+def bench_skeleton(repeat: int, builds: int = 1000) -> Dict[str, Any]:
+    """
+    Локальный каркас API-теста: время сборки и размер промпта (символы)
+    полного шаблона против шаблона только для сценариев.
+    """
+    payload = build_llm_payload(*_sample_endpoint())
+    skeleton = build_skeleton(payload)
+    full = api_test_generator.prepare_prompt(payload)
+    scenario = api_test_generator.prepare_scenario_prompt(payload, skeleton)
+    return {
+        **measure(lambda: [build_skeleton(payload) for _ in range(builds)], repeat),
+        "builds_per_run": builds,
+        "skeleton_tests": len(skeleton.tests),
+        "prompt_chars_full": len(full.system) + len(full.user),
+        "prompt_chars_scenario": len(scenario.system) + len(scenario.user),
+    }
+
+
+def _sample_endpoint():
+    parser = OpenAPIParser(make_spec(4))
+    return parser, parser.find_endpoint("/v1/resources0/{item_id}", "GET")
+
+
+def bench_request_flow(repeat: int, size: int = 1000, requests: int = 50) -> Dict[str, Any]:
+    """
+    Полный запрос /llm/generate-api-test через FastAPI со стабом вместо модели.
+    """
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.services import llm_service
+
+    async def fake_complete(params: Dict[str, Any]) -> str:
+        return SAMPLE_CODE["api"]
+
+    original = llm_service._complete
+    llm_service._complete = fake_complete
+    try:
+        spec = make_spec(size)
+        raw = json.dumps(spec)
+        paths = [(path, method.upper()) for path, ops in spec["paths"].items() for method in ops]
+        with TestClient(app) as client:
+            spec_id = client.post("/specs", json={"openapi": raw}).json()["spec_id"]
+
+            def run_requests(body_source: Dict[str, Any]):
+                for i in range(requests):
+                    path, method = paths[i % len(paths)]
+                    response = client.post("/llm/generate-api-test", json={
+                        **body_source, "endpoint_path": path, "method": method, "use_cache": False,
+                    })
+                    assert response.status_code == 200, response.text
+
+            by_id = measure(lambda: run_requests({"spec_id": spec_id}), repeat)
+            inline = measure(lambda: run_requests({"openapi": raw}), repeat)
+    finally:
+        llm_service._complete = original
+        asyncio.run(llm_service.close_async_client())
+
+    return {
+        "endpoints": size,
+        "requests_per_run": requests,
+        "spec_id": by_id,
+        "inline_openapi": inline,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(node: Any, prefix: str = "") -> Dict[str, float]:
+    """
+    {"parser.100.load_json": median_s, ...} — для сравнения с baseline.
+    """
+    if isinstance(node, dict) and "median_s" in node:
+        return {prefix: node["median_s"]}
+    if isinstance(node, dict):
+        flat: Dict[str, float] = {}
+        for key, value in node.items():
+            flat.update(flatten(value, f"{prefix}.{key}" if prefix else key))
+        return flat
+    return {}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    now, before = flatten(current["results"]), flatten(baseline["results"])
+    regressions = []
+    for key, value in sorted(now.items()):
+        old = before.get(key)
+        if old and value > old * (1 + threshold):
+            regressions.append(f"{key}: {old:.4f}s -> {value:.4f}s (+{(value / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def run(sizes: List[int], repeat: int, with_flow: bool = True) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "parser": bench_parser(sizes, repeat),
+        "resolve_schema": bench_resolve(repeat),
+        "validators": bench_validators(repeat),
+        "prompt_templates": bench_prompt_templates(repeat),
+        "skeleton": bench_skeleton(repeat),
+    }
+    if with_flow:
+        results["request_flow"] = bench_request_flow(repeat, size=min(max(sizes), 1000))
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="число эндпоинтов в синтетических спеках, через запятую")
+    parser.add_argument("--repeat", type=int, default=5, help="прогонов на замер (берётся медиана)")
+    parser.add_argument("--output", help="куда записать JSON (по умолчанию benchmarks/results/<время>.json)")
+    parser.add_argument("--baseline", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое замедление, доля (0.2 = 20%%)")
+    parser.add_argument("--no-flow", action="store_true", help="не запускать полный запрос через FastAPI")
+    args = parser.parse_args(argv)
+
+    report = run([int(s) for s in args.sizes.split(",")], args.repeat, with_flow=not args.no_flow)
+
+    output = Path(args.output) if args.output else (
+        DEFAULT_OUTPUT_DIR / f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"Результаты: {output}")
+
+    if args.baseline:
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Синтетические OpenAPI-спеки для бенчмарков: от десятков до десятков тысяч эндпоинтов,
+с общими компонентами, глубокими цепочками $ref и широкими объектами.
+"""
+from typing import Any, Dict
+
+
+def _resource_schemas(index: int) -> Dict[str, Any]:
+    name = f"Resource{index}"
+    return {
+        name: {
+            "type": "object",
+            "required": ["id", "name", "status"],
+            "properties": {
+                "id": {"type": "string", "format": "uuid"},
+                "name": {"type": "string", "description": f"Имя ресурса {index}"},
+                "status": {"type": "string", "enum": ["ACTIVE", "STOPPED", "ERROR"]},
+                "tags": {"type": "array", "items": {"$ref": "#/components/schemas/Tag"}},
+                "owner": {"$ref": "#/components/schemas/Owner"},
+            },
+        },
+        f"{name}Create": {
+            "type": "object",
+            "required": ["name"],
+            "properties": {
+                "name": {"type": "string", "example": "demo"},
+                "tags": {"type": "array", "items": {"$ref": "#/components/schemas/Tag"}},
+            },
+        },
+    }
+
+
+def _shared_schemas() -> Dict[str, Any]:
+    return {
+        "Tag": {"type": "object", "properties": {"key": {"type": "string"}, "value": {"type": "string"}}},
+        "Owner": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "string", "format": "uuid"},
+                "email": {"type": "string", "format": "email"},
+            },
+        },
+        "Error": {
+            "type": "object",
+            "properties": {"message": {"type": "string"}, "code": {"type": "string"}},
+        },
+    }
+
+
+def _json_content(ref: str) -> Dict[str, Any]:
+    return {"content": {"application/json": {"schema": {"$ref": ref}}}}
+
+
+def make_spec(endpoints: int) -> Dict[str, Any]:
+    """
+    Спека ровно с endpoints операциями: по 4 операции (list, create, get, delete)
+    на ресурс; каждый ресурс — две схемы со ссылками на общие компоненты.
+    """
+    paths: Dict[str, Any] = {}
+    schemas = _shared_schemas()
+    error = _json_content("#/components/schemas/Error")
+    id_param = {
+        "name": "item_id", "in": "path", "required": True,
+        "schema": {"type": "string", "format": "uuid"},
+    }
+
+    resource = count = 0
+    while count < endpoints:
+        name = f"Resource{resource}"
+        schemas.update(_resource_schemas(resource))
+        item_ref = f"#/components/schemas/{name}"
+        collection = f"/v1/resources{resource}"
+        item = f"{collection}/{{item_id}}"
+
+        operations = [
+            (collection, "get", {
+                "summary": f"List {name}",
+                "parameters": [{"name": "limit", "in": "query", "schema": {"type": "integer"}}],
+                "responses": {"200": {"content": {"application/json": {
+                    "schema": {"type": "array", "items": {"$ref": item_ref}}}}}},
+            }),
+            (collection, "post", {
+                "summary": f"Create {name}",
+                "requestBody": _json_content(f"{item_ref}Create"),
+                "responses": {"201": _json_content(item_ref), "400": error, "401": error},
+            }),
+            (item, "get", {
+                "summary": f"Get {name}",
+                "parameters": [id_param],
+                "responses": {"200": _json_content(item_ref), "400": error, "404": error},
+            }),
+            (item, "delete", {
+                "summary": f"Delete {name}",
+                "parameters": [id_param],
+                "responses": {"204": {"description": "deleted"}, "404": error},
+            }),
+        ]
+        for path, method, details in operations[:endpoints - count]:
+            paths.setdefault(path, {})[method] = {"operationId": f"{method}{name}", **details}
+            count += 1
+        resource += 1
+
+    return {"openapi": "3.0.0", "info": {"title": "synthetic", "version": "1"}, "paths": paths,
+            "components": {"schemas": schemas}}
+
+
+def make_deep_spec(depth: int) -> Dict[str, Any]:
+    """
+    Один эндпоинт, ответ которого — цепочка из depth вложенных $ref.
+    """
+    schemas = {
+        f"Level{i}": {
+            "type": "object",
+            "properties": {
+                "value": {"type": "string"},
+                "child": {"$ref": f"#/components/schemas/Level{i + 1}"},
+            },
+        }
+        for i in range(depth)
+    }
+    schemas[f"Level{depth}"] = {"type": "object", "properties": {"value": {"type": "string"}}}
+    return {
+        "openapi": "3.0.0",
+        "paths": {"/deep": {"get": {"responses": {"200": _json_content("#/components/schemas/Level0")}}}},
+        "components": {"schemas": schemas},
+    }
+
+
+def make_wide_spec(width: int) -> Dict[str, Any]:
+    """
+    Один эндпоинт, ответ которого — объект с width свойствами-ссылками
+    на width / 10 различных схем.
+    """
+    distinct = max(1, width // 10)
+    schemas = {
+        f"Leaf{i}": {"type": "object", "properties": {"a": {"type": "string"}, "b": {"type": "integer"}}}
+        for i in range(distinct)
+    }
+    schemas["Wide"] = {
+        "type": "object",
+        "properties": {f"field{i}": {"$ref": f"#/components/schemas/Leaf{i % distinct}"} for i in range(width)},
+    }
+    return {
+        "openapi": "3.0.0",
+        "paths": {"/wide": {"get": {"responses": {"200": _json_content("#/components/schemas/Wide")}}}},
+        "components": {"schemas": schemas},
+    }
+
+
+def make_cyclic_spec(size: int) -> Dict[str, Any]:
+    """
+    size схем, каждая ссылается на все остальные (полный граф $ref), и по
+    эндпоинту на каждую.
+    """
+    schemas = {
+        f"Node{i}": {
+            "type": "object",
+            "properties": {f"to{j}": {"$ref": f"#/components/schemas/Node{j}"} for j in range(size) if j != i},
+        }
+        for i in range(size)
+    }
+    paths = {
+        f"/nodes{i}": {"get": {"responses": {"200": _json_content(f"#/components/schemas/Node{i}")}}}
+        for i in range(size)
+    }
+    return {"openapi": "3.0.0", "paths": paths, "components": {"schemas": schemas}}
@@ -0,0 +1,156 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Клиент модели создаётся с ключом из окружения — нужен хоть какой-то ключ
+os.environ.setdefault("CLOUDRU_API_KEY", "test-key")
+os.environ.setdefault("CLOUDRU_BASE_URL", "http://127.0.0.1:9/v1")
+os.environ.setdefault("CLOUDRU_MODEL", "fake-model")
+# Задачи bulk-очереди пишутся в SQLite — в тестах во временный каталог
+os.environ.setdefault("BULK_JOBS_SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "bulk_jobs.sqlite3"))
+
+
+class FakeLLMServer:
+    """
+    Локальный OpenAI-совместимый сервер: отвечает на /v1/chat/completions
+    заранее заданным текстом и запоминает пришедшие запросы.
+    """
+
+    def __init__(self):
+        self.reply = "import pytest"
+        # Ответы по очереди; когда закончатся — отвечаем self.reply
+        self.replies = []
+        self.delay = 0.0
+        # Сколько вариантов (параметр n) сервер готов вернуть за запрос
+        self.max_n = 1
+        # Коды ошибок, которыми отвечаем на очередные запросы (например, 429)
+        self.errors = []
+        # Тело ответа с ошибкой (поле error)
+        self.error = {"message": "injected"}
+        self.requests = []
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def next_reply(self) -> str:
+        return self.replies.pop(0) if self.replies else self.reply
+
+    def completion(self, body: dict) -> dict:
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [
+                {
+                    "index": i,
+                    "message": {"role": "assistant", "content": self.next_reply()},
+                    "finish_reason": "stop",
+                }
+                for i in range(min(body.get("n", 1), self.max_n))
+            ],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+
+    def stream_chunks(self, body: dict):
+        # Отдаём ответ по строкам, как это делает настоящий стриминг
+        for piece in self.next_reply().splitlines(keepends=True):
+            yield {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model"),
+                "choices": [
+                    {"index": 0, "delta": {"content": piece}, "finish_reason": None}
+                ],
+            }
+        # Как OpenAI: с include_usage последний кусок — без choices, с usage
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model"),
+                "choices": [],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+            }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                server.requests.append(body)
+                if server.delay:
+                    time.sleep(server.delay)
+
+                if server.errors:
+                    data = json.dumps({"error": server.error}).encode()
+                    self.send_response(server.errors.pop(0))
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+
+                if body.get("stream"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.end_headers()
+                    for chunk in server.stream_chunks(body):
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    return
+
+                data = json.dumps(server.completion(body)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    from app.services import llm_service
+    from app.services.llm_cache import response_cache
+
+    server = FakeLLMServer()
+    server.start()
+    monkeypatch.setenv("CLOUDRU_BASE_URL", server.base_url)
+    monkeypatch.setattr(llm_service, "_async_client", None)
+    monkeypatch.setattr(llm_service, "_scheduler", None)
+    response_cache.clear()
+    yield server
+    server.stop()
@@ -0,0 +1,194 @@
+import ast
+import asyncio
+import json
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.api_test_generator import prepare_prompt
+from app.services.api_test_skeleton import build_skeleton, merge_with_skeleton
+from app.services.llm_payload_builder import build_llm_payload
+from app.services.openapi_parser import OpenAPIParser
+from app.services.sandbox_runner import verify_api_test
+from app.services.test_validators import validate_pytest_api
+
+DATA_PATH = Path(__file__).resolve().parent / "data" / "openapi_sample.yaml"
+
+MODEL_SCENARIO = '''import json
+
+import pytest
+
+
+@pytest.fixture
+def auth_header():
+    return {}
+
+
+def test_get_vm_success(auth_header):
+    # Arrange
+    url = build_url()
+    # Act
+    response = send(url, auth_header)
+    # Assert
+    assert response.status_code == 200
+    assert_enum_fields(response.json())
+    assert_uuid_fields(json.loads(response.text))
+'''
+
+PAYLOAD = {
+    "path": "/v1/projects/{project_id}/disks/{disk_id}",
+    "method": "PATCH",
+    "operation_id": "updateDisk",
+    "parameters": [
+        {"name": "project_id", "in": "path", "schema": {"type": "string", "format": "uuid"}},
+        {"name": "disk_id", "in": "path", "schema": {"type": "string", "format": "uuid"}},
+    ],
+    "request_schema": {"type": "object", "properties": {"size": {"type": "integer"}}},
+    "uuid_path_params": ["project_id", "disk_id"],
+    "negative_cases": {"supports_404": True},
+    "error_schemas": {
+        "400": {"type": "object", "properties": {"message": {"type": "string"}, "code": {"type": "string"}}},
+        "401": {"type": "object", "required": ["message"], "properties": {"message": {"type": "string"}}},
+    },
+}
+
+
+def get_vm_payload():
+    parser = OpenAPIParser.load_from_file(str(DATA_PATH))
+    return parser, build_llm_payload(parser, parser.find_endpoint("/v3/vms/{vm_id}", "GET"))
+
+
+def test_skeleton_passes_validator_and_runs_against_mock():
+    parser, payload = get_vm_payload()
+
+    skeleton = build_skeleton(payload)
+    execution = asyncio.run(verify_api_test(parser, skeleton.code))
+
+    assert skeleton.tests == ["test_get_vm_invalid_uuid", "test_get_vm_not_found"]
+    assert validate_pytest_api(skeleton.code)["errors"] == []
+    assert execution["status"] == "passed"
+    assert set(execution["tests"]) == set(skeleton.tests)
+
+
+def test_skeleton_covers_every_uuid_param_body_and_401():
+    skeleton = build_skeleton(PAYLOAD)
+    namespace = {}
+    exec(compile(skeleton.code, "skeleton", "exec"), namespace)
+
+    assert skeleton.tests == [
+        "test_update_disk_invalid_uuid_project_id",
+        "test_update_disk_invalid_uuid_disk_id",
+        "test_update_disk_not_found",
+        "test_update_disk_unauthorized",
+    ]
+    assert namespace["REQUEST_BODY"] == {"size": 1}
+    assert namespace["ERROR_SHAPES"]["400"]["required"] == ["message", "code"]
+    assert namespace["build_url"](disk_id="x").endswith("/disks/x")
+    assert "assert_enum_fields" not in namespace
+
+
+def test_merge_drops_redefinitions_and_keeps_new_imports():
+    skeleton = build_skeleton(get_vm_payload()[1])
+
+    merged = merge_with_skeleton(skeleton.code, MODEL_SCENARIO)
+    broken = merge_with_skeleton(skeleton.code, "def test_x(:\n    pass")
+
+    names = [node.name for node in ast.parse(merged).body if isinstance(node, ast.FunctionDef)]
+    assert merged.startswith("import json\n")
+    assert names.count("auth_header") == 1
+    assert names[-1] == "test_get_vm_success"
+    assert "# Arrange" in merged.split("def test_get_vm_success")[1]
+    assert broken.endswith("def test_x(:\n    pass\n")
+
+
+def test_generate_with_skeleton_asks_only_for_scenarios(fake_llm):
+    fake_llm.reply = MODEL_SCENARIO
+    body = {
+        "openapi": DATA_PATH.read_text(),
+        "endpoint_path": "/v3/vms/{vm_id}",
+        "method": "GET",
+        "skeleton": True,
+        "verify": True,
+    }
+
+    with TestClient(app) as client:
+        result = client.post("/llm/generate-api-test", json=body).json()
+        skeleton = client.post("/llm/api-test-skeleton", json=body).json()
+
+    messages = fake_llm.requests[0]["messages"]
+    full_prompt = prepare_prompt(get_vm_payload()[1])
+    assert len(fake_llm.requests) == 1
+    assert "test_get_vm_not_found" in messages[-1]["content"]
+    assert "uuid_path_params" not in messages[-1]["content"]
+    assert sum(len(m["content"]) for m in messages) < len(full_prompt.system) + len(full_prompt.user)
+    assert result["validation"]["errors"] == []
+    assert set(result["execution"]["tests"]) == {
+        "test_get_vm_invalid_uuid", "test_get_vm_not_found", "test_get_vm_success",
+    }
+    assert result["execution"]["status"] == "passed"
+    assert skeleton["tests"] == ["test_get_vm_invalid_uuid", "test_get_vm_not_found"]
+    assert skeleton["execution"]["status"] == "passed"
+
+
+def test_skeleton_stream_result_is_merged_with_skeleton(fake_llm):
+    fake_llm.reply = MODEL_SCENARIO
+    body = {
+        "openapi": DATA_PATH.read_text(),
+        "endpoint_path": "/v3/vms/{vm_id}",
+        "method": "GET",
+        "skeleton": True,
+    }
+
+    with TestClient(app) as client:
+        with client.stream("POST", "/llm/generate-api-test/stream", json=body) as r:
+            blocks = "".join(r.iter_text()).strip().split("\n\n")
+
+    events = [(block.split("\n")[0][len("event: "):], json.loads(block.split("data: ", 1)[1])) for block in blocks]
+    tokens = "".join(data["text"] for name, data in events if name == "token")
+    result = events[-1][1]
+    names = [node.name for node in ast.parse(result["code"]).body if isinstance(node, ast.FunctionDef)]
+    # В потоке каркас и код модели как есть, в result — собранный файл без повторов
+    assert tokens.count("def auth_header") == 2
+    assert names.count("auth_header") == 1
+    assert result["code"].startswith("import json\n")
+    assert result["validation"]["errors"] == []
+
+
+def test_skeleton_quotes_spec_parameter_names():
+    hostile = "x=print(open('/etc/hostname').read()),y"
+    spec = {
+        "openapi": "3.0.0",
+        "paths": {
+            f"/vms/{{vm-id}}/disks/{{class}}/tags/{{{hostile}}}": {
+                "get": {
+                    "operationId": "getTag",
+                    "parameters": [
+                        {"name": name, "in": "path", "required": True, "schema": {"type": "string", "format": "uuid"}}
+                        for name in ("vm-id", "class", hostile)
+                    ],
+                    "responses": {"200": {"description": "ok"}, "404": {"description": "missing"}},
+                }
+            }
+        },
+    }
+    parser = OpenAPIParser(spec)
+    ep = next(parser.iter_endpoints())
+
+    skeleton = build_skeleton(build_llm_payload(parser, ep))
+    tree = ast.parse(skeleton.code)
+    namespace = {}
+    exec(compile(tree, "skeleton", "exec"), namespace)
+    execution = asyncio.run(verify_api_test(parser, skeleton.code))
+
+    called = {node.func.id for node in ast.walk(tree) if isinstance(node, ast.Call) and isinstance(node.func, ast.Name)}
+    assert not called & {"print", "open"}
+    assert skeleton.tests == [
+        "test_get_tag_invalid_uuid_vm_id",
+        "test_get_tag_invalid_uuid_class",
+        "test_get_tag_invalid_uuid_x_print_open_etc_hostname_read_y",
+        "test_get_tag_not_found",
+    ]
+    assert namespace["build_url"](**{"vm-id": "a", "class": "b", hostile: "c"}).endswith("/vms/a/disks/b/tags/c")
+    assert execution["status"] == "passed"
+    assert merge_with_skeleton(skeleton.code, MODEL_SCENARIO).count("def auth_header") == 1
@@ -0,0 +1,29 @@
+import json
+
+from benchmarks.run_benchmarks import compare, main
+from benchmarks.synthetic_specs import make_spec
+
+
+def test_synthetic_spec_has_exact_endpoint_count():
+    spec = make_spec(10)
+    assert sum(len(ops) for ops in spec["paths"].values()) == 10
+
+
+def test_harness_writes_json_and_detects_regressions(tmp_path):
+    output = tmp_path / "bench.json"
+
+    assert main(["--sizes", "10", "--repeat", "1", "--output", str(output)]) == 0
+
+    report = json.loads(output.read_text())
+    assert set(report["results"]) == {
+        "parser", "resolve_schema", "validators", "prompt_templates", "skeleton", "request_flow",
+    }
+    assert report["results"]["parser"]["10"]["load_json"]["median_s"] > 0
+    assert report["results"]["prompt_templates"]["api_test@2"]["prefix_share"] > 0.5
+    skeleton = report["results"]["skeleton"]
+    assert skeleton["prompt_chars_scenario"] < skeleton["prompt_chars_full"]
+
+    slower = json.loads(output.read_text())
+    slower["results"]["validators"]["api"]["median_s"] *= 2
+    assert compare(slower, report, threshold=0.2) != []
+    assert compare(report, report, threshold=0.2) == []
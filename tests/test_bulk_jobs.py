@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import llm_service
+from app.services.bulk_jobs import BulkJobQueue
+from app.services.state_backend import SQLiteBackend
+
+MANUAL_CODE = "import allure\nfrom pytest import mark\n"
+
+
+def wait_done(client, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/llm/bulk-jobs/{job_id}").json()
+        if job["status"] == "done":
+            return job
+        time.sleep(0.02)
+    raise AssertionError("bulk job did not finish")
+
+
+def test_background_bulk_returns_job_and_results(fake_llm):
+    fake_llm.reply = MANUAL_CODE
+
+    with TestClient(app) as client:
+        created = client.post(
+            "/llm/bulk-manual-tests", json={"requirements": "Вход", "count": 3, "background": True}
+        ).json()
+        job = wait_done(client, created["job_id"])
+        missing = client.get("/llm/bulk-jobs/unknown")
+
+    assert created["total"] == 3
+    assert job["completed"] == 3 and job["failed"] == 0
+    assert [item["test_number"] for item in job["results"]] == [1, 2, 3]
+    assert all("validation" in item for item in job["results"])
+    assert missing.status_code == 404
+
+
+def test_background_rejects_top_k(fake_llm):
+    with TestClient(app) as client:
+        response = client.post(
+            "/llm/bulk-manual-tests",
+            json={"requirements": "Вход", "count": 3, "top_k": 1, "background": True},
+        )
+
+    assert response.status_code == 400
+
+
+def test_restarted_queue_generates_only_missing_items(fake_llm, tmp_path):
+    fake_llm.reply = MANUAL_CODE
+    fake_llm.delay = 0.05
+    store = SQLiteBackend(str(tmp_path / "jobs.sqlite3"))
+
+    async def crashed_run():
+        # Первый процесс успел сохранить часть тестов и упал, не отпустив аренду
+        queue = BulkJobQueue(store, workers=1, lease=0.05)
+        await queue.start()
+        job_id = queue.submit("manual", {"requirements": "Вход"}, 4)["job_id"]
+        while queue.get(job_id)["completed"] < 2:
+            await asyncio.sleep(0.01)
+        for task in queue._tasks:
+            task.cancel()
+        await asyncio.gather(*queue._tasks, return_exceptions=True)
+        await llm_service.close_async_client()
+        return job_id, len(queue.results(job_id))
+
+    async def restarted_run(job_id):
+        await asyncio.sleep(0.1)
+        queue = BulkJobQueue(store, workers=2, lease=0.05)
+        resumed = await queue.start()
+        await queue.join()
+        await queue.stop()
+        await llm_service.close_async_client()
+        return resumed, queue.get(job_id)
+
+    job_id, saved = asyncio.run(crashed_run())
+    calls_before_restart = len(fake_llm.requests)
+    resumed, job = asyncio.run(restarted_run(job_id))
+
+    assert resumed == 1
+    assert job["status"] == "done"
+    # Завершённая задача уходит из индекса, и resume её больше не читает
+    assert store.keys("bulk_pending") == []
+    assert [item["test_number"] for item in job["results"]] == [1, 2, 3, 4]
+    assert 2 <= saved < 4
+    assert len(fake_llm.requests) - calls_before_restart == 4 - saved
+
+
+def test_job_leased_by_live_worker_is_not_resumed(tmp_path):
+    store = SQLiteBackend(str(tmp_path / "jobs.sqlite3"))
+
+    async def scenario():
+        owner = BulkJobQueue(store, workers=0, lease=60)
+        await owner.start()
+        owner.submit("manual", {"requirements": "Вход"}, 2)
+
+        other = BulkJobQueue(store, workers=0, lease=60)
+        resumed = await other.start()
+        await other.stop()
+        await owner.stop()
+        return resumed, await BulkJobQueue(store, workers=0).start()
+
+    assert asyncio.run(scenario()) == (0, 1)
+
+
+def test_lost_lease_drops_job_and_cancels_its_items(fake_llm, tmp_path):
+    fake_llm.reply = MANUAL_CODE
+    fake_llm.delay = 1.0
+    store = SQLiteBackend(str(tmp_path / "jobs.sqlite3"))
+
+    async def scenario():
+        queue = BulkJobQueue(store, workers=1, lease=0.06)
+        await queue.start()
+        job_id = queue.submit("manual", {"requirements": "Вход"}, 2)["job_id"]
+        await asyncio.sleep(0.01)
+        running = set(queue._running[job_id])
+        # Аренда истекла, и задачу забрал другой воркер
+        store.set("bulk_claims", job_id, "other-owner", 60)
+        await asyncio.sleep(0.1)
+        state = (job_id in queue._jobs, all(item.cancelled() for item in running), queue.results(job_id))
+        await queue.stop()
+        await llm_service.close_async_client()
+        return state, store.get("bulk_claims", job_id)
+
+    (owned, cancelled, results), claim = asyncio.run(scenario())
+
+    assert owned is False
+    assert cancelled is True
+    assert results == []
+    assert claim == "other-owner"
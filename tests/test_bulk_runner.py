@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from openai import BadRequestError
+
+from app.main import app
+from app.services import llm_service
+from app.services.bulk_runner import run_bulk
+
+
+def test_run_bulk_keeps_order_and_isolates_errors():
+    async def generate_one(n):
+        # Первые тесты завершаются последними
+        await asyncio.sleep(0.01 * (5 - n))
+        if n == 3:
+            raise RuntimeError("boom")
+        return {"code": f"test {n}"}
+
+    results = asyncio.run(run_bulk(5, generate_one, max_concurrency=5))
+
+    assert [r["test_number"] for r in results] == [1, 2, 3, 4, 5]
+    assert results[2] == {"test_number": 3, "error": "boom"}
+    assert results[0]["code"] == "test 1"
+
+
+def test_run_bulk_respects_max_concurrency():
+    in_flight = 0
+    peak = 0
+
+    async def generate_one(n):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {}
+
+    asyncio.run(run_bulk(10, generate_one, max_concurrency=3))
+
+    assert peak == 3
+
+
+VALID_MANUAL = '''import allure
+from pytest import mark
+
+
+@allure.manual
+@allure.label("owner", "qa_team")
+@allure.feature("UI Calculator")
+@allure.story("Basic operations")
+@allure.suite("manual")
+@mark.manual
+class TestCalculatorUI:
+    @allure.title("Сложение")
+    @allure.tag("CRITICAL")
+    @allure.label("priority", "critical")
+    def test_add(self) -> None:
+        with allure.step("Arrange: открыть калькулятор"):
+            pass
+        with allure.step("Act: нажать ="):
+            pass
+        with allure.step("Assert: видим 5"):
+            pass
+'''
+
+
+def test_candidates_come_from_one_request_when_n_is_supported(fake_llm):
+    fake_llm.max_n = 5
+
+    async def run():
+        try:
+            return await llm_service.call_llm_candidates_async("prompt", 3)
+        finally:
+            await llm_service.close_async_client()
+
+    assert len(asyncio.run(run())) == 3
+    assert len(fake_llm.requests) == 1
+    assert fake_llm.requests[0]["n"] == 3
+
+
+def test_candidates_fall_back_to_parallel_calls(fake_llm):
+    async def run():
+        try:
+            return await llm_service.call_llm_candidates_async("prompt", 3)
+        finally:
+            await llm_service.close_async_client()
+
+    assert len(asyncio.run(run())) == 3
+    # Первый запрос с n=3 вернул один вариант, остальные — отдельными вызовами
+    assert len(fake_llm.requests) == 3
+
+
+def test_bulk_top_k_returns_best_candidates(fake_llm):
+    fake_llm.max_n = 5
+    fake_llm.replies = ["not python at all", VALID_MANUAL, "import allure"]
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/llm/bulk-manual-tests",
+            json={"requirements": "Сложение", "count": 3, "top_k": 1},
+        )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["generated_tests"] == 3
+    assert [r["test_number"] for r in body["results"]] == [2]
+    assert body["results"][0]["validation"]["errors"] == []
+    assert len(fake_llm.requests) == 1
+
+
+def test_only_n_parameter_errors_disable_n(fake_llm, monkeypatch):
+    monkeypatch.setattr(llm_service, "_n_supported", True)
+
+    async def run():
+        try:
+            return await llm_service.call_llm_candidates_async("prompt", 3)
+        finally:
+            await llm_service.close_async_client()
+
+    fake_llm.errors = [400]
+    fake_llm.error = {"message": "This model's maximum context length is 8192 tokens", "param": "messages"}
+    with pytest.raises(BadRequestError):
+        asyncio.run(run())
+    assert llm_service._n_supported is True
+
+    fake_llm.errors = [400]
+    fake_llm.error = {"message": "Unsupported parameter: 'n' is not supported with this model."}
+    assert len(asyncio.run(run())) == 3
+    assert llm_service._n_supported is False
@@ -0,0 +1,152 @@
+import asyncio
+import random
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.bulk_runner import deduplicate_results, run_until_distinct
+from app.services.dedup import NearDuplicateIndex, cluster_codes, normalize_code
+
+LOGIN_TEST = '''import httpx
+
+
+def test_login(auth_header):
+    # Arrange
+    payload = {"login": "admin", "password": "secret"}
+    # Act
+    response = httpx.post("https://api.example.com/login", json=payload, headers=auth_header)
+    # Assert
+    assert response.status_code == 200
+'''
+
+LOGIN_TEST_RENAMED = '''import httpx
+import pytest
+
+
+def test_user_can_sign_in(headers):
+    # Arrange
+    body = {"login": "qa", "password": "другой пароль"}
+    # Act
+    result = httpx.post(f"https://api.example.com/login?lang={1}", json=body, headers=headers)
+    # Assert
+    assert result.status_code == 200
+'''
+
+DELETE_TEST = '''import httpx
+
+
+def test_delete_missing_vm(auth_header):
+    for vm_id in ["not-a-uuid", "123"]:
+        response = httpx.delete(f"https://api.example.com/v3/vms/{vm_id}", headers=auth_header)
+        assert response.status_code in (400, 404)
+        assert "message" in response.json()
+'''
+
+
+def family(seed: int) -> str:
+    rng = random.Random(seed)
+    checks = "\n".join(
+        f"    assert response.json()[{rng.randrange(10**6)}] == {rng.randrange(10**6)}" for _ in range(8)
+    )
+    return f"def test_case(client):\n    response = client.get({rng.randrange(10**6)})\n{checks}\n"
+
+
+def rename(code: str, suffix: str) -> str:
+    return code.replace("test_case", f"test_case_{suffix}").replace("response", f"resp_{suffix}")
+
+
+def test_normalize_ignores_names_strings_and_imports():
+    assert normalize_code(LOGIN_TEST) == normalize_code(LOGIN_TEST_RENAMED)
+    assert normalize_code(LOGIN_TEST) != normalize_code(DELETE_TEST)
+    assert normalize_code("def broken(:\n  pass") == "def broken(: pass"
+
+
+def test_index_clusters_variants_without_comparing_all_pairs():
+    items = [
+        (f"{seed}-{variant}", rename(family(seed), str(variant)))
+        for variant in range(5)
+        for seed in range(10)
+    ]
+    index = NearDuplicateIndex()
+    for key, code in items:
+        index.add(key, code)
+
+    clusters = cluster_codes(items)
+
+    assert len(clusters) == 10
+    assert all(len({key.split("-")[0] for key in members}) == 1 for members in clusters)
+    # Сравниваются только варианты одного семейства: 0 + 1 + 2 + 3 + 4 на семейство
+    assert index.comparisons == 10 * 10
+
+
+def test_deduplicate_keeps_best_validated_representative():
+    results = [
+        {"test_number": 1, "code": LOGIN_TEST, "validation": {"findings": [{"severity": "error"}]}},
+        {"test_number": 2, "code": DELETE_TEST, "validation": {"findings": []}},
+        {"test_number": 3, "code": LOGIN_TEST_RENAMED, "validation": {"findings": []}},
+        {"test_number": 4, "error": "timeout"},
+    ]
+
+    unique, clusters = deduplicate_results(results)
+
+    assert [item["test_number"] for item in unique] == [2, 3]
+    assert clusters == [
+        {"representative": 3, "members": [1, 3], "size": 2},
+        {"representative": 2, "members": [2], "size": 1},
+    ]
+
+
+def test_bulk_dedup_reports_clusters(fake_llm):
+    fake_llm.replies = [LOGIN_TEST, LOGIN_TEST_RENAMED, LOGIN_TEST]
+    fake_llm.reply = DELETE_TEST
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/llm/bulk-manual-tests",
+            json={"requirements": "Вход", "count": 4, "max_concurrency": 1, "dedup": True},
+        )
+
+    body = response.json()
+    assert body["generated_tests"] == 4
+    assert body["distinct_tests"] == 2
+    assert sorted(cluster["size"] for cluster in body["clusters"]) == [1, 3]
+
+
+def test_bulk_distinct_generates_until_k_distinct(fake_llm):
+    fake_llm.replies = [LOGIN_TEST, LOGIN_TEST_RENAMED, DELETE_TEST]
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/llm/bulk-manual-tests",
+            json={"requirements": "Вход", "distinct": 2, "max_concurrency": 1},
+        )
+        conflict = client.post(
+            "/llm/bulk-manual-tests",
+            json={"requirements": "Вход", "distinct": 2, "top_k": 1},
+        )
+
+    body = response.json()
+    assert body["distinct_tests"] == 2
+    assert body["generated_tests"] == 3
+    assert len(fake_llm.requests) == 3
+    assert [cluster["members"] for cluster in body["clusters"]] == [[1, 2], [3]]
+    assert conflict.status_code == 400
+
+
+def test_run_until_distinct_keeps_best_validated_representative():
+    codes = [LOGIN_TEST, LOGIN_TEST_RENAMED, DELETE_TEST]
+
+    async def generate_one(test_number):
+        return {"code": codes.pop(0)}
+
+    def validator(code):
+        severity = "error" if code == LOGIN_TEST else "warning"
+        return {"findings": [{"severity": severity}] if code != DELETE_TEST else []}
+
+    body = asyncio.run(run_until_distinct(2, generate_one, validator, max_concurrency=1))
+
+    assert [item["test_number"] for item in body["results"]] == [2, 3]
+    assert body["clusters"] == [
+        {"representative": 2, "members": [1, 2], "size": 2},
+        {"representative": 3, "members": [3], "size": 1},
+    ]
@@ -0,0 +1,81 @@
+from app.services.llm_cache import LLMResponseCache
+
+
+def test_make_key_depends_on_params():
+    base = {"model": "m", "temperature": 0.5, "messages": [{"role": "user", "content": "hi"}]}
+
+    assert LLMResponseCache.make_key(base) == LLMResponseCache.make_key(dict(base))
+    assert LLMResponseCache.make_key(base) != LLMResponseCache.make_key({**base, "temperature": 0.7})
+
+
+def test_memory_lru_eviction_and_stats():
+    cache = LLMResponseCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+    stats = cache.stats()
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+    assert stats["memory_entries"] == 2
+
+
+def test_ttl_expiry():
+    cache = LLMResponseCache(ttl=-1)
+    cache.set("a", "1")
+
+    assert cache.get("a") is None
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    db = str(tmp_path / "cache.sqlite")
+    LLMResponseCache(sqlite_path=db).set("a", "1")
+
+    cache = LLMResponseCache(sqlite_path=db)
+
+    assert cache.get("a") == "1"
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_async_disk_tier_runs_off_the_loop_and_outside_the_lock(tmp_path):
+    import asyncio
+    import threading
+
+    from app.services.state_backend import SQLiteBackend
+
+    released = threading.Event()
+    disk_threads, waits = [], []
+
+    class SlowDisk(SQLiteBackend):
+        def get(self, namespace, key):
+            disk_threads.append(threading.get_ident())
+            # Ждём, пока event loop обслужит попадание в память
+            waits.append(released.wait(timeout=2))
+            return super().get(namespace, key)
+
+        def set(self, namespace, key, value, ttl=None):
+            disk_threads.append(threading.get_ident())
+            super().set(namespace, key, value, ttl)
+
+    cache = LLMResponseCache(backend=SlowDisk(str(tmp_path / "cache.sqlite")))
+    cache._set_memory("hot", "1")
+
+    async def scenario():
+        cold = asyncio.create_task(cache.aget("cold"))
+        await asyncio.sleep(0.01)
+        hot = await cache.aget("hot")
+        released.set()
+        await cache.aset("new", "2")
+        return threading.get_ident(), hot, await cold
+
+    loop_thread, hot, cold = asyncio.run(scenario())
+
+    assert (hot, cold) == ("1", None)
+    assert waits == [True]
+    assert loop_thread not in disk_threads
+    assert cache.get("new") == "2"
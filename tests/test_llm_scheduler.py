@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import llm_scheduler, llm_service
+from app.services.llm_scheduler import BULK, INTERACTIVE, LLMScheduler, PriorityLimiter, TokenBucket
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "LLM_RETRY_BASE_DELAY", 0.01)
+
+
+def run(coro):
+    async def wrapper():
+        try:
+            return await coro
+        finally:
+            await llm_service.close_async_client()
+
+    return asyncio.run(wrapper())
+
+
+def test_retries_injected_429_and_5xx(fake_llm):
+    fake_llm.errors = [429, 503, 429]
+    fake_llm.reply = "import pytest"
+
+    async def call():
+        result = await llm_service.call_llm_async("retry me", use_cache=False)
+        return result, llm_service.get_scheduler().stats()
+
+    result, stats = run(call())
+
+    assert result == "import pytest"
+    assert len(fake_llm.requests) == 4
+    assert stats["retries"] == 3
+    assert stats["rate_limited"] == 2
+
+
+def test_persistent_429_becomes_503(fake_llm, monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "LLM_RETRY_ATTEMPTS", 2)
+    fake_llm.errors = [429] * 3
+
+    with TestClient(app) as client:
+        response = client.post("/llm/manual-test", json={"requirements": "x", "use_cache": False})
+
+    assert response.status_code == 503
+    assert len(fake_llm.requests) == 3
+
+
+def test_interactive_lane_goes_before_bulk():
+    order = []
+
+    async def scenario():
+        limiter = PriorityLimiter(1)
+        await limiter.acquire(INTERACTIVE)
+
+        async def waiter(name, priority):
+            await limiter.acquire(priority)
+            order.append(name)
+            limiter.release()
+
+        bulk = asyncio.create_task(waiter("bulk", BULK))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(waiter("interactive", INTERACTIVE))
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(bulk, interactive)
+
+    asyncio.run(scenario())
+
+    assert order == ["interactive", "bulk"]
+
+
+def test_request_bucket_spaces_out_calls():
+    async def scenario():
+        scheduler = LLMScheduler(max_concurrency=4, rps=20)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        async def call():
+            return None
+
+        await asyncio.gather(*(scheduler.run(call) for _ in range(25)))
+        return loop.time() - started
+
+    # Запас в 20 запросов уходит сразу, остальные 5 — по 1/20 с
+    assert asyncio.run(scenario()) >= 0.2
+
+
+def test_token_bucket_refund_restores_capacity():
+    bucket = TokenBucket(rate=1, capacity=100)
+    assert bucket.reserve(100) == 0
+    assert bucket.reserve(10) > 0
+    bucket.refund(50)
+    assert bucket.reserve(10) == 0
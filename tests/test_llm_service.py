@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+from app.services import llm_service
+from app.services.api_test_generator import generate_api_test
+
+
+def run(coro):
+    async def wrapper():
+        try:
+            return await coro
+        finally:
+            await llm_service.close_async_client()
+
+    return asyncio.run(wrapper())
+
+
+def test_call_llm_async_uses_fake_server(fake_llm):
+    fake_llm.reply = "  import httpx  "
+
+    result = run(llm_service.call_llm_async("hello"))
+
+    assert result == "import httpx"
+    assert fake_llm.requests[0]["model"] == "fake-model"
+    assert fake_llm.requests[0]["messages"][-1]["content"] == "hello"
+
+
+def test_call_llm_async_does_not_block_event_loop(fake_llm):
+    fake_llm.delay = 0.3
+
+    async def two_calls():
+        return await asyncio.gather(
+            llm_service.call_llm_async("a"),
+            llm_service.call_llm_async("b"),
+        )
+
+    started = time.perf_counter()
+    run(two_calls())
+
+    assert time.perf_counter() - started < 0.55
+
+
+def test_generate_api_test_is_async(fake_llm):
+    fake_llm.reply = "import pytest\nimport httpx"
+
+    code = run(generate_api_test({"path": "/v3/vms", "method": "GET"}))
+
+    assert code == "import pytest\nimport httpx"
+    assert "/v3/vms" in fake_llm.requests[0]["messages"][-1]["content"]
+
+
+def test_call_llm_async_caches_identical_prompts(fake_llm):
+    run(llm_service.call_llm_async("same prompt"))
+    run(llm_service.call_llm_async("same prompt"))
+    assert len(fake_llm.requests) == 1
+
+    run(llm_service.call_llm_async("same prompt", use_cache=False))
+    assert len(fake_llm.requests) == 2
+
+
+def test_identical_concurrent_calls_share_one_request(fake_llm):
+    fake_llm.delay = 0.2
+
+    async def burst():
+        return await asyncio.gather(
+            *(llm_service.call_llm_async("same endpoint") for _ in range(5))
+        )
+
+    results = run(burst())
+
+    assert len(fake_llm.requests) == 1
+    assert len(set(results)) == 1
+    assert llm_service.inflight_stats()["in_flight"] == 0
+
+
+def test_uncached_concurrent_calls_are_not_coalesced(fake_llm):
+    async def burst():
+        return await asyncio.gather(
+            *(llm_service.call_llm_async("bulk", use_cache=False) for _ in range(3))
+        )
+
+    run(burst())
+
+    assert len(fake_llm.requests) == 3
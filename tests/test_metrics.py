@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.metrics import Histogram, llm_tokens_total, stage_seconds
+
+SPEC = (Path(__file__).parent / "data" / "openapi_sample.yaml").read_text()
+
+
+def test_histogram_renders_prometheus_buckets():
+    histogram = Histogram("demo_seconds", "demo", ("stage",), buckets=(0.1, 1))
+    histogram.observe(0.05, "llm")
+    histogram.observe(0.5, "llm")
+
+    text = "\n".join(histogram.render())
+
+    assert 'demo_seconds_bucket{stage="llm",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="llm",le="1"} 2' in text
+    assert 'demo_seconds_bucket{stage="llm",le="+Inf"} 2' in text
+    assert 'demo_seconds_count{stage="llm"} 2' in text
+
+
+def test_generation_stages_and_tokens_are_recorded(fake_llm):
+    stages = ("spec_parse", "payload_build", "prompt_render", "llm", "validation")
+    before = {stage: stage_seconds.count(stage) for stage in stages}
+    prompt_tokens = llm_tokens_total.value("prompt")
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/llm/generate-api-test",
+            json={"openapi": SPEC + "\n# metrics", "endpoint_path": "/v3/vms/{vm_id}", "method": "GET"},
+            headers={"X-Request-ID": "req-1"},
+        )
+        metrics = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "req-1"
+    for stage in stages:
+        assert stage_seconds.count(stage) > before[stage], stage
+    # Фейковый сервер отдаёт usage с prompt_tokens=10
+    assert llm_tokens_total.value("prompt") == prompt_tokens + 10
+
+    assert metrics.status_code == 200
+    assert 'route="/llm/generate-api-test",status="200"' in metrics.text
+    assert 'testgen_llm_cache{value="hit_rate"}' in metrics.text
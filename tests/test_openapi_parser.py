@@ -78,3 +78,228 @@ def test_payload_builder():
     assert payload["uuid_path_params"] == ["vm_id"]
     assert payload["negative_cases"]["supports_404"] is True
     assert payload["negative_cases"]["invalid_uuid"] is True
+
+
+def test_find_endpoint():
+    parser = OpenAPIParser.load_from_file(str(DATA_PATH))
+
+    ep = parser.find_endpoint("/v3/vms/{vm_id}", "get")
+
+    assert ep.operation_id == "getVM"
+    assert parser.find_endpoint("/v3/vms/{vm_id}", "DELETE") is None
+    assert parser.find_endpoint("/missing", "GET") is None
+
+
+TREE_SPEC = """
+openapi: 3.0.0
+paths:
+  /nodes/{id}:
+    get:
+      responses:
+        "200":
+          content:
+            application/json:
+              schema:
+                $ref: "#/components/schemas/Node"
+components:
+  schemas:
+    Node:
+      type: object
+      properties:
+        name:
+          type: string
+        parent:
+          $ref: "#/components/schemas/Node"
+        children:
+          type: array
+          items:
+            $ref: "#/components/schemas/Node"
+"""
+
+
+def test_resolve_schema_handles_cycles_without_mutating_raw():
+    import copy
+
+    parser = OpenAPIParser.load_from_string(TREE_SPEC)
+    raw_before = copy.deepcopy(parser.spec.raw)
+    ep = parser.find_endpoint("/nodes/{id}", "GET")
+
+    schema = parser.get_response_schema(ep)
+
+    assert schema["properties"]["name"] == {"type": "string"}
+    assert schema["properties"]["parent"] == {
+        "x-circular-ref": "#/components/schemas/Node",
+        "type": "object",
+    }
+    assert schema["properties"]["children"]["items"]["x-circular-ref"] == "#/components/schemas/Node"
+    assert parser.spec.raw == raw_before
+
+
+def test_resolve_schema_is_memoized():
+    parser = OpenAPIParser.load_from_file(str(DATA_PATH))
+    ep = parser.find_endpoint("/v3/vms/{vm_id}", "GET")
+
+    first = parser.get_response_schema(ep)
+    second = parser.get_response_schema(ep)
+    list_item = parser.get_response_schema(parser.find_endpoint("/v3/vms", "GET"))["items"]
+
+    assert first is second
+    assert list_item is first
+    assert "$ref" in parser.spec.raw["paths"]["/v3/vms"]["get"]["responses"]["200"][
+        "content"]["application/json"]["schema"]["items"]
+
+
+def test_iter_endpoints_and_find_endpoint_are_lazy_views():
+    parser = OpenAPIParser.load_from_file(str(DATA_PATH))
+
+    views = parser.iter_endpoints()
+    first = next(views)
+
+    assert (first.method, first.path) == ("GET", "/v3/vms")
+    assert len(list(views)) == 1
+
+    ep = parser.find_endpoint("/v3/vms/{vm_id}", "get")
+    assert ep.operation_id == "getVM"
+    assert ep.response_schema["properties"]["id"]["format"] == "uuid"
+    assert ep.to_endpoint() == parser.parse_endpoints()[1]
+    assert parser.find_endpoint("/v3/vms", "TRACE") is None
+
+    payload = build_llm_payload(parser, ep)
+    assert payload["uuid_path_params"] == ["vm_id"]
+
+
+def test_sniff_format_looks_only_at_first_significant_char():
+    from backend.app.services.openapi_parser import sniff_format
+
+    assert sniff_format('  \n{"openapi": "3.0.0"}') == "json"
+    assert sniff_format(b"\xef\xbb\xbf[1]") == "json"
+    assert sniff_format("openapi: 3.0.0\npaths: {}") == "yaml"
+
+
+def test_yaml_spec_skips_json_parse(monkeypatch):
+    from backend.app.services import openapi_parser as parser_module
+
+    def fail(raw):
+        raise AssertionError("JSON-парсер не должен вызываться для YAML")
+
+    monkeypatch.setattr(parser_module, "_loads_json", fail)
+    parser = OpenAPIParser.load_from_string(DATA_PATH.read_text())
+    assert len(parser.parse_endpoints()) == 2
+
+
+def test_flow_style_yaml_falls_back_from_json():
+    parser = OpenAPIParser.load_from_string("{openapi: 3.0.0, paths: {}}")
+    assert parser.spec.raw["openapi"] == "3.0.0"
+
+
+def test_load_from_file_sniffs_content_not_extension(tmp_path):
+    import json
+    import yaml
+
+    data = yaml.safe_load(DATA_PATH.read_text())
+    # JSON в файле с расширением .yaml и YAML в файле с расширением .json
+    json_file = tmp_path / "spec.yaml"
+    json_file.write_text(json.dumps(data))
+    yaml_file = tmp_path / "spec.json"
+    yaml_file.write_text(DATA_PATH.read_text())
+
+    for path in (json_file, yaml_file):
+        parser = OpenAPIParser.load_from_file(str(path))
+        assert parser.find_endpoint("/v3/vms/{vm_id}", "GET") is not None
+
+
+def test_fingerprint_ignores_formatting_and_tracks_referenced_schemas():
+    import copy
+    import json
+    import yaml
+    from benchmarks.synthetic_specs import make_spec
+
+    spec = make_spec(8)
+    before = OpenAPIParser.load_from_string(json.dumps(spec)).fingerprints()
+    reformatted = OpenAPIParser.load_from_string(yaml.safe_dump(spec, sort_keys=True)).fingerprints()
+    assert reformatted == before
+
+    changed = copy.deepcopy(spec)
+    changed["components"]["schemas"]["Resource1"]["properties"]["status"]["enum"].append("PAUSED")
+    diff = OpenAPIParser(changed).diff(OpenAPIParser(spec))
+
+    # В payload идёт только схема ответа 200: POST (201) и DELETE не изменились
+    assert diff["changed"] == ["GET /v1/resources1", "GET /v1/resources1/{item_id}"]
+    assert len(diff["unchanged"]) == 6
+    assert diff["added"] == diff["removed"] == []
+
+
+def test_diff_reports_added_and_removed_endpoints():
+    from benchmarks.synthetic_specs import make_spec
+
+    diff = OpenAPIParser(make_spec(6)).diff(OpenAPIParser(make_spec(5)))
+    assert diff["added"] == ["POST /v1/resources1"]
+
+    diff = OpenAPIParser(make_spec(5)).diff(OpenAPIParser(make_spec(6)))
+    assert diff["removed"] == ["POST /v1/resources1"]
+
+
+def test_resolve_mutually_referencing_schemas_in_linear_time():
+    import json
+
+    from benchmarks.synthetic_specs import make_cyclic_spec
+
+    spec = make_cyclic_spec(12)
+    parser = OpenAPIParser(spec)
+    endpoints = list(parser.iter_endpoints())
+    lookups = []
+    resolve_ref = parser.resolve_ref
+    parser.resolve_ref = lambda ref: lookups.append(ref) or resolve_ref(ref)
+
+    schema = parser.get_response_schema(endpoints[0])
+
+    # 12 схем, каждая на все остальные: каждая $ref спеки разбирается не больше
+    # одного раза, без этого обход шёл бы по всем путям графа
+    assert len(lookups) <= json.dumps(spec).count('"$ref"')
+    assert schema["properties"]["to1"]["properties"]["to0"] == {
+        "x-circular-ref": "#/components/schemas/Node0",
+        "type": "object",
+    }
+    # Результат не зависит от того, с какого эндпоинта начали раскрытие
+    reversed_parser = OpenAPIParser(spec)
+    reversed_endpoints = list(reversed_parser.iter_endpoints())
+    for ep in reversed(reversed_endpoints):
+        reversed_parser.get_response_schema(ep)
+    assert [parser.fingerprint(ep) for ep in endpoints] == [
+        reversed_parser.fingerprint(ep) for ep in reversed_endpoints
+    ]
+
+
+def _ref(name):
+    return {"$ref": f"#/components/schemas/{name}"}
+
+
+def test_circular_placeholder_only_for_ancestors():
+    parser = OpenAPIParser({
+        "openapi": "3.0.0",
+        "paths": {"/orders": {"get": {"responses": {"200": {"content": {
+            "application/json": {"schema": _ref("Order")}}}}}}},
+        "components": {"schemas": {
+            "Order": {"type": "object", "properties": {
+                "customer": _ref("Customer"),
+                "billing_customer": _ref("Customer"),
+                "item": _ref("Item"),
+            }},
+            "Customer": {"type": "object", "properties": {
+                "name": {"type": "string"},
+                "last_order": _ref("Order"),
+            }},
+            "Item": {"type": "object", "properties": {"buyer": _ref("Customer")}},
+        }},
+    })
+
+    schema = parser.get_response_schema(parser.find_endpoint("/orders", "GET"))
+    props = schema["properties"]
+
+    # Customer не предок Item: его поля раскрыты, заглушка — только на сам Order
+    assert props["item"]["properties"]["buyer"]["properties"]["name"] == {"type": "string"}
+    assert props["billing_customer"] == props["customer"]
+    assert props["customer"]["properties"]["last_order"] == {
+        "x-circular-ref": "#/components/schemas/Order",
+        "type": "object",
+    }
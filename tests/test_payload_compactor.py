@@ -0,0 +1,83 @@
+import json
+
+from app.services.llm_payload_builder import build_llm_payload
+from app.services.openapi_parser import OpenAPIParser
+from app.services.payload_compactor import compact_payload, serialize_payload
+
+SPEC = """
+openapi: 3.0.0
+paths:
+  /vms/{vm_id}:
+    put:
+      operationId: updateVM
+      parameters:
+        - name: vm_id
+          in: path
+          required: true
+          description: Идентификатор виртуальной машины
+          schema: {type: string, format: uuid}
+      requestBody:
+        content:
+          application/json:
+            schema: {$ref: "#/components/schemas/VM"}
+      responses:
+        "200":
+          content:
+            application/json:
+              schema: {$ref: "#/components/schemas/VM"}
+components:
+  schemas:
+    VM:
+      type: object
+      description: Виртуальная машина
+      properties:
+        id: {type: string, format: uuid, example: "7c9e6679-7425-40de-944b-e07fc1f90ae7"}
+        disk:
+          type: object
+          properties:
+            volume:
+              type: object
+              properties:
+                size: {type: integer, description: Размер в ГБ}
+"""
+
+
+def build(**kwargs):
+    parser = OpenAPIParser.load_from_string(SPEC)
+    return build_llm_payload(parser, parser.find_endpoint("/vms/{vm_id}", "PUT"), **kwargs)
+
+
+def test_compact_payload_strips_and_deduplicates():
+    payload = build(compact=True)
+
+    assert payload["request_schema"]["properties"]["id"] == {"type": "string", "format": "uuid"}
+    assert payload["response_schema"] == {"$same": "request_schema"}
+    assert "description" not in payload["parameters"][0]
+    report = payload["compaction"]
+    assert report["deduplicated_schemas"] == 1
+    assert report["compacted_tokens"] < report["original_tokens"]
+
+    prompt_json = serialize_payload(payload)
+    assert "compaction" not in prompt_json
+    assert "\n" not in prompt_json
+    assert json.loads(prompt_json)["operation_id"] == "updateVM"
+
+
+def test_token_budget_reduces_depth():
+    payload = build(token_budget=100)
+    report = payload["compaction"]
+
+    assert report["max_depth"] < 6
+    assert report["truncated_schemas"] > 0
+    assert report["token_budget"] == 100
+
+
+def test_plain_payload_is_unchanged():
+    payload = build()
+
+    assert "compaction" not in payload
+    assert serialize_payload(payload) == json.dumps(payload, indent=2, ensure_ascii=False)
+    assert compact_payload(payload, max_depth=1)["request_schema"]["properties"]["disk"] == {
+        "type": "object",
+        "truncated": True,
+    }
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from app.services import llm_service
+from app.services.api_test_generator import generate_api_test, prepare_prompt
+from app.services.prompt_templates import PromptRegistry, PromptTemplate
+
+
+def test_system_prefix_is_shared_and_payload_goes_last():
+    first = prepare_prompt({"path": "/v3/vms", "method": "GET"})
+    second = prepare_prompt({"path": "/v3/disks", "method": "POST"})
+
+    assert first.system == second.system
+    assert first.template_id == "api_test@2"
+    assert first.user.endswith("--- END ENDPOINT JSON ---")
+    assert "/v3/disks" in second.user and "/v3/disks" not in second.system
+
+
+def test_template_renders_literal_braces_and_checks_fields():
+    template = PromptTemplate("demo", "1", system="s", user='{{"a": 1}} {value}')
+
+    assert template.render(value="x").user == '{"a": 1} x'
+    with pytest.raises(KeyError):
+        template.render()
+
+
+def test_registry_uses_latest_unless_pinned():
+    registry = PromptRegistry()
+    registry.register(PromptTemplate("demo", "1", system="old", user="{x}"))
+    registry.register(PromptTemplate("demo", "2", system="new", user="{x}"))
+
+    assert registry.get("demo").version == "2"
+    registry.pin("demo", "1")
+    assert registry.get("demo").system == "old"
+    assert [t["active"] for t in registry.list()] == [True, False]
+
+
+def test_generation_sends_system_message_first(fake_llm):
+    async def run():
+        try:
+            await generate_api_test({"path": "/v3/vms", "method": "GET"})
+        finally:
+            await llm_service.close_async_client()
+
+    asyncio.run(run())
+
+    roles = [m["role"] for m in fake_llm.requests[0]["messages"]]
+    assert roles == ["system", "user"]
@@ -0,0 +1,71 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import llm_service
+from app.services.repair import RepairStats, generate_with_repair
+from app.services.test_validators import validate_pytest_api
+
+VALID = '''import httpx
+import pytest
+
+
+@pytest.fixture
+def auth_header():
+    return {"Authorization": "Bearer TEST_TOKEN"}
+
+
+def test_ok(auth_header):
+    # Arrange / Act / Assert
+    assert httpx is not None
+'''
+
+
+def test_repair_sends_only_code_and_errors(fake_llm):
+    fake_llm.replies = ["import pytest\ndef test_x():\n    pass", VALID]
+
+    async def run():
+        try:
+            return await generate_with_repair(
+                lambda: llm_service.call_llm_async("generate", use_cache=False),
+                validate_pytest_api,
+            )
+        finally:
+            await llm_service.close_async_client()
+
+    result = asyncio.run(run())
+
+    assert result["attempts"] == 2
+    assert result["validation"]["errors"] == []
+    repair_prompt = fake_llm.requests[1]["messages"][-1]["content"]
+    assert "def test_x()" in repair_prompt
+    assert "Нет import pytest или import httpx." in repair_prompt
+    assert "generate" not in repair_prompt
+
+
+def test_repair_stops_after_max_attempts(fake_llm):
+    fake_llm.reply = "not python at all"
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/llm/generate-ui-e2e-test",
+            json={"requirements": "x", "repair": True},
+        )
+
+    body = response.json()
+    assert body["attempts"] == 3
+    assert body["validation"]["errors"]
+    assert len(fake_llm.requests) == 3
+
+
+def test_repair_stats_histogram():
+    stats = RepairStats()
+    stats.record(1, True)
+    stats.record(3, False)
+
+    snapshot = stats.snapshot()
+
+    assert snapshot["attempts_histogram"] == {1: 1, 3: 1}
+    assert snapshot["avg_attempts"] == 2.0
+    assert snapshot["invalid"] == 1
@@ -0,0 +1,141 @@
+import asyncio
+from pathlib import Path
+
+import httpx
+
+from app.services.mock_api_server import MISSING_UUID, MockAPIServer
+from app.services.openapi_parser import OpenAPIParser
+from app.services.sandbox_runner import get_sandbox_worker, run_pytest_file, verify_api_test
+
+DATA_PATH = Path(__file__).parent / "data" / "openapi_sample.yaml"
+VM_ID = "7c9e6679-7425-40de-944b-e07fc1f90ae7"
+
+GENERATED = '''import httpx
+
+BASE_URL = "https://api.example.com"
+
+
+def test_get_vm():
+    response = httpx.get(f"{BASE_URL}/v3/vms/%s")
+    assert response.status_code == 200
+    assert response.json()["status"] in ("ACTIVE", "STOPPED")
+
+
+def test_get_vm_invalid_id():
+    response = httpx.get(f"{BASE_URL}/v3/vms/not-a-uuid")
+    assert response.status_code == 400
+
+
+def test_wrong_expectation():
+    response = httpx.get(f"{BASE_URL}/v3/vms/%s")
+    assert response.status_code == 200
+''' % (VM_ID, MISSING_UUID)
+
+
+def test_mock_server_follows_spec():
+    parser = OpenAPIParser.load_from_file(str(DATA_PATH))
+    with MockAPIServer(parser) as mock:
+        ok = httpx.get(f"{mock.base_url}/v3/vms/{VM_ID}")
+        assert ok.status_code == 200
+        assert set(ok.json()) == {"id", "name", "status"}
+        assert ok.json()["status"] == "ACTIVE"
+
+        assert httpx.get(f"{mock.base_url}/v3/vms/bad").status_code == 400
+        assert httpx.get(f"{mock.base_url}/v3/vms/{MISSING_UUID}").status_code == 404
+        assert isinstance(httpx.get(f"{mock.base_url}/v3/vms").json(), list)
+
+
+def test_verify_reports_each_test_function():
+    parser = OpenAPIParser.load_from_file(str(DATA_PATH))
+    result = asyncio.run(verify_api_test(parser, GENERATED))
+
+    assert result["status"] == "failed"
+    tests = result["tests"]
+    assert tests["test_get_vm"]["outcome"] == "passed"
+    assert tests["test_get_vm_invalid_id"]["outcome"] == "passed"
+    assert tests["test_wrong_expectation"]["outcome"] == "failed"
+
+
+def test_compile_error_is_reported_without_running():
+    result = run_pytest_file("def test_x(:\n    pass", "http://127.0.0.1:1")
+    assert result["status"] == "compile_error"
+    assert result["tests"] == {}
+
+
+ISOLATION_CHECKS = '''import os
+import shutil
+import socket
+import subprocess
+
+import pytest
+
+
+def test_server_secrets_are_not_visible():
+    assert "CLOUDRU_API_KEY" not in os.environ
+    assert "BULK_JOBS_SQLITE_PATH" not in os.environ
+
+
+def test_network_is_closed_except_mock():
+    with pytest.raises(PermissionError):
+        socket.create_connection(("127.0.0.1", 9), timeout=1)
+    with pytest.raises(PermissionError):
+        socket.getaddrinfo("example.com", 443)
+
+
+def test_processes_cannot_be_started_or_signalled():
+    with pytest.raises(PermissionError):
+        subprocess.run(["true"])
+    with pytest.raises(PermissionError):
+        os.kill(os.getppid(), 0)
+
+
+def test_files_outside_workdir_are_closed():
+    with pytest.raises(PermissionError):
+        open("/etc/hostname").read()
+    with pytest.raises(PermissionError):
+        os.listdir(%r)
+    with pytest.raises(PermissionError):
+        shutil.rmtree("/tmp/nothing-here")
+    with open("scratch.txt", "w") as f:
+        f.write("в каталоге прогона можно")
+    os.remove("scratch.txt")
+    print("SECRET-LOOKING OUTPUT")
+''' % str(Path(__file__).resolve().parents[1])
+
+
+def test_sandbox_blocks_escapes_and_withholds_their_output():
+    parser = OpenAPIParser.load_from_file(str(DATA_PATH))
+
+    result = asyncio.run(verify_api_test(parser, ISOLATION_CHECKS))
+
+    assert result["status"] == "blocked"
+    assert result["violations"] == [
+        "open", "os.kill", "os.listdir", "shutil.rmtree", "socket.connect", "socket.getaddrinfo", "subprocess.Popen",
+    ]
+    assert len(result["tests"]) == 4
+    assert all(test == {"outcome": "passed", "message": None} for test in result["tests"].values())
+    assert "output" not in result
+
+
+def test_worker_process_is_reused_between_runs():
+    code = "def test_ok():\n    assert True\n"
+    mock_url = "http://127.0.0.1:1"
+
+    first = run_pytest_file(code, mock_url)
+    worker = get_sandbox_worker()
+    second = run_pytest_file(code.replace("test_ok", "test_again"), mock_url)
+
+    assert first["status"] == second["status"] == "passed"
+    assert list(second["tests"]) == ["test_again"]
+    assert get_sandbox_worker() is worker and worker.runs >= 2
+
+
+def test_timed_out_worker_is_replaced():
+    hung = "import time\n\n\ndef test_hangs():\n    time.sleep(30)\n"
+
+    result = run_pytest_file(hung, "http://127.0.0.1:1", timeout=1)
+    worker = get_sandbox_worker()
+
+    assert result["status"] == "timeout"
+    assert worker.alive
+    assert run_pytest_file("def test_ok():\n    pass\n", "http://127.0.0.1:1")["status"] == "passed"
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from app.services import spec_cache
+
+DATA_PATH = Path(__file__).resolve().parent / "data" / "openapi_sample.yaml"
+
+
+def test_get_parser_reuses_parsed_spec():
+    spec_cache.clear_spec_cache()
+    raw = DATA_PATH.read_text()
+
+    first = spec_cache.get_parser(raw)
+    second = spec_cache.get_parser(raw)
+
+    assert first is second
+    assert first.find_endpoint("/v3/vms", "GET").operation_id == "listVMs"
+
+
+def test_get_parser_is_bounded(monkeypatch):
+    spec_cache.clear_spec_cache()
+    monkeypatch.setattr(spec_cache, "SPEC_CACHE_MAX_ENTRIES", 2)
+
+    first = spec_cache.get_parser("openapi: 3.0.0\npaths: {}\n")
+    spec_cache.get_parser("openapi: 3.0.1\npaths: {}\n")
+    spec_cache.get_parser("openapi: 3.0.2\npaths: {}\n")
+
+    assert spec_cache.get_parser("openapi: 3.0.0\npaths: {}\n") is not first
@@ -0,0 +1,92 @@
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.spec_store import SpecNotFoundError, SpecStore, SpecTooLargeError
+
+DATA_PATH = Path(__file__).resolve().parent / "data" / "openapi_sample.yaml"
+
+
+def spec_text(version: str) -> str:
+    return f"openapi: {version}\npaths: {{}}\n"
+
+
+def test_add_is_idempotent_by_content():
+    store = SpecStore()
+
+    first = store.add(DATA_PATH.read_text())
+    second = store.add(DATA_PATH.read_text())
+
+    assert first is second
+    assert first.info()["endpoints"] == 2
+    assert store.stats()["specs"] == 1
+
+
+def test_lru_eviction_by_count_and_bytes():
+    store = SpecStore(max_specs=2)
+    a = store.add(spec_text("3.0.0"))
+    b = store.add(spec_text("3.0.1"))
+    store.get(a.spec_id)
+    store.add(spec_text("3.0.2"))
+
+    assert store.get(a.spec_id) is a
+    with pytest.raises(SpecNotFoundError):
+        store.get(b.spec_id)
+
+    size = len(spec_text("3.0.0"))
+    store = SpecStore(max_bytes=size * 2)
+    a = store.add(spec_text("3.0.0"))
+    store.add(spec_text("3.0.1"))
+    store.add(spec_text("3.0.2"))
+
+    assert store.stats()["total_bytes"] == size * 2
+    with pytest.raises(SpecNotFoundError):
+        store.get(a.spec_id)
+
+
+def test_too_large_spec_is_rejected():
+    with pytest.raises(SpecTooLargeError):
+        SpecStore(max_bytes=4).add(spec_text("3.0.0"))
+
+
+def test_generate_by_spec_id(fake_llm):
+    fake_llm.reply = "import pytest\nimport httpx"
+
+    with TestClient(app) as client:
+        uploaded = client.post("/specs", json={"openapi": DATA_PATH.read_text()})
+        spec_id = uploaded.json()["spec_id"]
+
+        response = client.post(
+            "/llm/generate-api-test",
+            json={"spec_id": spec_id, "endpoint_path": "/v3/vms/{vm_id}", "method": "GET"},
+        )
+        missing = client.post(
+            "/llm/generate-api-test",
+            json={"spec_id": "unknown", "endpoint_path": "/v3/vms", "method": "GET"},
+        )
+        no_source = client.post(
+            "/llm/generate-api-test",
+            json={"endpoint_path": "/v3/vms", "method": "GET"},
+        )
+
+    assert uploaded.status_code == 200
+    assert response.status_code == 200
+    assert response.json()["code"] == "import pytest\nimport httpx"
+    assert "getVM" in fake_llm.requests[0]["messages"][-1]["content"]
+    assert missing.status_code == 404
+    assert no_source.status_code == 422
+
+
+def test_diff_endpoint_compares_spec_versions():
+    old = DATA_PATH.read_text()
+    new = old.replace('summary: "Get VM"', 'summary: "Get VM by id"')
+
+    with TestClient(app) as client:
+        spec_id = client.post("/specs", json={"openapi": old}).json()["spec_id"]
+        response = client.post("/specs/diff", json={"old": {"spec_id": spec_id}, "new": {"openapi": new}})
+
+    assert response.status_code == 200
+    assert response.json()["changed"] == ["GET /v3/vms/{vm_id}"]
+    assert response.json()["counts"] == {"added": 0, "removed": 0, "changed": 1, "unchanged": 1}
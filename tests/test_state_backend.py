@@ -0,0 +1,165 @@
+import asyncio
+import io
+import time
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from app.services import llm_service
+from app.services.metrics import stage_seconds
+from app.services.openapi_parser import OpenAPIParser
+from app.services.spec_store import SpecNotFoundError, SpecStore
+from app.services.state_backend import MemoryBackend, SQLiteBackend, create_backend
+from app.services.suite_jobs import StoredSuiteJob, SuiteJob, SuiteJobRegistry
+from app.services.warmup import warmup
+
+DATA_PATH = Path(__file__).resolve().parent / "data" / "openapi_sample.yaml"
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_backend_get_set_delete_and_ttl(kind, tmp_path):
+    backend = create_backend(kind, str(tmp_path / "state.sqlite3"))
+
+    backend.set("ns", "a", "1")
+    backend.set("ns", "b", "2", ttl=0.01)
+    backend.set_json("other", "a", {"x": [1, 2]})
+    time.sleep(0.02)
+
+    assert backend.get("ns", "a") == "1"
+    assert backend.get("ns", "b") is None
+    assert backend.get_json("other", "a") == {"x": [1, 2]}
+    assert backend.delete("ns", "a") is True
+    assert backend.delete("ns", "a") is False
+
+    backend.clear("other")
+    assert backend.get("other", "a") is None
+
+
+def test_sqlite_backend_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    first, second = SQLiteBackend(path), SQLiteBackend(path)
+
+    first.set("ns", "key", "value", ttl=60)
+
+    assert second.get("ns", "key") == "value"
+    assert second.shared and not MemoryBackend().shared
+
+
+def test_spec_uploaded_on_one_worker_is_visible_on_another(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    worker_a = SpecStore(backend=SQLiteBackend(path))
+    worker_b = SpecStore(backend=SQLiteBackend(path))
+
+    spec_id = worker_a.add(DATA_PATH.read_text()).spec_id
+    stored = worker_b.get(spec_id)
+
+    assert stored.info()["endpoints"] == 2
+    assert worker_b.stats()["specs"] == 1
+
+    worker_b.remove(spec_id)
+    worker_a._specs.clear()
+    with pytest.raises(SpecNotFoundError):
+        worker_a.get(spec_id)
+
+
+def test_suite_job_progress_and_archive_readable_from_other_worker(fake_llm, tmp_path):
+    fake_llm.reply = "import pytest\nimport httpx"
+    path = str(tmp_path / "state.sqlite3")
+    worker_a = SuiteJobRegistry(backend=SQLiteBackend(path))
+    worker_b = SuiteJobRegistry(backend=SQLiteBackend(path))
+
+    async def scenario():
+        job = worker_a.submit(SuiteJob(OpenAPIParser.load_from_file(str(DATA_PATH))))
+        pending = worker_b.get(job.id)
+        assert isinstance(pending, StoredSuiteJob)
+        assert not pending.finished
+
+        version = await pending.wait_for_change(-1, timeout=1)
+        while not pending.finished:
+            version = await pending.wait_for_change(version, timeout=1)
+        await llm_service.close_async_client()
+        return pending
+
+    stored = asyncio.run(scenario())
+
+    assert stored.summary()["completed"] == 2
+    assert "results" not in stored.progress()
+    with zipfile.ZipFile(io.BytesIO(stored.archive())) as zf:
+        assert set(zf.namelist()) == {"test_listvms.py", "test_getvm.py", "report.json"}
+    assert worker_b.get("missing") is None
+
+
+def test_suite_job_writes_results_and_files_once(fake_llm, tmp_path):
+    fake_llm.reply = "import pytest\nimport httpx"
+    writes = []
+
+    class CountingBackend(SQLiteBackend):
+        def set(self, namespace, key, value, ttl=None):
+            writes.append((namespace, "results" in value))
+            super().set(namespace, key, value, ttl)
+
+    registry = SuiteJobRegistry(backend=CountingBackend(str(tmp_path / "state.sqlite3")))
+
+    async def scenario():
+        job = registry.submit(SuiteJob(OpenAPIParser.load_from_file(str(DATA_PATH))))
+        while not job.finished:
+            await job.wait_for_change(job._version, timeout=1)
+        while job._persisted != job._version:
+            await asyncio.sleep(0.01)
+        await llm_service.close_async_client()
+
+    asyncio.run(scenario())
+
+    # Прогресс — без результатов; результаты и файлы — по одной записи на задачу
+    assert [namespace for namespace, _ in writes].count("suite_results") == 1
+    assert [namespace for namespace, _ in writes].count("suite_files") == 1
+    assert not any(has_results for namespace, has_results in writes if namespace == "suite_jobs")
+
+
+def test_warmup_prepares_client_without_calling_model(fake_llm):
+    before = stage_seconds.count("warmup")
+
+    stats = asyncio.run(warmup())
+    asyncio.run(llm_service.close_async_client())
+
+    assert stats["templates"] >= 5
+    assert stats["validators"] == 3
+    assert stage_seconds.count("warmup") == before + 1
+    assert fake_llm.requests == []
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_backend_add_only_if_absent_or_expired(kind, tmp_path):
+    backend = create_backend(kind, str(tmp_path / "state.sqlite3"))
+
+    assert backend.add("claims", "job", "a", ttl=0.01) is True
+    assert backend.add("claims", "job", "b") is False
+    time.sleep(0.02)
+    assert backend.add("claims", "job", "b") is True
+    assert backend.get("claims", "job") == "b"
+    assert backend.keys("claims") == ["job"]
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_backend_purges_expired_entries_on_writes(kind, tmp_path, monkeypatch):
+    from app.services import state_backend as state_module
+
+    monkeypatch.setattr(state_module, "STATE_PURGE_EVERY", 3)
+    backend = create_backend(kind, str(tmp_path / "state.sqlite3"))
+
+    backend.set("ns", "old", "1", ttl=0.01)
+    backend.add("ns", "kept", "2")
+    time.sleep(0.02)
+    # Третья запись запускает очистку: истёкший ключ удаляется без чтения
+    backend.set("ns", "fresh", "3")
+
+    assert backend.purge_expired() == 0
+    assert sorted(backend.keys("ns")) == ["fresh", "kept"]
+
+
+def test_state_backend_is_abstract():
+    from app.services.state_backend import StateBackend
+
+    with pytest.raises(TypeError):
+        StateBackend()
@@ -0,0 +1,61 @@
+import json
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.metrics import llm_tokens_total
+
+DATA_PATH = Path(__file__).resolve().parent / "data" / "openapi_sample.yaml"
+
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_manual_test_stream_sends_tokens_then_result(fake_llm):
+    fake_llm.reply = "import allure\nfrom pytest import mark\n"
+
+    with TestClient(app) as client:
+        with client.stream("POST", "/llm/manual-test/stream", json={"requirements": "x"}) as r:
+            events = parse_sse("".join(r.iter_text()))
+
+    assert [name for name, _ in events] == ["token", "token", "result"]
+    assert events[0][1]["text"] == "import allure\n"
+    result = events[-1][1]
+    assert result["code"] == "import allure\nfrom pytest import mark"
+    assert result["validation"]["imports_ok"] is True
+
+
+def test_api_test_stream_is_cached_after_first_call(fake_llm):
+    fake_llm.reply = "import pytest\nimport httpx\n"
+    body = {
+        "openapi": DATA_PATH.read_text(),
+        "endpoint_path": "/v3/vms",
+        "method": "GET",
+    }
+
+    completion_tokens = llm_tokens_total.value("completion")
+
+    with TestClient(app) as client:
+        for _ in range(2):
+            with client.stream("POST", "/llm/generate-api-test/stream", json=body) as r:
+                events = parse_sse("".join(r.iter_text()))
+        missing = client.post(
+            "/llm/generate-api-test/stream", json={**body, "endpoint_path": "/nope"}
+        )
+
+    assert len(fake_llm.requests) == 1
+    assert fake_llm.requests[0]["stream"] is True
+    # usage потокового ответа тоже учитывается (stream_options.include_usage)
+    assert fake_llm.requests[0]["stream_options"] == {"include_usage": True}
+    assert llm_tokens_total.value("completion") == completion_tokens + 5
+    assert events == [
+        ("token", {"text": "import pytest\nimport httpx"}),
+        ("result", {"code": "import pytest\nimport httpx", "validation": events[-1][1]["validation"]}),
+    ]
+    assert missing.status_code == 404
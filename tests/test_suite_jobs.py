@@ -0,0 +1,134 @@
+import io
+import json
+import time
+import zipfile
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.openapi_parser import OpenAPIParser
+from app.services.suite_jobs import endpoint_file_names
+
+DATA_PATH = Path(__file__).resolve().parent / "data" / "openapi_sample.yaml"
+
+
+def wait_done(client, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/llm/suite-jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError("suite job did not finish")
+
+
+def test_suite_job_generates_file_per_endpoint(fake_llm):
+    fake_llm.reply = "import pytest\nimport httpx"
+
+    with TestClient(app) as client:
+        created = client.post("/llm/suite-jobs", json={"openapi": DATA_PATH.read_text()})
+        job_id = created.json()["job_id"]
+        job = wait_done(client, job_id)
+        archive = client.get(f"/llm/suite-jobs/{job_id}/archive")
+
+    assert created.json()["total"] == 2
+    assert job["status"] == "done"
+    assert job["completed"] == 2
+    assert len(fake_llm.requests) == 2
+
+    with zipfile.ZipFile(io.BytesIO(archive.content)) as zf:
+        names = set(zf.namelist())
+        assert names == {"test_listvms.py", "test_getvm.py", "report.json"}
+        assert "# Endpoint: GET /v3/vms/{vm_id}" in zf.read("test_getvm.py").decode()
+        assert json.loads(zf.read("report.json"))["completed"] == 2
+
+
+def test_suite_job_events_stream_ends_with_done(fake_llm):
+    with TestClient(app) as client:
+        job_id = client.post(
+            "/llm/suite-jobs", json={"openapi": DATA_PATH.read_text(), "mode": "manual"}
+        ).json()["job_id"]
+
+        with client.stream("GET", f"/llm/suite-jobs/{job_id}/events") as response:
+            body = "".join(response.iter_text())
+
+    assert "event: done" in body
+    assert body.rstrip().endswith("}")
+    assert '"status": "done"' in body.split("event: done")[1]
+
+
+VALID_API_TEST = '''import httpx
+import pytest
+
+
+@pytest.fixture
+def auth_header():
+    return {"Authorization": "Bearer TEST_TOKEN"}
+
+
+def test_get_vm(auth_header):
+    # Arrange
+    url = "https://api.example.com/v3/vms"
+    # Act
+    response = httpx.get(url, headers=auth_header)
+    # Assert
+    assert response.status_code == 200
+'''
+
+
+def test_incremental_job_regenerates_only_changed_endpoints(fake_llm):
+    from app.services.state_backend import state_backend
+
+    state_backend.clear("endpoint_tests")
+    fake_llm.reply = VALID_API_TEST
+    old = DATA_PATH.read_text()
+    new = old.replace('summary: "Get VM"', 'summary: "Get VM by id"')
+
+    with TestClient(app) as client:
+        first = client.post("/llm/suite-jobs", json={"openapi": old, "incremental": True}).json()
+        wait_done(client, first["job_id"])
+        calls_for_first = len(fake_llm.requests)
+
+        second = client.post("/llm/suite-jobs", json={"openapi": new, "incremental": True}).json()
+        job = wait_done(client, second["job_id"])
+        archive = client.get(f"/llm/suite-jobs/{second['job_id']}/archive")
+
+    assert calls_for_first == 2
+    assert len(fake_llm.requests) - calls_for_first == 1
+    assert job["completed"] == 2 and job["reused"] == 1
+    reused = [item for item in job["results"] if item.get("reused")]
+    assert [item["endpoint"] for item in reused] == ["GET /v3/vms"]
+    with zipfile.ZipFile(io.BytesIO(archive.content)) as zf:
+        assert {"test_listvms.py", "test_getvm.py"} <= set(zf.namelist())
+
+
+def test_regular_job_does_not_store_endpoint_tests(fake_llm):
+    from app.services.state_backend import state_backend
+
+    state_backend.clear("endpoint_tests")
+    fake_llm.reply = VALID_API_TEST
+
+    with TestClient(app) as client:
+        job_id = client.post("/llm/suite-jobs", json={"openapi": DATA_PATH.read_text()}).json()["job_id"]
+        job = wait_done(client, job_id)
+
+    assert job["completed"] == 2
+    assert state_backend.keys("endpoint_tests") == []
+
+
+def test_colliding_file_names_get_suffix():
+    ops = {"get": {"operationId": "getVM", "responses": {"200": {"description": "ok"}}}}
+    parser = OpenAPIParser({
+        "openapi": "3.0.0",
+        "paths": {
+            "/vm": ops,
+            "/Vm": {"get": {"operationId": "getVm", "responses": {"200": {"description": "ok"}}}},
+            "/a-b": {"post": {"responses": {"200": {"description": "ok"}}}},
+            "/a_b": {"post": {"responses": {"200": {"description": "ok"}}}},
+        },
+    })
+
+    names = endpoint_file_names(list(parser.iter_endpoints()), "auto")
+
+    assert names == ["test_getvm.py", "test_getvm_2.py", "test_post_a_b.py", "test_post_a_b_2.py"]
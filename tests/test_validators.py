@@ -0,0 +1,101 @@
+from app.services import validator_engine
+from app.services.metrics import stage_seconds
+from app.services.test_validators import (
+    validate_e2e_test,
+    validate_manual_test,
+    validate_pytest_api,
+)
+
+MANUAL_TEST = '''import allure
+from pytest import mark
+
+
+@allure.manual
+@mark.manual
+class TestCalculatorUI:
+    def test_add(self) -> None:
+        with allure.step("Arrange: открыть калькулятор"):
+            pass
+'''
+
+API_TEST = '''import httpx
+import pytest
+
+
+@pytest.fixture
+def auth_header():
+    return {"Authorization": "Bearer TEST_TOKEN"}
+
+
+def test_list_vms(auth_header):
+    # Arrange
+    url = "http://localhost/v3/vms"
+    # Act
+    response = httpx.get(url, headers=auth_header)
+    # Assert
+    assert response.status_code == 200
+'''
+
+
+def test_valid_files_have_no_errors():
+    assert validate_manual_test(MANUAL_TEST)["errors"] == []
+    assert validate_pytest_api(API_TEST)["errors"] == []
+
+
+def test_commented_out_decorator_is_not_counted():
+    code = MANUAL_TEST.replace("@allure.manual", "# @allure.manual")
+
+    result = validate_manual_test(code)
+
+    assert result["has_allure_manual"] is False
+    assert [f["rule"] for f in result["findings"]] == ["has_allure_manual"]
+
+
+def test_aaa_requires_whole_words():
+    code = API_TEST.replace("# Act", "# Actually")
+
+    result = validate_pytest_api(code)
+
+    assert result["aaa_ok"] is False
+    assert result["errors"] == ["Нет AAA-паттерна."]
+
+
+def test_syntax_error_and_markdown_are_reported_with_lines():
+    code = "```python\nimport httpx\nimport pytest\ndef test_x(:\n    pass\n```"
+
+    result = validate_pytest_api(code)
+    rules = {f["rule"]: f["line"] for f in result["findings"]}
+
+    assert result["is_python"] is False
+    assert rules["syntax"] == 4
+    assert rules["no_markdown"] == 1
+
+
+def test_e2e_fixture_decorators_and_fences():
+    code = (
+        "```python\nfrom playwright.sync_api import Page, expect\n\n"
+        "def test_total(page: Page):\n    # Arrange\n    # Act\n    # Assert\n    pass\n```"
+    )
+
+    result = validate_e2e_test(code)
+
+    assert result["uses_playwright"] is True
+    assert result["has_test_fn"] is True
+    assert result["no_markdown"] is False
+    assert result["errors"] == ["Код содержит Markdown-разметку ```."]
+
+
+def test_validate_batch_uses_process_pool(monkeypatch):
+    monkeypatch.setattr(validator_engine, "VALIDATION_POOL_MIN_BATCH", 2)
+    before = stage_seconds.count("validation")
+    try:
+        results = validator_engine.validate_batch(
+            validate_pytest_api, [API_TEST, "not python", API_TEST]
+        )
+        assert validator_engine._validation_pool is not None
+    finally:
+        validator_engine.shutdown_validation_pool()
+
+    assert [r["errors"] == [] for r in results] == [True, False, True]
+    # Время проверок из процессов пула попадает в метрики родителя
+    assert stage_seconds.count("validation") == before + 3